@@ -0,0 +1,67 @@
+"""
+Shared functions for the modelling of the sulfur isotopic composition of DMSP.
+
+The scripts in `code/modelling`, `code/processing` and `code/figures` add the
+`code` directory to the path and import the modules in this package, e.g.
+
+    import sys
+    sys.path.insert(0, f'{homedir}/code')
+    from dmsp.isotopes import isotopes, ratio_to_delta
+
+Modules
+-------
+boxes: Multi-box model of DMSP in ocean regions with their own volumes, fluxes
+and enzymes that exchange water, with a sparse Jacobian, stiff integration and
+a sparse Newton solver of the steady state of all the boxes.
+cache: On-disk cache of the solutions of the models, keyed by a hash of the
+model, its parameters, the initial state, the time points and the solver
+options.
+column: Depth-resolved model of DMSP in a water column by the method of lines,
+with depth-dependent production, enzymes and eddy diffusion, its banded
+Jacobian and a banded Newton solver of the steady state of the column.
+continuation: Continuation of the steady states of sweeps, seeding each
+solve with a secant prediction from the previous points, vectorized along
+one axis of a batched OceanModel or with the solver of any model, and
+reporting saturated enzymes, non-convergence and jumps of the solutions.
+emulator: Interpolator of the d34S of DMSP at steady state trained on a grid
+of compositions of transcripts and kinetic parameters, for fast queries.
+enz_deg: Enzyme degradation model (dmsp_enz_deg), its Jacobian, its ensemble
+integrator, its multi-isotope version, its closed-form solution (first order
+far below saturation) with a dispatcher that falls back to odeint, the
+integration of dosing events (additions of enzyme or DMSP during a run), the
+apparent fractionation on grids of two parameters and its forward
+sensitivities.
+inverse: Index of the ternary maps sorted by d34S, to find the compositions
+of enzymes consistent with an observed d34S of DMSP.
+isotopes: Conversions between delta values, isotopic ratios and fractional
+abundances, splitting of DMSP into 34DMSP and 32DMSP or any set of
+isotopologues (32S, 33S, 34S, 36S), mass-dependent fractionation laws and the
+capital delta (D33S, D36S).
+logratio: Log-ratio formulation of the models, integrating ln(total DMSP) and
+ln(34DMSP/32DMSP) instead of the concentrations of 34DMSP and 32DMSP.
+ocean: Steady-state model of DMSP in the ocean (dmsp_system_3_comp_mm), its
+Jacobian, its direct steady-state solver (d34s_steady_state_3_comp, which
+solves batches of sets of arguments at once), and OceanModel, its
+generalization to any number of enzymes (and isotopologues) built from a
+table of enzymes, with the sensitivities of the steady state, the Monte
+Carlo propagation of the errors of the fractionation factors and the lower
+and upper estimates of the kinetic parameters (kinetic_bounds).
+pools: Ocean model with the enzymes as state variables produced from the
+transcripts and decaying with first-order rate constants, with a sparse
+Jacobian for stiff solvers and the steady state of OceanModel as a shortcut.
+regression: Least squares lines of many series at once, e.g. the slopes of
+d34S vs. -ln(f_R) of all the runs of a sweep, and the derivatives of the
+slope.
+seasonal: Ocean model forced with time-varying fluxes of DMSP and
+transcripts (and hence enzymes), and its periodic steady state (e.g. the
+seasonal cycle of d34S) found by stroboscopic sampling with Newton steps on
+the period map.
+simplex: Simplex lattices of the compositions of three enzymes for the ternary
+maps.
+sobol: Saltelli sampling and Sobol first-order and total indices for global
+sensitivity analyses.
+solvers: Common interface to odeint and the solve_ivp methods, reporting the
+number of evaluations of the model and its Jacobian.
+sweeps: Parallel runner of parameter sweeps in chunks, with checkpoints to
+resume interrupted sweeps, and storage of gridded results.
+"""
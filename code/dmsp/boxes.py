@@ -0,0 +1,195 @@
+"""
+Multi-box extension of the steady-state model of DMSP in the ocean. Each box
+(e.g. an ocean region) has its own volume, input flux of DMSP and enzymes,
+as in OceanModel, and exchanges water with the other boxes. The boxes are
+coupled only through the exchange, so the Jacobian is sparse.
+"""
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+from scipy.sparse.linalg import splu
+
+from .isotopes import isotopes, DELTA_IN_OCEAN
+from .ocean import OceanModel, dmsp_ocean, ocean_vol, t_steady_state
+
+
+class MultiBoxModel():
+    """
+    Model of DMSP in n boxes of volume V_b, in which DMSP is degraded in
+    each box as in OceanModel and carried between the boxes by the flows of
+    water:
+
+        dD_b/dt = F_b/V_b - f_out_b(D_b) + (sum_j Q_bj D_j - sum_j Q_jb D_b)/V_b
+
+    for 34DMSP and 32DMSP, with F_b the flux of DMSP into box b and Q_bj the
+    flow of water from box j into box b. The amount of DMSP carried out of a
+    box is the amount carried into the others, so the exchange conserves
+    DMSP for boxes of any volume. The state has shape (2, n), with 34DMSP in
+    the first row, and is flattened as [34DMSP of all the boxes, 32DMSP of
+    all the boxes] for the solvers.
+    Parameters
+    ----------
+    df_enzymes: dataframe.
+    Table of enzymes with the columns of enzyme_table.
+    f_total_in: array-like.
+    [DMSP] that enters each box in nmol/min, as in dmsp_system_3_comp_mm.
+    volumes: array-like.
+    Volume of each box in liters. The flux into each box is divided by its
+    own volume, instead of ocean_vol as in OceanModel.
+    exchange: array-like or sparse matrix.
+    Matrix of shape (n, n) with the flow of water from box j into box b,
+    Q_bj, in l/min. The diagonal is ignored. The water flowing into each box
+    must equal the water flowing out of it, as for a symmetric matrix of
+    exchanges between pairs of boxes.
+    transcripts, kappa_32, alpha, vmax_32, vmax_34: array-like.
+    Parameters of the enzymes in each box with shape (n_enzymes, n),
+    overriding the columns of df_enzymes, as in OceanModel.
+    delta_in: float.
+    Delta 34S of newly synthesized DMSP.
+    """
+    def __init__(self, df_enzymes, f_total_in, volumes, exchange,
+                 transcripts=None, kappa_32=None, alpha=None, vmax_32=None,
+                 vmax_34=None, delta_in=DELTA_IN_OCEAN):
+        f_total_in = np.atleast_1d(np.asarray(f_total_in, dtype=float))
+        self.n_boxes = len(f_total_in)
+        self.volumes = np.broadcast_to(np.asarray(volumes, dtype=float),
+                                       (self.n_boxes,))
+        exchange = sparse.csr_matrix(exchange, dtype=float)
+        if exchange.shape != (self.n_boxes, self.n_boxes):
+            raise ValueError('exchange must have shape (n_boxes, n_boxes)')
+        exchange = exchange - sparse.diags(exchange.diagonal())
+        #Flows of water into (rows) and out of (columns) each box
+        q_in = np.asarray(exchange.sum(axis=1)).ravel()
+        q_out = np.asarray(exchange.sum(axis=0)).ravel()
+        if not np.allclose(q_in, q_out, rtol=1E-9, atol=0):
+            raise ValueError('The water flowing into each box must equal the '
+                             'water flowing out of it')
+        #Degradation in all the boxes at once, as a batch of OceanModel
+        self.boxes = OceanModel(df_enzymes, f_total_in, transcripts=transcripts,
+                                kappa_32=kappa_32, alpha=alpha,
+                                vmax_32=vmax_32, vmax_34=vmax_34,
+                                delta_in=delta_in)
+        if self.boxes.batch_shape != (self.n_boxes,):
+            raise ValueError('The parameters of the enzymes must have shape '
+                             '(n_enzymes, n_boxes)')
+        #OceanModel divides the flux by ocean_vol, use the volume of each box
+        self.boxes.f_in = self.boxes.f_in * (ocean_vol/self.volumes)
+
+        #Mixing operator: Q_bj/V_b off the diagonal and -sum_j Q_jb/V_b on it
+        self.mixing = (sparse.diags(1/self.volumes) @
+                       (exchange - sparse.diags(q_out))).tocsr()
+        self.f_in = self.boxes.f_in
+
+    def rhs(self, c, t=0):
+        """
+        Function that computes dD34_dt and dD32_dt of DMSP in each box in
+        nmol/l/min. c has shape (2, n) or is flattened.
+        """
+        flat = np.ndim(c) == 1
+        dmsp = np.reshape(c, (2, self.n_boxes))
+        dc_dt = self.boxes.rhs(dmsp) + (self.mixing @ dmsp.T).T
+        return dc_dt.ravel() if flat else dc_dt
+
+    def jac(self, c, t=0):
+        """
+        Function that computes the sparse Jacobian of rhs with respect to the
+        flattened state, with shape (2n, 2n). 34DMSP and 32DMSP are
+        independent, so it is block diagonal.
+        """
+        diag = self.boxes.jac_diag(np.reshape(c, (2, self.n_boxes)))
+        return sparse.block_diag([self.mixing + sparse.diags(d) for d in diag],
+                                 format='csc')
+
+    def integrate(self, c, t, method='BDF', **kwargs):
+        """
+        Function that integrates the model with a stiff solver of solve_ivp
+        and the sparse Jacobian.
+        Parameters
+        ----------
+        c: array-like.
+        Initial concentration of 34DMSP and 32DMSP in nM, with shape (2, n)
+        or (2,) for the same concentration in all the boxes.
+        t: array-like.
+        Time points in which the solution is returned, in min.
+        method: str.
+        'BDF', 'Radau' or 'LSODA'.
+        kwargs:
+        Extra keyword arguments passed to solve_ivp (e.g. rtol, atol).
+        Returns
+        -------
+        Array of shape (len(t), 2, n) with the solution and the result of
+        solve_ivp
+        """
+        c0 = self._initial_state(c)
+        t = np.asarray(t, dtype=float)
+        out = solve_ivp(lambda time, y: self.rhs(y, time), (t[0], t[-1]),
+                        c0.ravel(), method=method, t_eval=t,
+                        jac=lambda time, y: self.jac(y, time), **kwargs)
+        return out.y.T.reshape(-1, 2, self.n_boxes), out
+
+    def _initial_state(self, c):
+        if c is None:
+            c = isotopes(dmsp_ocean, delta_in=DELTA_IN_OCEAN)
+        c = np.asarray(c, dtype=float)
+        if c.ndim == 1:
+            c = c[:, None]
+        return np.broadcast_to(c, (2, self.n_boxes)).copy()
+
+    def steady_state(self, c=None, t=None, rtol=1E-9, maxiter=100):
+        """
+        Function that finds the steady state of all the boxes with a damped
+        Newton method in log-concentrations, solving the sparse linear system
+        of each step with a sparse LU factorization. If it does not converge,
+        the model is integrated with BDF until t[-1] instead.
+        Parameters
+        ----------
+        c: array-like.
+        Initial guess of 34DMSP and 32DMSP in nM, shape (2, n) or (2,).
+        Default is the average DMSP concentration.
+        t: array-like.
+        Time points for the fallback integration. Default is t_steady_state.
+        rtol: float.
+        Maximum residual of each box relative to the sum of the fluxes
+        through it (input, degradation and exchange out).
+        maxiter: int.
+        Maximum number of Newton iterations.
+        Returns
+        -------
+        Concentration of 34DMSP and 32DMSP at steady state with shape
+        (2, n), and the method used ('root' or 'BDF')
+        """
+        if t is None:
+            t = t_steady_state
+        c0 = self._initial_state(c)
+        u = np.log(c0)
+        #Rate at which each box loses water to the others
+        k_out = -self.mixing.diagonal()
+
+        converged = False
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            for _ in range(maxiter):
+                x = np.exp(u)
+                residual = self.rhs(x)
+                #The residual of each box is compared with the gross fluxes
+                # through it, so that boxes with little input also converge
+                f_out = self.f_in - self.boxes.rhs(x)
+                gross = self.f_in + f_out + k_out*x
+                if np.all(np.abs(residual) <= rtol*gross):
+                    converged = True
+                    break
+                diag = self.boxes.jac_diag(x)
+                step = np.empty_like(u)
+                for i in range(2):
+                    #Jacobian with respect to log-concentrations
+                    jac_u = ((self.mixing + sparse.diags(diag[i])) @
+                             sparse.diags(x[i])).tocsc()
+                    step[i] = splu(jac_u).solve(-residual[i])
+                if not np.all(np.isfinite(step)):
+                    break
+                #Damp the steps to at most a factor of e^2 in concentration
+                u = u + np.clip(step, -2, 2)
+
+        if converged:
+            return x, 'root'
+        sol, _ = self.integrate(c0, [t[0], t[-1]], method='BDF')
+        return sol[-1], 'BDF'
@@ -0,0 +1,253 @@
+"""
+On-disk cache of the solutions of the DMSP models. Each result is saved as a
+compressed .npz file whose name is a hash of everything that determines it:
+the function that produced it (including the source code of its module and
+of the dmsp package), the parameters, the initial state, the time points and
+the solver options. A result is therefore never served for different
+inputs, and editing a model or the functions that it calls invalidates its
+cached solutions. Failed integrations are not cached.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .solvers import integrate
+
+
+@functools.lru_cache(maxsize=None)
+def _package_source():
+    '''
+    Function that returns a hash of the source code of all the modules of the
+    dmsp package, which the models call (e.g. dmsp.solvers and
+    dmsp.isotopes).
+    '''
+    h = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            h.update(name.encode())
+            with open(os.path.join(directory, name), 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _function_identity(fun):
+    '''
+    Function that returns a string that identifies a function: its name, the
+    source code of the module in which it is defined and the source code of
+    the dmsp package, so that changes to the function or to the functions
+    that it calls in its module or in dmsp change its identity.
+    '''
+    if isinstance(fun, functools.partial):
+        return ('partial', _function_identity(fun.func), fun.args,
+                sorted(fun.keywords.items()))
+    name = f'{getattr(fun, "__module__", None)}.{getattr(fun, "__qualname__", repr(fun))}'
+    module = sys.modules.get(getattr(fun, '__module__', None))
+    try:
+        source = inspect.getsource(module)
+    except (TypeError, OSError):
+        #Functions defined interactively have no source file
+        code = getattr(fun, '__code__', None)
+        source = repr(code.co_code + repr(code.co_consts).encode()) if code else ''
+    return (name + hashlib.sha1(source.encode()).hexdigest() +
+            _package_source())
+
+
+def _update_hash(h, obj):
+    '''
+    Function that adds an object to a hash. Arrays are hashed by dtype, shape
+    and content, so that e.g. time grids of different length never collide,
+    and dataframes and series by their values, index, columns and dtypes.
+    Objects of other types raise a TypeError, since their representation
+    (e.g. repr) may not change with their content.
+    '''
+    if callable(obj) and not isinstance(obj, type):
+        h.update(b'fun')
+        _update_hash(h, _function_identity(obj))
+    elif isinstance(obj, (tuple, list)):
+        h.update(f'seq{len(obj)}'.encode())
+        for item in obj:
+            _update_hash(h, item)
+    elif isinstance(obj, dict):
+        h.update(f'dict{len(obj)}'.encode())
+        for key in sorted(obj):
+            _update_hash(h, key)
+            _update_hash(h, obj[key])
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(type(obj).__name__.encode())
+        if isinstance(obj, pd.DataFrame):
+            _update_hash(h, [str(c) for c in obj.columns])
+            _update_hash(h, [str(d) for d in obj.dtypes])
+        else:
+            _update_hash(h, [str(obj.name), str(obj.dtype)])
+        _update_hash(h, pd.util.hash_pandas_object(obj, index=True).to_numpy())
+    elif isinstance(obj, (np.ndarray, np.generic, int, float, complex, bool)):
+        arr = np.ascontiguousarray(obj)
+        if arr.dtype == object:
+            raise TypeError('Arrays of objects cannot be hashed by value')
+        h.update(f'arr{arr.dtype.str}{arr.shape}'.encode())
+        h.update(arr.tobytes())
+    elif isinstance(obj, (str, bytes)) or obj is None:
+        h.update(f'{type(obj).__name__}{obj!r}'.encode())
+    else:
+        raise TypeError(f'Objects of type {type(obj).__name__} cannot be '
+                        'part of a cache key')
+
+
+def cache_key(fun, *args, **kwargs):
+    '''
+    Function that calculates the key of the result of fun(*args, **kwargs).
+    Callables in args and kwargs (e.g. the right-hand side of a model) are
+    identified by their name and the source code of their module.
+    Returns
+    -------
+    Hexadecimal string
+    '''
+    h = hashlib.sha256()
+    _update_hash(h, (fun, args, kwargs))
+    return h.hexdigest()
+
+
+class SolutionCache():
+    '''
+    Cache of the results of functions that return arrays (e.g. the
+    integrators of the DMSP models), stored as compressed .npz files in a
+    directory. When the files take more than max_bytes, the least recently
+    used ones are deleted.
+    '''
+    def __init__(self, directory, max_bytes=1E9):
+        '''
+        Parameters
+        ----------
+        directory: str.
+        Directory of the cache. It is created if it does not exist.
+        max_bytes: float.
+        Maximum size of the cache in bytes.
+        '''
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key):
+        '''
+        Function that returns the result saved with a key, or None if it is
+        not in the cache.
+        '''
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                items = [data[f'item_{i}'] for i in range(int(data['n_items']))]
+                kinds = list(data['kinds'])
+                single = bool(data['single'])
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            #Missing or unreadable files are recalculated
+            return None
+        #Mark the file as recently used
+        os.utime(path)
+        result = tuple(json.loads(str(item)) if kind == 'json' else item
+                       for item, kind in zip(items, kinds))
+        return result[0] if single else result
+
+    def put(self, key, result):
+        '''
+        Function that saves a result with a key. The result is an array or a
+        tuple of arrays and JSON-serializable objects (e.g. the dictionary
+        with the information of the solver).
+        '''
+        single = not isinstance(result, tuple)
+        items = (result,) if single else result
+        arrays = {}
+        kinds = []
+        for i, item in enumerate(items):
+            if isinstance(item, np.ndarray):
+                arrays[f'item_{i}'] = item
+                kinds.append('array')
+            else:
+                arrays[f'item_{i}'] = np.array(json.dumps(item))
+                kinds.append('json')
+        #Write to a temporary file and rename it, so that other processes
+        # never read a partially written file
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, n_items=len(items), kinds=np.array(kinds),
+                                single=single, **arrays)
+        os.replace(tmp, path)
+        self._evict(keep=os.path.basename(path))
+
+    def _evict(self, keep=None):
+        #Delete the least recently used files until the cache fits max_bytes.
+        # The file that has just been saved is kept even if it is larger.
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') and name != keep:
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        if keep is not None:
+            total += os.stat(os.path.join(self.directory, keep)).st_size
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def invalidate(self, key=None):
+        '''
+        Function that deletes the result saved with a key, or all the results
+        if key is None.
+        Returns
+        -------
+        Number of results deleted
+        '''
+        if key is not None:
+            names = [f'{key}.npz']
+        else:
+            names = [n for n in os.listdir(self.directory) if n.endswith('.npz')]
+        deleted = 0
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def call(self, fun, *args, **kwargs):
+        '''
+        Function that returns fun(*args, **kwargs) from the cache, or
+        calculates it and saves it if it is not in the cache.
+        '''
+        return self._call(None, fun, *args, **kwargs)
+
+    def _call(self, valid, fun, *args, **kwargs):
+        #Results for which valid returns False are not saved
+        key = cache_key(fun, *args, **kwargs)
+        result = self.get(key)
+        if result is None:
+            result = fun(*args, **kwargs)
+            if valid is None or valid(result):
+                self.put(key, result)
+        return result
+
+    def integrate(self, rhs, c, t, args=(), jac=None, method='odeint',
+                  **kwargs):
+        '''
+        Cached version of dmsp.solvers.integrate, with the same parameters
+        and results. The key includes rhs, jac, the initial state, the time
+        points, args, the method and all the solver options. Failed
+        integrations are returned but not saved, so they are attempted again.
+        '''
+        return self._call(lambda result: result[1]['success'], integrate,
+                          rhs, np.asarray(c, dtype=float),
+                          np.asarray(t, dtype=float), tuple(args), jac=jac,
+                          method=method, **kwargs)
@@ -0,0 +1,218 @@
+"""
+Depth-resolved model of DMSP in a water column, discretized in layers by the
+method of lines. DMSP is produced and degraded in each layer as in
+OceanModel, with depth-dependent production and enzymes, and mixed between
+neighbouring layers by eddy diffusion. Each layer is only coupled to the
+layers above and below, so the Jacobian is tridiagonal and is passed to the
+solvers in banded form.
+"""
+import numpy as np
+from scipy import sparse
+from scipy.linalg import solve_banded
+
+from .isotopes import isotopes, DELTA_IN_OCEAN
+from .ocean import OceanModel, dmsp_ocean, ocean_vol, t_steady_state
+from .solvers import integrate
+
+
+class WaterColumnModel():
+    """
+    Model of 34DMSP and 32DMSP in n layers of a water column:
+
+        dD_i/dt = P_i - f_out_i(D_i) - (F_i+1/2 - F_i-1/2)/h_i
+        F_i+1/2 = -Kz_i+1/2 (D_i+1 - D_i)/(z_i+1 - z_i)
+
+    with no flux through the surface and the bottom of the column. The state
+    has shape (2, n), with 34DMSP in the first row, and is flattened as
+    [34DMSP of all the layers, 32DMSP of all the layers] for the solvers.
+    Parameters
+    ----------
+    df_enzymes: dataframe.
+    Table of enzymes with the columns of enzyme_table.
+    edges: array-like.
+    Depths of the n+1 edges of the layers in m, from the surface down.
+    production: array-like.
+    Production of DMSP in each layer in nmol/l/min.
+    kz: float or array-like.
+    Eddy diffusivity in m^2/min, constant or at each edge. The values at the
+    surface and the bottom are not used.
+    transcripts, kappa_32, alpha, vmax_32, vmax_34: array-like.
+    Parameters of the enzymes in each layer with shape (n_enzymes, n),
+    overriding the columns of df_enzymes, as in OceanModel.
+    delta_in: float.
+    Delta 34S of newly synthesized DMSP.
+    """
+    def __init__(self, df_enzymes, edges, production, kz, transcripts=None,
+                 kappa_32=None, alpha=None, vmax_32=None, vmax_34=None,
+                 delta_in=DELTA_IN_OCEAN):
+        self.edges = np.asarray(edges, dtype=float)
+        if self.edges.ndim != 1 or np.any(np.diff(self.edges) <= 0):
+            raise ValueError('edges must be increasing depths')
+        self.depth = 0.5*(self.edges[1:] + self.edges[:-1])
+        self.thickness = np.diff(self.edges)
+        self.n_layers = len(self.depth)
+        production = np.broadcast_to(np.asarray(production, dtype=float),
+                                     (self.n_layers,))
+        kz = np.broadcast_to(np.asarray(kz, dtype=float), self.edges.shape)
+
+        #Degradation in all the layers at once, as a batch of OceanModel.
+        # OceanModel divides the flux in by ocean_vol, so the production is
+        # scaled to give P_i in nmol/l/min
+        self.layers = OceanModel(df_enzymes, production*ocean_vol,
+                                 transcripts=transcripts, kappa_32=kappa_32,
+                                 alpha=alpha, vmax_32=vmax_32,
+                                 vmax_34=vmax_34, delta_in=delta_in)
+        if self.layers.batch_shape != (self.n_layers,):
+            raise ValueError('The parameters of the enzymes must have shape '
+                             '(n_enzymes, n_layers)')
+        self.f_in = self.layers.f_in
+
+        #Exchange rates of each layer with the layers below (lower) and
+        # above (upper) in min^-1
+        conductance = kz[1:-1]/np.diff(self.depth)
+        self.k_down = np.append(conductance/self.thickness[:-1], 0)
+        self.k_up = np.insert(conductance/self.thickness[1:], 0, 0)
+        #Diffusion operator in banded form: upper, main and lower diagonals
+        self.diffusion = np.stack([
+            np.insert(self.k_down[:-1], 0, 0),
+            -(self.k_down + self.k_up),
+            np.append(self.k_up[1:], 0)])
+
+    def rhs(self, c, t=0):
+        """
+        Function that computes dD34_dt and dD32_dt of DMSP in each layer in
+        nmol/l/min. c has shape (2, n) or is flattened.
+        """
+        flat = np.ndim(c) == 1
+        dmsp = np.reshape(c, (2, self.n_layers))
+        mixing = -(self.k_down + self.k_up)*dmsp
+        mixing[:, :-1] += self.k_down[:-1]*dmsp[:, 1:]
+        mixing[:, 1:] += self.k_up[1:]*dmsp[:, :-1]
+        dc_dt = self.layers.rhs(dmsp) + mixing
+        return dc_dt.ravel() if flat else dc_dt
+
+    def jac_banded(self, c, t=0):
+        """
+        Function that computes the Jacobian of rhs with respect to the
+        flattened state in the banded form of odeint and LSODA: an array of
+        shape (3, 2n) with the derivative of equation i with respect to state
+        j in row 1 + i - j.
+        """
+        diag = self.layers.jac_diag(np.reshape(c, (2, self.n_layers)))
+        bands = np.repeat(self.diffusion[:, None], 2, axis=1)
+        bands[1] += diag
+        return bands.reshape(3, -1)
+
+    def jac(self, c, t=0):
+        """
+        Function that computes the Jacobian of rhs as a sparse matrix with
+        shape (2n, 2n), for the BDF and Radau solvers.
+        """
+        bands = self.jac_banded(c, t)
+        return sparse.diags([bands[2, :-1], bands[1], bands[0, 1:]],
+                            [-1, 0, 1], format='csc')
+
+    def _initial_state(self, c):
+        if c is None:
+            c = isotopes(dmsp_ocean, delta_in=DELTA_IN_OCEAN)
+        c = np.asarray(c, dtype=float)
+        if c.ndim == 1:
+            c = c[:, None]
+        return np.broadcast_to(c, (2, self.n_layers)).copy()
+
+    def integrate(self, c, t, method='odeint', **kwargs):
+        """
+        Function that integrates the model with the banded Jacobian for
+        odeint and LSODA, and the sparse one for BDF and Radau.
+        Parameters
+        ----------
+        c: array-like.
+        Initial concentration of 34DMSP and 32DMSP in nM, with shape (2, n)
+        or (2,) for the same concentration in all the layers. Default is the
+        isotopic composition of dmsp_ocean.
+        t: array-like.
+        Time points in which the solution is returned, in min.
+        method: str.
+        One of the methods of dmsp.solvers.integrate.
+        kwargs:
+        Extra keyword arguments passed to the solver (e.g. rtol, atol).
+        Returns
+        -------
+        Array of shape (len(t), 2, n) with the solution and the information
+        of dmsp.solvers.integrate
+        """
+        c0 = self._initial_state(c).ravel()
+        if method == 'odeint':
+            jac = self.jac_banded
+            kwargs.update(ml=1, mu=1)
+            #The first steps in the non-stiff mode of LSODA can take more
+            # than the default 500 steps with many layers
+            kwargs.setdefault('mxstep', 5000)
+        elif method == 'LSODA':
+            jac = self.jac_banded
+            kwargs.update(lband=1, uband=1)
+        else:
+            jac = self.jac
+        sol, info = integrate(self.rhs, c0, t, jac=jac, method=method,
+                              **kwargs)
+        return sol.reshape(-1, 2, self.n_layers), info
+
+    def steady_state(self, c=None, t=None, rtol=1E-9, maxiter=100):
+        """
+        Function that finds the steady state of the column with a damped
+        Newton method in log-concentrations, solving the tridiagonal system
+        of each step of each isotopologue with solve_banded. If it does not
+        converge, the model is integrated with odeint until t[-1] instead.
+        Parameters
+        ----------
+        c: array-like.
+        Initial guess of 34DMSP and 32DMSP in nM, shape (2, n) or (2,).
+        Default is the isotopic composition of dmsp_ocean.
+        t: array-like.
+        Time points for the fallback integration. Default is t_steady_state.
+        rtol: float.
+        Maximum residual of each layer relative to the sum of the fluxes
+        through it (production, degradation and diffusion out).
+        maxiter: int.
+        Maximum number of Newton iterations.
+        Returns
+        -------
+        Concentration of 34DMSP and 32DMSP at steady state with shape
+        (2, n), and the method used ('root' or 'odeint')
+        """
+        if t is None:
+            t = t_steady_state
+        c0 = self._initial_state(c)
+        u = np.log(c0)
+        converged = False
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            for _ in range(maxiter):
+                x = np.exp(u)
+                residual = self.rhs(x)
+                #The residual of each layer is compared with the gross fluxes
+                # through it, so that deep layers with little production
+                # also converge
+                f_out = self.f_in - self.layers.rhs(x)
+                gross = self.f_in + f_out + (self.k_down + self.k_up)*x
+                if np.all(np.abs(residual) <= rtol*gross):
+                    converged = True
+                    break
+                diag = self.layers.jac_diag(x)
+                step = np.empty_like(u)
+                for i in range(2):
+                    #Banded Jacobian with respect to log-concentrations: the
+                    # column j is multiplied by x_j
+                    bands = self.diffusion.copy()
+                    bands[1] += diag[i]
+                    bands *= x[i]
+                    step[i] = solve_banded((1, 1), bands, -residual[i],
+                                           check_finite=False)
+                if not np.all(np.isfinite(step)):
+                    break
+                #Damp the steps to at most a factor of e^2 in concentration
+                u = u + np.clip(step, -2, 2)
+
+        if converged:
+            return x, 'root'
+        sol, _ = self.integrate(c0, [t[0], t[-1]], method='odeint')
+        return sol[-1], 'odeint'
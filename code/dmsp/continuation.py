@@ -0,0 +1,200 @@
+"""
+Continuation of the steady state of OceanModel along a path of parameters,
+e.g. the points of a sweep in order. Each steady state is solved with Newton
+steps seeded with a prediction from the previous ones, so neighbouring
+points of the path converge in a couple of iterations instead of starting
+from the average DMSP concentration each time. Points in which the steady
+state is lost (saturated enzymes) or in which the solver does not converge
+are reported.
+"""
+import numpy as np
+
+from .isotopes import isotopologues, DELTA_IN_OCEAN
+from .ocean import dmsp_ocean
+
+
+def continuation(model, axis=-1, s=None, c=None, rtol=1E-9, maxiter=100):
+    '''
+    Function that finds the steady state of a batched OceanModel by walking
+    along one axis of the batch, with a secant predictor and a Newton
+    corrector in log-concentrations. The other axes of the batch (e.g. the
+    rows of a 2-D grid) are solved at once at each step.
+
+    The rate of degradation of each isotopologue increases strictly with its
+    concentration, up to the rate with all the enzymes saturated. The
+    steady state is therefore unique while the flux in is below that rate
+    and does not exist above it, and the path has no folds: the steady state
+    can only be lost by saturation, which is detected from the parameters.
+    Parameters
+    ----------
+    model: OceanModel.
+    Model whose batch contains the path, e.g. built with the parameters of
+    all the points of a sweep.
+    axis: int.
+    Axis of the batch along which the path runs.
+    s: array-like.
+    Coordinate of each point of the path (e.g. the swept parameter or its
+    logarithm), used to scale the secant predictor. Default is evenly
+    spaced points.
+    c: array-like.
+    Initial guess of the first point, and of the points after a failure.
+    Default is the isotopic composition of dmsp_ocean.
+    rtol: float.
+    Maximum residual relative to the flux of each isotopologue into the
+    system.
+    maxiter: int.
+    Maximum number of Newton iterations of each point.
+    Returns
+    -------
+    Concentration of each isotopologue at steady state with shape
+    (n_isotopologues, *batch), nan where it was not found, the status of
+    each point ('root', 'saturated' or 'failed') and the number of Newton
+    iterations of each point, both with shape batch
+    '''
+    batch_shape = model.batch_shape
+    if batch_shape == ():
+        raise ValueError('The model must have a batch with the path')
+    axis = axis % len(batch_shape)
+    n_path = batch_shape[axis]
+    s = np.arange(n_path, dtype=float) if s is None else np.asarray(s, float)
+    if s.shape != (n_path,):
+        raise ValueError('s must have one value per point of the path')
+
+    #Move the path to the first axis of all the constants of the model
+    def path_first(values, lead):
+        values = np.broadcast_to(values, values.shape[:lead] + batch_shape)
+        return np.moveaxis(values, lead + axis, 0)
+
+    shape = model.kappa_enz.shape
+    f_in = path_first(model.f_in, 1)
+    kappa_enz = path_first(model.kappa_enz, 2)
+    kappa = path_first(np.broadcast_to(model.kappa, shape), 2)
+    vmax = path_first(np.broadcast_to(model.vmax, shape), 2)
+    #Largest rate of degradation, when all the enzymes are saturated. Enzymes
+    # with kappa = 0 do not degrade DMSP
+    with np.errstate(invalid='ignore', divide='ignore'):
+        capacity = np.where(kappa > 0, kappa_enz*vmax/kappa, 0).sum(axis=2)
+
+    if c is None:
+        c = isotopologues(dmsp_ocean, model.mass_numbers,
+                          delta_in=DELTA_IN_OCEAN)
+    c = np.asarray(c, dtype=float)
+    u_cold = np.log(np.broadcast_to(c.reshape(c.shape + (1,)*(
+        f_in.ndim - 1 - c.ndim)), f_in.shape[1:]))
+
+    def residual(k, u):
+        #Relative residual and its derivative with respect to u
+        x = np.exp(u)[:, None]
+        den = vmax[k] + kappa[k]*x
+        rate = (kappa_enz[k]*vmax[k]*x/den).sum(axis=1)
+        slope = -(kappa_enz[k]*vmax[k]**2*x/den**2).sum(axis=1)
+        return (f_in[k] - rate)/f_in[k], slope/f_in[k]
+
+    u_path = np.full(f_in.shape, np.nan)
+    status = np.full((n_path,) + f_in.shape[2:], 'failed', dtype='<U9')
+    iterations = np.zeros((n_path,) + f_in.shape[2:], dtype=int)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for k in range(n_path):
+            #Predictor: secant through the last two points if both
+            # converged, the last point if it converged, or the initial guess
+            u = u_cold.copy()
+            if k >= 1:
+                last = np.isfinite(u_path[k-1])
+                u = np.where(last, u_path[k-1], u)
+            if k >= 2:
+                secant = (u_path[k-1] + (u_path[k-1] - u_path[k-2])*
+                          (s[k] - s[k-1])/(s[k-1] - s[k-2]))
+                #Limited to a factor of e^2 in concentration, and only kept
+                # where it is closer to the steady state than the last point
+                secant = np.clip(secant, u - 2, u + 2)
+                better = (np.abs(residual(k, secant)[0]) <
+                          np.abs(residual(k, u)[0]))
+                u = np.where(np.isfinite(secant) & better, secant, u)
+
+            #Corrector: Newton steps until every isotopologue converges. Each
+            # concentration takes one more step after its residual falls below
+            # rtol. Points without steady state are not solved
+            saturated = np.any(f_in[k] >= capacity[k], axis=0)
+            active = np.broadcast_to(~saturated, u.shape).copy()
+            for _ in range(maxiter):
+                r, slope = residual(k, u)
+                if not np.any(active):
+                    break
+                step = np.clip(r/slope, -2, 2)
+                u = u - np.where(active & np.isfinite(step), step, 0)
+                iterations[k] += np.any(active, axis=0)
+                active &= ~(np.abs(r) <= rtol)
+            r, _ = residual(k, u)
+
+            converged = np.all(np.abs(r) <= rtol, axis=0) & ~saturated
+            status[k] = np.where(converged, 'root',
+                                 np.where(saturated, 'saturated', 'failed'))
+            u_path[k] = np.where(converged, u, np.nan)
+
+    x = np.moveaxis(np.exp(u_path), 0, 1 + axis)
+    return x, np.moveaxis(status, 0, axis), np.moveaxis(iterations, 0, axis)
+
+
+def continuation_path(solve, params, c=None, s=None, jump_tol=1.0):
+    '''
+    Function that walks a path of parameters of a model that is solved one
+    point at a time (e.g. WaterColumnModel or MultiBoxModel), seeding the
+    steady-state solver of each point with a secant prediction from the
+    solutions of the previous points.
+    Parameters
+    ----------
+    solve: callable.
+    Function solve(p, c) that returns the steady state of the model with the
+    parameters p from the initial guess c, and the method used to find it
+    ('root' or the name of the fallback integrator), e.g.
+    lambda p, c: WaterColumnModel(..., kz=p).steady_state(c).
+    params: sequence.
+    Parameters of each point of the path, in order.
+    c: array-like.
+    Initial guess of the first point. Default is the default of solve.
+    s: array-like.
+    Coordinate of each point of the path, used to scale the secant
+    predictor. Default is evenly spaced points.
+    jump_tol: float.
+    Points whose solution differs from the prediction by more than jump_tol
+    in ln(concentration) are reported as jumps: the steady state changes
+    abruptly between them and the previous point. The solver is seeded with
+    the prediction limited to a factor of e^2 from the previous solution,
+    but the difference is measured from the prediction itself, so jumps of
+    any size are reported.
+    Returns
+    -------
+    List with the steady state of each point, and dataframe-ready dictionary
+    with the method of each point, whether it is a jump and the largest
+    difference between the prediction and the solution in ln(concentration)
+    '''
+    n_path = len(params)
+    s = np.arange(n_path, dtype=float) if s is None else np.asarray(s, float)
+    solutions, methods, jumps, misses = [], [], [], []
+    u = []
+    for k, p in enumerate(params):
+        #Predictor: secant through the last two points that converged, in
+        # ln(concentration)
+        guess = c
+        prediction = None
+        if k >= 1 and methods[-1] == 'root':
+            prediction = u[-1]
+            guess = solutions[-1]
+            if k >= 2 and methods[-2] == 'root':
+                prediction = u[-1] + (u[-1] - u[-2])*(s[k] - s[k-1])/(
+                    s[k-1] - s[k-2])
+                #Seed the solver with at most a factor of e^2 of change
+                guess = np.exp(np.clip(prediction, u[-1] - 2, u[-1] + 2))
+        #Corrector: the steady-state solver of the model
+        x, method = solve(p, guess)
+        x = np.asarray(x, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u.append(np.log(x))
+            miss = (np.nanmax(np.abs(u[-1] - prediction))
+                    if prediction is not None else np.nan)
+        solutions.append(x)
+        methods.append(str(method))
+        misses.append(miss)
+        jumps.append(bool(miss > jump_tol))
+    return solutions, {'method': methods, 'jump': jumps,
+                       'prediction_error': misses}
@@ -0,0 +1,233 @@
+"""
+Emulator of the d34S of DMSP at steady state of dmsp_system_3_comp_mm. The
+model is solved once on a regular grid over the composition of transcripts
+of DmdA, Alma1 and DddP and, optionally, over the logarithm of some of the
+other arguments (e.g. the kappas). The emulator then answers batches of
+queries by interpolation on that grid, and refuses to answer outside of it.
+"""
+import json
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+from .ocean import args_3_comp_mm, d34s_steady_state_3_comp, enzyme_table
+from .sweeps import run_sweep
+
+# Default flux of DMSP in nmol/min: annual average for the Mediterranean
+# (Simó et al. 2019) in a surface ocean 200 m deep
+f_total_in_default = (0.000015/60)*7.24E19
+
+
+def simplex_to_square(fr_alma1, fr_dddp, fr_dmda):
+    '''
+    Function that maps compositions of the three enzymes to the unit square
+    (stick-breaking), in which the emulator grid is regular: u is the
+    fraction of Alma1 and v the fraction of the rest that is DddP.
+    '''
+    fr_alma1 = np.asarray(fr_alma1, dtype=float)
+    rest = np.asarray(fr_dddp, dtype=float) + np.asarray(fr_dmda, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        v = np.where(rest > 0, fr_dddp/rest, 0.0)
+    return fr_alma1, v
+
+
+def square_to_simplex(u, v):
+    '''
+    Inverse of simplex_to_square.
+    Returns
+    -------
+    Fractions of Alma1, DddP and DmdA
+    '''
+    return u, v*(1 - u), (1 - v)*(1 - u)
+
+
+class D34sEmulator():
+    '''
+    Interpolator of the d34S of DMSP at steady state over the composition of
+    transcripts and the log10 of some of the arguments of
+    dmsp_system_3_comp_mm. Use D34sEmulator.train to build it and
+    D34sEmulator.load to read a saved one.
+    Parameters
+    ----------
+    axes: list of arrays.
+    Grid points of each axis: u and v of simplex_to_square, followed by the
+    log10 of each argument in log_names.
+    values: array-like.
+    d34S of DMSP at the grid points.
+    log_names: list.
+    Arguments of dmsp_system_3_comp_mm on the log axes.
+    args: dict.
+    Values of the other arguments, and total_transcripts.
+    validation: dict.
+    Errors of the emulator at random points inside the grid.
+    '''
+    def __init__(self, axes, values, log_names, args, validation=None):
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        self.values = np.asarray(values, dtype=float)
+        self.log_names = list(log_names)
+        self.args = dict(args)
+        self.validation = validation
+        self._interp = RegularGridInterpolator(self.axes, self.values,
+                                               method='linear')
+
+    @staticmethod
+    def _model_args(args, log_names, points):
+        #Arguments of dmsp_system_3_comp_mm for points with the coordinates
+        # of the grid, with shape (M, 16)
+        fr_alma1, fr_dddp, fr_dmda = square_to_simplex(points[:, 0],
+                                                        points[:, 1])
+        total = args['total_transcripts']
+        values = dict(args)
+        values.update({'transcripts_d': fr_dmda*total,
+                       'transcripts_c1': fr_alma1*total,
+                       'transcripts_cp': fr_dddp*total})
+        for i, name in enumerate(log_names):
+            values[name] = 10**points[:, 2 + i]
+        return np.stack([np.broadcast_to(values[name], len(points))
+                         for name in args_3_comp_mm], axis=1)
+
+    @classmethod
+    def train(cls, n_simplex=200, log_axes=None, args=None,
+              total_transcripts=3E7, n_validation=2000, seed=None,
+              chunk_size=20000, n_workers=None):
+        '''
+        Function that solves the model on the grid and builds the emulator.
+        Parameters
+        ----------
+        n_simplex: int.
+        Number of intervals of each of the two composition axes.
+        log_axes: dict.
+        Arguments of dmsp_system_3_comp_mm (other than the transcripts) to
+        vary, with a tuple (low, high, number of points) of each one in
+        linear units, e.g. {'kappa_32_c1': (22, 7000, 9)}.
+        args: dict.
+        Values of the other arguments. By default, the values of
+        enzyme_table and a flux of f_total_in_default.
+        total_transcripts: float.
+        Total transcripts of the three enzymes in mRNA/l.
+        n_validation: int.
+        Number of random points in which the emulator is compared with the
+        model.
+        seed: int.
+        Seed of the validation points.
+        chunk_size, n_workers:
+        Arguments of dmsp.sweeps.run_sweep.
+        Returns
+        -------
+        D34sEmulator
+        '''
+        log_axes = {} if log_axes is None else dict(log_axes)
+        unknown = set(log_axes) - set(args_3_comp_mm[:13])
+        if unknown:
+            raise ValueError(f'Cannot emulate {sorted(unknown)}, the log axes '
+                             f'must be in {args_3_comp_mm[:13]}')
+        df_enzymes = enzyme_table().iloc[:3]
+        defaults = {'f_total_in': f_total_in_default}
+        for col, names in [('alpha', args_3_comp_mm[1:4]),
+                           ('kappa_32', args_3_comp_mm[4:7]),
+                           ('vmax_34', args_3_comp_mm[7:10]),
+                           ('vmax_32', args_3_comp_mm[10:13])]:
+            defaults.update(zip(names, df_enzymes[col].to_numpy(dtype=float)))
+        defaults.update({} if args is None else args)
+        fixed = {name: float(value) for name, value in defaults.items()
+                 if name not in log_axes and name in args_3_comp_mm[:13]}
+        fixed['total_transcripts'] = float(total_transcripts)
+        log_names = list(log_axes)
+
+        axes = [np.linspace(0, 1, n_simplex + 1)]*2
+        axes += [np.linspace(np.log10(low), np.log10(high), n)
+                 for low, high, n in log_axes.values()]
+        points = np.stack(np.meshgrid(*axes, indexing='ij'),
+                          axis=-1).reshape(-1, len(axes))
+        values = run_sweep(d34s_steady_state_3_comp,
+                           cls._model_args(fixed, log_names, points),
+                           chunk_size=chunk_size, n_workers=n_workers)
+        emulator = cls(axes, values.reshape([len(a) for a in axes]),
+                       log_names, fixed)
+
+        #Validation at random points: uniform on the simplex and on the log
+        # axes
+        rng = np.random.default_rng(seed)
+        fr = rng.dirichlet(np.ones(3), n_validation)
+        u, v = simplex_to_square(*fr.T)
+        extra = [rng.uniform(a[0], a[-1], n_validation) for a in axes[2:]]
+        points = np.stack([u, v] + extra, axis=1)
+        truth = d34s_steady_state_3_comp(
+            cls._model_args(fixed, log_names, points))
+        error = np.abs(emulator._interp(points) - truth)
+        emulator.validation = {'n_points': int(n_validation),
+                               'max_abs_error': float(error.max()),
+                               'rms_error': float(np.sqrt(np.mean(error**2)))}
+        return emulator
+
+    @property
+    def bounds(self):
+        '''
+        Training box of each log argument, in linear units.
+        '''
+        return {name: (10**a[0], 10**a[-1])
+                for name, a in zip(self.log_names, self.axes[2:])}
+
+    def __call__(self, fr_alma1, fr_dddp, fr_dmda, **log_args):
+        '''
+        Function that returns the emulated d34S of DMSP at steady state.
+        Parameters
+        ----------
+        fr_alma1, fr_dddp, fr_dmda: array-like.
+        Fractions of the transcripts of each enzyme. They must add up to 1.
+        log_args:
+        Values of the arguments on the log axes, in linear units. All of
+        them are required.
+        Returns
+        -------
+        Array of d34S of DMSP, with the broadcast shape of the inputs
+        '''
+        missing = set(self.log_names) - set(log_args)
+        extra = set(log_args) - set(self.log_names)
+        if missing or extra:
+            raise ValueError(f'The emulator takes the arguments '
+                             f'{self.log_names}')
+        inputs = np.broadcast_arrays(
+            *[np.asarray(x, dtype=float) for x in
+              [fr_alma1, fr_dddp, fr_dmda] +
+              [log_args[name] for name in self.log_names]])
+        fr = np.stack(inputs[:3])
+        if np.any(fr < -1E-12) or np.any(np.abs(fr.sum(axis=0) - 1) > 1E-9):
+            raise ValueError('The fractions must be non-negative and add up '
+                             'to 1')
+        u, v = simplex_to_square(*np.clip(fr, 0, None))
+        coords = [u, v]
+        for name, a, x in zip(self.log_names, self.axes[2:], inputs[3:]):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_x = np.log10(x)
+            #Do not extrapolate, beyond rounding errors at the edges
+            tol = 1E-12*(a[-1] - a[0])
+            if np.any(~(log_x >= a[0] - tol)) or np.any(~(log_x <= a[-1] + tol)):
+                low, high = 10**a[0], 10**a[-1]
+                raise ValueError(f'{name} is outside the training range '
+                                 f'[{low:.4g}, {high:.4g}] of the emulator')
+            coords.append(np.clip(log_x, a[0], a[-1]))
+        points = np.stack([np.ravel(x) for x in coords], axis=1)
+        return self._interp(points).reshape(inputs[0].shape)
+
+    def save(self, path):
+        '''
+        Function that saves the emulator, with its validation error, to a
+        .npz file.
+        '''
+        meta = {'log_names': self.log_names, 'args': self.args,
+                'validation': self.validation}
+        np.savez_compressed(path, values=self.values, meta=json.dumps(meta),
+                            **{f'axis_{i}': a for i, a in enumerate(self.axes)})
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Function that loads an emulator saved with save.
+        '''
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            axes = [data[f'axis_{i}'] for i in range(data['values'].ndim)]
+            values = data['values']
+        return cls(axes, values, meta['log_names'], meta['args'],
+                   meta['validation'])
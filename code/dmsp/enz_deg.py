@@ -0,0 +1,951 @@
+"""
+Enzyme degradation model of DMSP, in which a single enzyme cleaves 34DMSP and
+32DMSP with Michaelis-Menten kinetics while losing activity with first-order
+kinetics.
+"""
+from functools import partial
+
+import numpy as np
+from scipy.integrate import odeint
+
+from .isotopes import (isotopes, isotopologues_to_delta, lin_approx,
+                       mass_law_exponent, R34_VCDT, R_VCDT, DELTA_IN_ASSAY,
+                       MASS_NUMBERS)
+from .logratio import from_log_ratio, log_ratio_rhs, to_log_ratio
+from .regression import linregress_batch, slope_derivative
+from .sweeps import run_sweep
+
+# Parameters of dmsp_enz_deg after the state and the time, in order
+param_names = ('alpha', 'vmax', 'vmax_32', 'kappa_32', 'k')
+
+
+def dmsp_enz_deg(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k
+):
+    """
+    Function that computes dD32_dt and dD34_dt of DMSP
+    Parameters
+    ----------
+    c: array-like.
+    Concentration of enzyme, 34DMSP and 32DMSP in nM.
+    t: int
+    Integration time in min.
+    alpha: float.
+    Alpha for cleavage by DddP from this study.
+    vmax: float.
+    Vmax for cleavage by DddP, calculated from the K M that the enzyme should
+    have to exhibit the pattern of d34S DMSP vs. time, in nM/min/nM enzyme
+    vmax_32: float.
+    32^Vmax for cleavage by DddP, in nM/min/nM enzyme.
+    kappa_32: float.
+    Ratio of 32^Vmax to 32^K_M.
+    k: float.
+    Degradation rate of the enzyme, in min^-1.
+
+    Returns
+    -------
+    The dE_dt, dD34_dt and dD32_dt
+    """
+    # Unpack isotopes
+    enzyme, dmsp_34, dmsp_32 = c
+
+    #Calculate vmax_34 assuming that Vmax total = Vmax_32 + Vmax_34
+    #This assumption would only hold true at saturation
+    vmax_34 = vmax-vmax_32
+
+    #Determination of kappa 32 from kappa 34 and the fractionation factor
+    kappa_34 = kappa_32 * alpha
+
+    # Calculate dD34_dt
+    dD34_dt = - ((kappa_34 * enzyme * (vmax_34 * enzyme * dmsp_34/
+    ((vmax_34 * enzyme)+(kappa_34 * enzyme * dmsp_34)))))
+
+    # Calculate dD32_dt
+    dD32_dt = - ((kappa_32 * enzyme * (vmax_32 * enzyme * dmsp_32/
+    ((vmax_32 * enzyme)+(kappa_32 * enzyme * dmsp_32)))))
+
+    #Calculate dE_dt
+    dE_dt = -k*enzyme
+
+    return [dE_dt, dD34_dt, dD32_dt]
+
+
+def dmsp_enz_deg_jac(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k
+):
+    """
+    Function that computes the Jacobian of dmsp_enz_deg, i.e. the partial
+    derivatives of dE_dt, dD34_dt and dD32_dt with respect to the enzyme,
+    34DMSP and 32DMSP. The arguments are the same as in dmsp_enz_deg.
+
+    Returns
+    -------
+    3 x 3 array with the Jacobian
+    """
+    # Unpack isotopes
+    enzyme, dmsp_34, dmsp_32 = c
+
+    vmax_34 = vmax-vmax_32
+    kappa_34 = kappa_32 * alpha
+
+    #Denominators of the Michaelis-Menten terms
+    den_34 = vmax_34 + kappa_34 * dmsp_34
+    den_32 = vmax_32 + kappa_32 * dmsp_32
+
+    jac = np.zeros((3, 3))
+    #Derivatives of dE_dt
+    jac[0, 0] = -k
+    #Derivatives of dD34_dt with respect to the enzyme and 34DMSP
+    jac[1, 0] = -kappa_34 * vmax_34 * dmsp_34/den_34
+    jac[1, 1] = -kappa_34 * enzyme * vmax_34**2/den_34**2
+    #Derivatives of dD32_dt with respect to the enzyme and 32DMSP
+    jac[2, 0] = -kappa_32 * vmax_32 * dmsp_32/den_32
+    jac[2, 2] = -kappa_32 * enzyme * vmax_32**2/den_32**2
+
+    return jac
+
+
+def dmsp_enz_deg_param_jac(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k
+):
+    """
+    Function that computes the partial derivatives of dE_dt, dD34_dt and
+    dD32_dt of dmsp_enz_deg with respect to its parameters. The arguments
+    are the same as in dmsp_enz_deg.
+
+    Returns
+    -------
+    3 x 5 array with the derivatives with respect to alpha, vmax, vmax_32,
+    kappa_32 and k, in the order of param_names
+    """
+    # Unpack isotopes
+    enzyme, dmsp_34, dmsp_32 = c
+
+    vmax_34 = vmax-vmax_32
+    kappa_34 = kappa_32 * alpha
+
+    #Denominators of the Michaelis-Menten terms
+    den_34 = vmax_34 + kappa_34 * dmsp_34
+    den_32 = vmax_32 + kappa_32 * dmsp_32
+
+    #Derivatives of the rate of consumption of 34DMSP with respect to
+    # 34Vmax and 34kappa, and of 32DMSP with respect to 32Vmax and 32kappa
+    dr34_dvmax = kappa_34**2 * enzyme * dmsp_34**2/den_34**2
+    dr34_dkappa = enzyme * vmax_34**2 * dmsp_34/den_34**2
+    dr32_dvmax = kappa_32**2 * enzyme * dmsp_32**2/den_32**2
+    dr32_dkappa = enzyme * vmax_32**2 * dmsp_32/den_32**2
+
+    jac = np.zeros((3, 5))
+    #dE_dt only depends on k
+    jac[0, 4] = -enzyme
+    #vmax_34 = vmax - vmax_32 and kappa_34 = kappa_32 * alpha
+    jac[1, 0] = -dr34_dkappa * kappa_32
+    jac[1, 1] = -dr34_dvmax
+    jac[1, 2] = dr34_dvmax
+    jac[1, 3] = -dr34_dkappa * alpha
+    jac[2, 2] = -dr32_dvmax
+    jac[2, 3] = -dr32_dkappa
+
+    return jac
+
+
+def dmsp_enz_deg_sensitivity(y, t, alpha, vmax, vmax_32, kappa_32, k, scale):
+    """
+    Right-hand side of dmsp_enz_deg augmented with the forward sensitivities
+    S = d state/d parameters, dS/dt = J S + df/dparameters. The sensitivities
+    are scaled by the magnitude of each parameter, so that they all have
+    similar size for the error control of the solver.
+    Parameters
+    ----------
+    y: array-like.
+    The 3 concentrations followed by the 3 x 5 scaled sensitivities,
+    flattened.
+    t: int
+    Integration time in min.
+    alpha, vmax, vmax_32, kappa_32, k: float.
+    Parameters of dmsp_enz_deg.
+    scale: array-like.
+    Scale of each parameter.
+
+    Returns
+    -------
+    Time derivative of y
+    """
+    c = y[:3]
+    sens = y[3:].reshape(3, 5)
+    params = (alpha, vmax, vmax_32, kappa_32, k)
+    jac = dmsp_enz_deg_jac(c, t, *params)
+    dsens_dt = jac @ sens + dmsp_enz_deg_param_jac(c, t, *params) * scale
+    return np.concatenate([dmsp_enz_deg(c, t, *params), dsens_dt.ravel()])
+
+
+def integrate_sensitivity(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k,
+    **kwargs
+):
+    """
+    Function that integrates dmsp_enz_deg together with the derivatives of
+    the state with respect to all its parameters (forward sensitivities) in a
+    single call to odeint.
+    Parameters
+    ----------
+    c: array-like.
+    Initial concentration of enzyme, 34DMSP and 32DMSP in nM. It does not
+    depend on the parameters.
+    t: array-like.
+    Time points for integration in min.
+    alpha, vmax, vmax_32, kappa_32, k: float.
+    Parameters of dmsp_enz_deg.
+    kwargs:
+    Extra keyword arguments passed to odeint.
+
+    Returns
+    -------
+    Array of shape (T, 3) with the enzyme, 34DMSP and 32DMSP, and array of
+    shape (T, 3, 5) with their derivatives with respect to each parameter, in
+    the order of param_names
+    """
+    params = np.array([alpha, vmax, vmax_32, kappa_32, k], dtype=float)
+    scale = np.where(params != 0, np.abs(params), 1.0)
+    y0 = np.concatenate([np.asarray(c, dtype=float), np.zeros(15)])
+    sol = odeint(dmsp_enz_deg_sensitivity, y0, t, args=(*params, scale),
+                 **kwargs)
+    return sol[:, :3], sol[:, 3:].reshape(-1, 3, 5)/scale
+
+
+def epsilon_sensitivity(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k,
+    exclude_first=False,
+    **kwargs
+):
+    """
+    Function that calculates the d34S of DMSP and the apparent fractionation
+    (the slope of the linear approximation of d34S vs. -ln(f_R)), together
+    with their derivatives with respect to all the parameters of
+    dmsp_enz_deg, from a single forward sensitivity integration.
+    Parameters
+    ----------
+    c, t, alpha, vmax, vmax_32, kappa_32, k, kwargs:
+    As in integrate_sensitivity.
+    exclude_first: bool.
+    If True, t[0] is not used in the regression.
+
+    Returns
+    -------
+    Array of shape (T,) with the d34S of DMSP, array of shape (T, 5) with its
+    derivatives, apparent 34epsilon and array of shape (5,) with its
+    derivatives, in the order of param_names
+    """
+    sol, sens = integrate_sensitivity(c, t, alpha, vmax, vmax_32, kappa_32, k,
+                                      **kwargs)
+    dmsp_34, dmsp_32 = sol[:, 1], sol[:, 2]
+    d34s = isotopologues_to_delta(dmsp_34, dmsp_32)
+    #d34S = (34DMSP/32DMSP/R_std - 1)*1000
+    d_d34s = (1000/R34_VCDT * (sens[:, 1]/dmsp_32[:, None] -
+              dmsp_34[:, None]*sens[:, 2]/dmsp_32[:, None]**2))
+
+    #-ln(f_R) and the linear approximation of d34S, and their derivatives.
+    # The initial DMSP does not depend on the parameters.
+    total = dmsp_34 + dmsp_32
+    minusnatlog_f_r = -np.log(total/total[0])
+    d_minusnatlog_f_r = -(sens[:, 1] + sens[:, 2])/total[:, None]
+    lin_app_d34s = lin_approx(d34s)
+    d_lin_app_d34s = d_d34s/(1 + d34s[:, None]/1000)
+
+    epsilon, _, _ = linregress_batch(minusnatlog_f_r, lin_app_d34s,
+                                     exclude_first=exclude_first)
+    d_epsilon = slope_derivative(minusnatlog_f_r, lin_app_d34s,
+                                 d_minusnatlog_f_r, d_lin_app_d34s,
+                                 exclude_first=exclude_first)
+    return d34s, d_d34s, epsilon, d_epsilon
+
+
+def dmsp_enz_deg_ensemble(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k
+):
+    """
+    Vectorized version of dmsp_enz_deg for an ensemble of N parameter sets.
+    The state of member i is stored in c[3*i:3*i+3], so the Jacobian of the
+    ensemble is block diagonal with a bandwidth of 2.
+    Parameters
+    ----------
+    c: array-like.
+    Flattened (N, 3) array with the concentration of enzyme, 34DMSP and
+    32DMSP of each member in nM.
+    t: int
+    Integration time in min.
+    alpha, vmax, vmax_32, kappa_32, k: arrays of length N.
+    Parameters of each member, as in dmsp_enz_deg.
+
+    Returns
+    -------
+    Flattened (N, 3) array with dE_dt, dD34_dt and dD32_dt of each member
+    """
+    # Unpack isotopes of all the members
+    state = c.reshape(-1, 3)
+    enzyme = state[:, 0]
+    dmsp_34 = state[:, 1]
+    dmsp_32 = state[:, 2]
+
+    vmax_34 = vmax-vmax_32
+    kappa_34 = kappa_32 * alpha
+
+    dc_dt = np.empty_like(state)
+    #Calculate dE_dt
+    dc_dt[:, 0] = -k*enzyme
+    # Calculate dD34_dt. The enzyme concentration cancels out of the
+    # denominator of the Michaelis-Menten term.
+    dc_dt[:, 1] = -(kappa_34 * enzyme * vmax_34 * dmsp_34/
+                    (vmax_34 + kappa_34 * dmsp_34))
+    # Calculate dD32_dt
+    dc_dt[:, 2] = -(kappa_32 * enzyme * vmax_32 * dmsp_32/
+                    (vmax_32 + kappa_32 * dmsp_32))
+
+    return dc_dt.ravel()
+
+
+def integrate_ensemble(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k,
+    log_ratio=False,
+    **kwargs
+):
+    """
+    Function that integrates dmsp_enz_deg for N parameter sets in a single
+    call to odeint.
+    Parameters
+    ----------
+    c: array-like.
+    Initial concentration of enzyme, 34DMSP and 32DMSP in nM. Either a single
+    state of shape (3,) shared by all the members or an array of shape (N, 3).
+    t: array-like.
+    Time points for integration in min.
+    alpha, vmax, vmax_32, kappa_32, k: float or array-like.
+    Parameters of dmsp_enz_deg. They are broadcast against each other to
+    N members.
+    log_ratio: bool.
+    If True, integrate ln(34DMSP + 32DMSP) and ln(34DMSP/32DMSP) instead of
+    the concentrations (see dmsp.logratio), which resolves d34S with fewer
+    steps. The solution is returned as concentrations in both cases.
+    kwargs:
+    Extra keyword arguments passed to odeint.
+
+    Returns
+    -------
+    Array of shape (N, T, 3) with the enzyme, 34DMSP and 32DMSP of each member
+    at each time point
+    """
+    params = np.broadcast_arrays(*[np.atleast_1d(np.asarray(p, dtype=float))
+                                   for p in (alpha, vmax, vmax_32, kappa_32, k)])
+    n = params[0].size
+    params = tuple(p.ravel() for p in params)
+    c0 = np.broadcast_to(np.asarray(c, dtype=float), (n, 3))
+
+    # The members are independent, so tell LSODA that the Jacobian is banded
+    # in case it switches to the stiff method.
+    kwargs.setdefault('ml', 2)
+    kwargs.setdefault('mu', 2)
+    if not log_ratio:
+        sol = odeint(dmsp_enz_deg_ensemble, c0.ravel(), t, args=params,
+                     **kwargs)
+        return sol.reshape(len(t), n, 3).transpose(1, 0, 2)
+
+    rhs = log_ratio_rhs(lambda c, t, *args: dmsp_enz_deg_ensemble(
+        c, t, *args).reshape(-1, 3), iso=(1, 2))
+    sol = odeint(lambda y, t, *args: rhs(y.reshape(-1, 3), t, *args).ravel(),
+                 to_log_ratio(c0, iso=(1, 2)).ravel(), t, args=params,
+                 **kwargs)
+    return from_log_ratio(sol.reshape(len(t), n, 3).transpose(1, 0, 2),
+                          iso=(1, 2))
+
+
+def saturation(c, alpha, vmax, vmax_32, kappa_32):
+    """
+    Function that computes the saturation of the enzyme by each
+    isotopologue, kappa_i*D_i/Vmax_i = D_i/K_M_i. When it is small, the
+    Michaelis-Menten terms of dmsp_enz_deg are first order in DMSP.
+    Parameters
+    ----------
+    c: array-like.
+    Concentration of enzyme, 34DMSP and 32DMSP in nM, with shape (..., 3).
+    alpha, vmax, vmax_32, kappa_32: float or array-like.
+    Parameters of dmsp_enz_deg.
+
+    Returns
+    -------
+    Array of shape (..., 2) with the saturation by 34DMSP and 32DMSP
+    """
+    c = np.asarray(c, dtype=float)
+    vmax_34 = np.asarray(vmax)-vmax_32
+    kappa_34 = np.asarray(kappa_32) * alpha
+    return np.stack(np.broadcast_arrays(kappa_34 * c[..., 1]/vmax_34,
+                                        kappa_32 * c[..., 2]/vmax_32), axis=-1)
+
+
+def integrate_closed_form(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k,
+    first_order=False,
+    maxiter=50
+):
+    """
+    Function that solves dmsp_enz_deg analytically for N parameter sets.
+    The enzyme decays as E(t) = E0 exp(-k t), and each isotopologue is
+    consumed independently, so dividing dD/dt by the Michaelis-Menten term
+    and integrating gives
+
+        ln(D/D0) + kappa (D - D0)/Vmax = -kappa I(t)
+        I(t) = E0 (1 - exp(-k t))/k
+
+    which is solved for ln(D/D0) with a few Newton steps. Far below
+    saturation (y0 = kappa D0/Vmax << 1) this reduces to first-order
+    kinetics, D = D0 exp(-kappa I(t)), i.e. Rayleigh fractionation of 34DMSP
+    and 32DMSP.
+    Parameters
+    ----------
+    c: array-like.
+    Initial concentration of enzyme, 34DMSP and 32DMSP in nM, with shape (3,)
+    or (N, 3).
+    t: array-like.
+    Time points in min, starting at the time of c.
+    alpha, vmax, vmax_32, kappa_32, k: float or array-like.
+    Parameters of dmsp_enz_deg, broadcast to N members as in
+    integrate_ensemble. Vmax_34 = vmax - vmax_32 and kappa_32 must be
+    positive.
+    first_order: bool.
+    If True, return the first-order solution instead of the exact one.
+    maxiter: int.
+    Maximum number of Newton steps of the exact solution.
+
+    Returns
+    -------
+    Array of shape (N, T, 3) with the enzyme, 34DMSP and 32DMSP of each member
+    at each time point
+    """
+    params = np.broadcast_arrays(*[np.atleast_1d(np.asarray(p, dtype=float))
+                                   for p in (alpha, vmax, vmax_32, kappa_32, k)])
+    alpha, vmax, vmax_32, kappa_32, k = (p.ravel()[:, None] for p in params)
+    n = alpha.shape[0]
+    c0 = np.broadcast_to(np.asarray(c, dtype=float), (n, 3))
+    time = np.asarray(t, dtype=float)[None, :] - np.asarray(t, dtype=float)[0]
+
+    #Integral of the enzyme over time, E0 t when k = 0
+    kt = k*time
+    with np.errstate(invalid='ignore', divide='ignore'):
+        decay = np.where(kt == 0, 1, -np.expm1(-kt)/kt)
+    integral = c0[:, :1]*time*decay
+
+    sol = np.empty((n, time.shape[1], 3))
+    sol[..., 0] = c0[:, :1]*np.exp(-kt)
+    vmax_iso = [vmax-vmax_32, vmax_32]
+    kappa_iso = [kappa_32 * alpha, kappa_32]
+    for i in range(2):
+        dmsp_0 = c0[:, i+1:i+2]
+        if first_order:
+            sol[..., i+1] = dmsp_0*np.exp(-kappa_iso[i]*integral)
+            continue
+        #Solve u + y0 (exp(u) - 1) = -kappa I for u = ln(D/D0) with Newton
+        # steps. The left side is increasing and convex, and
+        # u = -kappa I/(1 + y0) is above the root, so the steps decrease
+        # monotonically to the root
+        y0 = kappa_iso[i]*dmsp_0/vmax_iso[i]
+        rate = kappa_iso[i]*integral
+        u = -rate/(1 + y0)
+        for _ in range(maxiter):
+            step = (u + y0*np.expm1(u) + rate)/(1 + y0*np.exp(u))
+            u = u - step
+            if np.all(np.abs(step) <= 1E-14*(1 + np.abs(u))):
+                break
+        sol[..., i+1] = dmsp_0*np.exp(u)
+    return sol
+
+
+def integrate_fast(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k,
+    d34s_tol=1E-3,
+    **kwargs
+):
+    """
+    Function that solves dmsp_enz_deg for N parameter sets with the cheapest
+    method that is accurate for each one:
+
+    - 'first_order': Rayleigh solution of integrate_closed_form, when the
+    bound of its error in d34S is below d34s_tol.
+    - 'closed_form': exact solution of integrate_closed_form, when the enzyme
+    is saturated enough for the first-order solution to be off.
+    - 'odeint': numerical integration with integrate_ensemble, for the
+    parameter sets without a closed form (Vmax_34 <= 0, kappa <= 0 or no
+    DMSP).
+
+    The first-order solution underestimates ln(D_i) by kappa_i (D0_i -
+    D_i)/Vmax_i, between 0 and the saturation at t = 0, y0_i, so its error in
+    ln(34DMSP/32DMSP) is at most max(y0_34, y0_32) and its error in d34S at
+    most (1000 + d34S) (exp(max(y0_34, y0_32)) - 1). The bound is computed
+    from the parameters before solving, with the largest d34S of the
+    first-order solution.
+    Parameters
+    ----------
+    c: array-like.
+    Initial concentration of enzyme, 34DMSP and 32DMSP in nM, with shape (3,)
+    or (N, 3).
+    t: array-like.
+    Time points for integration in min.
+    alpha, vmax, vmax_32, kappa_32, k: float or array-like.
+    Parameters of dmsp_enz_deg, broadcast to N members as in
+    integrate_ensemble.
+    d34s_tol: float.
+    Largest error in the d34S of DMSP allowed for the first-order solution,
+    in permil.
+    kwargs:
+    Extra keyword arguments passed to odeint.
+
+    Returns
+    -------
+    Array of shape (N, T, 3) with the enzyme, 34DMSP and 32DMSP of each member
+    at each time point, the method used for each member and the bound of the
+    error in d34S of the first-order solution of each member (nan for the
+    members integrated with odeint)
+    """
+    params = np.broadcast_arrays(*[np.atleast_1d(np.asarray(p, dtype=float))
+                                   for p in (alpha, vmax, vmax_32, kappa_32, k)])
+    params = tuple(p.ravel() for p in params)
+    alpha, vmax, vmax_32, kappa_32, k = params
+    n = alpha.size
+    c0 = np.broadcast_to(np.asarray(c, dtype=float), (n, 3))
+
+    #Integral of the enzyme until the end of the run, E0 t when k = 0
+    duration = np.asarray(t, dtype=float)[-1] - np.asarray(t, dtype=float)[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        integral = c0[:, 0]*duration*np.where(
+            k*duration == 0, 1, -np.expm1(-k*duration)/(k*duration))
+    #Bound of the error of the first-order solution. Its 34R changes
+    # monotonically by exp(kappa_32 (1 - alpha) I(t)), so the largest d34S
+    # is at the start or the end of the run
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y0 = saturation(c0, alpha, vmax, vmax_32, kappa_32).max(axis=1)
+    d34s_0 = isotopologues_to_delta(c0[:, 1], c0[:, 2])
+    with np.errstate(invalid='ignore', over='ignore'):
+        bound = ((1000 + d34s_0)*np.maximum(
+            1, np.exp(kappa_32*(1 - alpha)*integral))*np.expm1(y0))
+
+    #Parameter sets with a closed form
+    valid = ((vmax-vmax_32 > 0) & (vmax_32 > 0) & (kappa_32 > 0) &
+             (kappa_32 * alpha > 0) & np.all(c0[:, 1:] > 0, axis=1))
+    bound[~valid] = np.nan
+    method = np.full(n, 'odeint', dtype=object)
+    method[valid & (bound <= d34s_tol)] = 'first_order'
+    method[valid & ~(bound <= d34s_tol)] = 'closed_form'
+
+    sol = np.empty((n, len(t), 3))
+    for name in ['first_order', 'closed_form', 'odeint']:
+        select = method == name
+        if not np.any(select):
+            continue
+        args = tuple(p[select] for p in params)
+        if name == 'odeint':
+            sol[select] = integrate_ensemble(c0[select], t, *args, **kwargs)
+        else:
+            sol[select] = integrate_closed_form(
+                c0[select], t, *args, first_order=name == 'first_order')
+    return sol, method, bound
+
+
+def multi_isotope_params(
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    mass_numbers=MASS_NUMBERS,
+    law='equilibrium'
+):
+    """
+    Function that calculates kappa and Vmax of each isotopologue of DMSP from
+    the parameters of dmsp_enz_deg. The kappa of isotopologue x is
+    kappa_32 * alpha^theta_x, with theta_x from the mass law (see
+    mass_law_exponent). 34DMSP keeps Vmax_34 = vmax - vmax_32, and the Vmax
+    of the other heavy isotopologues is scaled by their abundance relative to
+    34S in the standard, xR/34R, so that all the heavy isotopologues are
+    equally saturated. Each isotopologue is degraded independently, so from
+    the same initial 34DMSP and 32DMSP their trajectories are those of
+    dmsp_enz_deg.
+    Parameters
+    ----------
+    alpha, vmax, vmax_32, kappa_32: float.
+    Parameters of dmsp_enz_deg, with alpha the fractionation factor of 34S.
+    mass_numbers: tuple.
+    Mass numbers of the isotopologues, with 32 last.
+    law: str.
+    Mass law of the fractionation factors, 'equilibrium' or 'kinetic'.
+
+    Returns
+    -------
+    Arrays with kappa and Vmax of each isotopologue
+    """
+    theta = mass_law_exponent(mass_numbers, law)
+    scale = np.array([R_VCDT[x]/R34_VCDT for x in mass_numbers[:-1]])
+    kappa = kappa_32 * alpha**theta
+    vmax_iso = np.append((vmax-vmax_32)*scale, vmax_32)
+    return kappa, vmax_iso
+
+
+def dmsp_enz_deg_multi(c, t, kappa, vmax, k):
+    """
+    Version of dmsp_enz_deg for any set of isotopologues, vectorized over the
+    isotopologues.
+    Parameters
+    ----------
+    c: array-like.
+    Concentration of enzyme and of each isotopologue of DMSP in nM.
+    t: int
+    Integration time in min.
+    kappa, vmax: array-like.
+    Kappa and Vmax of each isotopologue, e.g. from multi_isotope_params.
+    k: float.
+    Degradation rate of the enzyme, in min^-1.
+
+    Returns
+    -------
+    Array with dE_dt and the derivative of each isotopologue
+    """
+    enzyme = c[0]
+    dmsp = np.asarray(c[1:])
+
+    dc_dt = np.empty(len(dmsp) + 1)
+    #Calculate dE_dt
+    dc_dt[0] = -k*enzyme
+    #Calculate the derivative of each isotopologue
+    dc_dt[1:] = -(kappa * enzyme * vmax * dmsp/(vmax + kappa * dmsp))
+    return dc_dt
+
+
+def dmsp_enz_deg_multi_jac(c, t, kappa, vmax, k):
+    """
+    Function that computes the Jacobian of dmsp_enz_deg_multi. dE_dt only
+    depends on the enzyme, and each isotopologue on itself and on the
+    enzyme. The arguments are the same as in dmsp_enz_deg_multi.
+    """
+    enzyme = c[0]
+    dmsp = np.asarray(c[1:])
+    den = vmax + kappa * dmsp
+    jac = np.diag(np.concatenate([[-k],
+                                  -kappa * enzyme * vmax**2/den**2]))
+    jac[1:, 0] = -kappa * vmax * dmsp/den
+    return jac
+
+
+def integrate_multi(
+    c,
+    t,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k,
+    mass_numbers=MASS_NUMBERS,
+    law='equilibrium',
+    **kwargs
+):
+    """
+    Function that integrates dmsp_enz_deg_multi with the parameters of
+    dmsp_enz_deg, e.g. to predict the D33S and D36S of DMSP during the
+    assays. With the initial 34DMSP and 32DMSP of dmsp_enz_deg, 34DMSP and
+    32DMSP are those of dmsp_enz_deg. When the same total DMSP is split into
+    more isotopologues (e.g. with isotopologues), 34DMSP and 32DMSP start
+    ~0.8 % lower, which changes their saturation and therefore their d34S:
+    by less than 1E-3 permil in the DddP assay of DMSP_enz_deg.py, and more
+    for enzymes close to saturation.
+    Parameters
+    ----------
+    c: array-like.
+    Initial concentration of enzyme and of each isotopologue of DMSP in nM,
+    in the order of mass_numbers (e.g. (c[0], *isotopologues(dmsp_init))).
+    t: array-like.
+    Time points for integration in min.
+    alpha, vmax, vmax_32, kappa_32, k: float.
+    Parameters of dmsp_enz_deg, with alpha the fractionation factor of 34S.
+    mass_numbers, law:
+    Isotopologues and mass law, as in multi_isotope_params.
+    kwargs:
+    Extra keyword arguments passed to odeint.
+
+    Returns
+    -------
+    Array of shape (T, 1 + n) with the enzyme and each isotopologue at each
+    time point
+    """
+    kappa, vmax_iso = multi_isotope_params(alpha, vmax, vmax_32, kappa_32,
+                                           mass_numbers, law)
+    return odeint(dmsp_enz_deg_multi, np.asarray(c, dtype=float), t,
+                  args=(kappa, vmax_iso, k), Dfun=dmsp_enz_deg_multi_jac,
+                  **kwargs)
+
+
+def dose(enzyme=0, dmsp=0, delta_in=DELTA_IN_ASSAY):
+    """
+    Function that builds the amounts added to the state of dmsp_enz_deg by
+    a dosing event.
+    Parameters
+    ----------
+    enzyme: float or array-like.
+    Enzyme added, in the units of the enzyme of the model.
+    dmsp: float or array-like.
+    DMSP added, in the units of DMSP of the model.
+    delta_in: float.
+    Delta 34S of the DMSP added.
+
+    Returns
+    -------
+    Array of shape (..., 3) with the enzyme, 34DMSP and 32DMSP added
+    """
+    dmsp_34, dmsp_32 = isotopes(np.asarray(dmsp, dtype=float),
+                                delta_in=delta_in)
+    return np.stack(np.broadcast_arrays(np.asarray(enzyme, dtype=float),
+                                        dmsp_34, dmsp_32), axis=-1)
+
+
+def integrate_events(
+    c,
+    t,
+    events,
+    alpha,
+    vmax,
+    vmax_32,
+    kappa_32,
+    k,
+    **kwargs
+):
+    """
+    Function that integrates dmsp_enz_deg for N parameter sets with
+    discrete additions of enzyme or DMSP during the run, e.g. the Alma1
+    addition experiments. The integration stops at each event, the dose is
+    added to the state and the solver restarts from there, so the solution
+    is one continuous trajectory with jumps at the events.
+    Parameters
+    ----------
+    c: array-like.
+    Initial concentration of enzyme, 34DMSP and 32DMSP, with shape (3,) or
+    (N, 3).
+    t: array-like.
+    Time points in which the solution is returned, in min. At the time of
+    an event the state after the dose is returned.
+    events: list.
+    Pairs (time, amounts) with the time of each event in min and the amounts
+    of enzyme, 34DMSP and 32DMSP added, with shape (3,) or (N, 3) (see
+    dose). Events after t[-1] are ignored.
+    alpha, vmax, vmax_32, kappa_32, k: float or array-like.
+    Parameters of dmsp_enz_deg, broadcast to N members as in
+    integrate_ensemble.
+    kwargs:
+    Extra keyword arguments passed to odeint.
+
+    Returns
+    -------
+    Array of shape (N, T, 3) with the enzyme, 34DMSP and 32DMSP of each member
+    at each time point
+    """
+    t = np.asarray(t, dtype=float)
+    params = np.broadcast_arrays(*[np.atleast_1d(np.asarray(p, dtype=float))
+                                   for p in (alpha, vmax, vmax_32, kappa_32, k)])
+    n = params[0].size
+    state = np.broadcast_to(np.asarray(c, dtype=float), (n, 3)).copy()
+    events = sorted([(float(time), np.asarray(amounts, dtype=float))
+                     for time, amounts in events if time <= t[-1]],
+                    key=lambda event: event[0])
+
+    sol = np.empty((n, len(t), 3))
+    start = t[0]
+    for time, amounts in events + [(None, None)]:
+        end = t[-1] if time is None else max(time, start)
+        #Output times in [start, end), and end itself in the last segment
+        select = (t >= start) & ((t < end) if time is not None else (t <= end))
+        t_segment = np.unique(np.concatenate([[start], t[select], [end]]))
+        if len(t_segment) > 1:
+            segment = integrate_ensemble(state, t_segment, *params, **kwargs)
+            sol[:, select] = segment[:, np.isin(t_segment, t[select])]
+            state = segment[:, -1]
+        else:
+            sol[:, select] = state[:, None]
+        if time is not None:
+            state = state + np.broadcast_to(amounts, (n, 3))
+        start = end
+
+    return sol
+
+
+def epsilon_batch(params, c, t, exclude_first=False, fast=False, **kwargs):
+    """
+    Function that integrates dmsp_enz_deg for a batch of parameter sets and
+    calculates the apparent fractionation of each one, i.e. the slope of the
+    linear approximation of the d34S of DMSP vs. -ln(f_R), as in the
+    epsilon34_variable_* scripts.
+    Parameters
+    ----------
+    params: array-like.
+    Array of shape (N, 5) with alpha, vmax, vmax_32, kappa_32 and k of each
+    parameter set, in the order of param_names.
+    c: array-like.
+    Initial concentration of enzyme, 34DMSP and 32DMSP in nM.
+    t: array-like.
+    Time points for integration in min.
+    exclude_first: bool.
+    If True, t[0] is not used in the regression.
+    fast: bool.
+    If True, solve the model with integrate_fast, analytically for the
+    parameter sets that have a closed form.
+    kwargs:
+    Extra keyword arguments passed to odeint.
+
+    Returns
+    -------
+    Array of shape (N, 4) with the apparent 34epsilon, the r^2 of the
+    regression, and the d34S of DMSP and the fraction of DMSP remaining at
+    the last time point
+    """
+    params = np.asarray(params, dtype=float)
+    if fast:
+        dmsp_iso, _, _ = integrate_fast(c, t, *params.T, **kwargs)
+    else:
+        dmsp_iso = integrate_ensemble(c, t, *params.T, **kwargs)
+    d34s = isotopologues_to_delta(dmsp_iso[:, :, 1], dmsp_iso[:, :, 2])
+    total = dmsp_iso[:, :, 1] + dmsp_iso[:, :, 2]
+    f_r = total/total[:, :1]
+    #Parameter sets that consume all the DMSP give nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        epsilon, _, r2 = linregress_batch(-np.log(f_r), lin_approx(d34s),
+                                          exclude_first=exclude_first)
+    return np.stack([epsilon, r2, d34s[:, -1], f_r[:, -1]], axis=1)
+
+
+def epsilon_surface(axes, c, t, chunk_size=500, n_workers=None,
+                    checkpoint_dir=None, exclude_first=False, fast=False,
+                    **params):
+    """
+    Function that calculates the apparent fractionation of dmsp_enz_deg on
+    the grid of two of its parameters, with all the other parameters fixed.
+    The grid is split into batches that are integrated with
+    integrate_ensemble in parallel processes with dmsp.sweeps.run_sweep.
+    Parameters
+    ----------
+    axes: dict.
+    Two items with the name of a parameter of dmsp_enz_deg (one of
+    param_names) and the array of its values, e.g.
+    {'k': np.linspace(0, 1, 200), 'vmax_32': np.linspace(1E6, 1E9, 200)}.
+    c: array-like.
+    Initial concentration of enzyme, 34DMSP and 32DMSP in nM.
+    t: array-like.
+    Time points for integration in min.
+    chunk_size: int.
+    Number of grid points integrated together.
+    n_workers: int.
+    Number of processes. Default is the number of CPUs.
+    checkpoint_dir: str.
+    Directory to save the finished batches and resume an interrupted
+    calculation. None disables the checkpoint.
+    exclude_first: bool.
+    If True, t[0] is not used in the regression.
+    fast: bool.
+    If True, solve the model with integrate_fast instead of odeint.
+    params:
+    Values of the other parameters of dmsp_enz_deg.
+
+    Returns
+    -------
+    Dictionary in the format of xarray.Dataset.to_dict, with the values of
+    both parameters as coordinates and the variables epsilon34, r2, d34S_end
+    and f_r_end of epsilon_batch on the grid. It can be saved with
+    dmsp.sweeps.save_grid and converted with xarray.Dataset.from_dict.
+    """
+    if len(axes) != 2:
+        raise ValueError('axes must have exactly two parameters')
+    dims = tuple(axes)
+    unknown = set(dims) | set(params)
+    unknown -= set(param_names)
+    if unknown:
+        raise ValueError(f'Unknown parameters {sorted(unknown)}, they must be '
+                         f'in {param_names}')
+    missing = set(param_names) - set(dims) - set(params)
+    if missing:
+        raise ValueError(f'Missing values of {sorted(missing)}')
+
+    #Parameter sets of all the grid points, with the second axis changing
+    # fastest
+    coords = [np.asarray(axes[name], dtype=float) for name in dims]
+    grid = np.meshgrid(*coords, indexing='ij')
+    values = {**params, dims[0]: grid[0], dims[1]: grid[1]}
+    shape = grid[0].shape
+    param_sets = np.stack([np.broadcast_to(np.asarray(values[name], dtype=float),
+                                           shape).ravel()
+                           for name in param_names], axis=1)
+
+    fun = partial(epsilon_batch, c=np.asarray(c, dtype=float),
+                  t=np.asarray(t, dtype=float), exclude_first=exclude_first,
+                  fast=fast)
+    key = {'c': np.asarray(c, dtype=float).tolist(),
+           't': np.asarray(t, dtype=float).tolist(),
+           'exclude_first': exclude_first, 'fast': fast}
+    results = run_sweep(fun, param_sets, chunk_size=chunk_size,
+                        checkpoint_dir=checkpoint_dir, key=key,
+                        n_workers=n_workers)
+    results = results.reshape(shape + (-1,))
+
+    variables = ['epsilon34', 'r2', 'd34S_end', 'f_r_end']
+    return {
+        'dims': dict(zip(dims, shape)),
+        'coords': {name: {'dims': (name,), 'data': coord}
+                   for name, coord in zip(dims, coords)},
+        'data_vars': {name: {'dims': dims, 'data': results[..., i]}
+                      for i, name in enumerate(variables)},
+        'attrs': {name: float(params[name]) for name in params},
+    }
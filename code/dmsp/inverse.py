@@ -0,0 +1,111 @@
+"""
+Inverse lookup of the ternary maps of the expected d34S of DMSP: the
+compositions of Alma1, DddP and DmdA consistent with an observed d34S.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import Delaunay
+
+from .simplex import ternary_xy
+
+
+class D34sIndex():
+    '''
+    Index of the modelled compositions sorted by d34S, to find all the
+    compositions with a d34S in a range with a binary search. The triangles
+    between neighbouring compositions are indexed too, so that regions
+    narrower than the spacing of the grid are not missed.
+    Parameters
+    ----------
+    fractions: array-like.
+    Array of shape (N, 3) with the fractions of Alma1, DddP and DmdA.
+    d34s: array-like.
+    d34S of DMSP of each composition.
+    '''
+    def __init__(self, fractions, d34s):
+        fractions = np.asarray(fractions, dtype=float)
+        d34s = np.asarray(d34s, dtype=float)
+        order = np.argsort(d34s, kind='stable')
+        self.fractions = fractions[order]
+        self.d34s = d34s[order]
+
+        #Triangulation of the compositions in the coordinates of the ternary
+        # plots, with the range of d34S of each triangle. The triangles are
+        # sorted by their lowest d34S.
+        x, y = ternary_xy(*self.fractions.T)
+        triangles = Delaunay(np.stack([x, y], axis=1)).simplices
+        tri_d34s = self.d34s[triangles]
+        order = np.argsort(tri_d34s.min(axis=1), kind='stable')
+        self.triangles = triangles[order]
+        self.tri_min = tri_d34s.min(axis=1)[order]
+        self.tri_max = tri_d34s.max(axis=1)[order]
+
+    @classmethod
+    def from_csv(cls, path):
+        '''
+        Function that builds the index from a table with the columns
+        fr_alma1, fr_dddp, fr_dmda and d34S, e.g.
+        data/modelling/expected_d34s_DMSP_variable_enz_transcripts.csv.
+        '''
+        df = pd.read_csv(path)
+        return cls(df[['fr_alma1', 'fr_dddp', 'fr_dmda']].to_numpy(),
+                   df['d34S'].to_numpy())
+
+    def query(self, d34s, uncertainty=0):
+        '''
+        Function that returns the modelled compositions with a d34S within
+        d34s +- uncertainty.
+        Parameters
+        ----------
+        d34s: float.
+        Observed d34S of DMSP in permil.
+        uncertainty: float.
+        Uncertainty of the observation in permil.
+        Returns
+        -------
+        Array of shape (M, 3) with the fractions of Alma1, DddP and DmdA and
+        array of M values of d34S, sorted by d34S
+        '''
+        start = np.searchsorted(self.d34s, d34s - uncertainty, side='left')
+        stop = np.searchsorted(self.d34s, d34s + uncertainty, side='right')
+        return self.fractions[start:stop], self.d34s[start:stop]
+
+    def query_triangles(self, d34s, uncertainty=0):
+        '''
+        Function that returns the triangles of the grid in which d34S, as
+        interpolated linearly between the vertices, reaches d34s +-
+        uncertainty. Together they cover the whole feasible region, even
+        where it is narrower than the grid.
+        Parameters
+        ----------
+        d34s: float.
+        Observed d34S of DMSP in permil.
+        uncertainty: float.
+        Uncertainty of the observation in permil.
+        Returns
+        -------
+        Array of shape (K, 3, 3) with the fractions of Alma1, DddP and DmdA
+        of the vertices of each triangle
+        '''
+        #Only the triangles whose lowest d34S is below the upper limit can
+        # overlap the range
+        stop = np.searchsorted(self.tri_min, d34s + uncertainty, side='right')
+        overlap = self.tri_max[:stop] >= d34s - uncertainty
+        return self.fractions[self.triangles[:stop][overlap]]
+
+    def feasible_range(self, d34s, uncertainty=0):
+        '''
+        Function that summarizes the feasible region as the minimum and
+        maximum fraction of each enzyme among the triangles of
+        query_triangles.
+        Returns
+        -------
+        Dataframe with the minimum and maximum fraction of each enzyme, with
+        nan if no modelled composition is consistent with the observation
+        '''
+        vertices = self.query_triangles(d34s, uncertainty).reshape(-1, 3)
+        if len(vertices) == 0:
+            vertices = np.full((1, 3), np.nan)
+        return pd.DataFrame({'min': vertices.min(axis=0),
+                             'max': vertices.max(axis=0)},
+                            index=['fr_alma1', 'fr_dddp', 'fr_dmda'])
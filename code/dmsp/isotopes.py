@@ -0,0 +1,282 @@
+"""
+Isotope algebra for the sulfur isotopic composition of DMSP.
+
+All the functions are written with NumPy operations only, so they accept
+floats, NumPy arrays (of any shape, broadcasting the standard and the delta
+values) and pandas Series (e.g. DataFrame columns), and return an object of
+the same kind without converting it to lists.
+"""
+import numpy as np
+
+# 34R of the VCDT standard. Error = +-0.0093
+R34_VCDT = 0.0450045
+# Delta 34S of the DMSP used in the assays, from Sigma.
+DELTA_IN_ASSAY = 14.3
+# Delta 34S of newly synthesized DMSP in the ocean. Assumed.
+DELTA_IN_OCEAN = 17
+
+# Isotopologues of the multi-isotope models, with 34DMSP first and 32DMSP last
+# as in the models that only track 34S and 32S
+MASS_NUMBERS = (34, 33, 36, 32)
+# Atomic masses of the sulfur isotopes in u
+S_MASSES = {32: 31.97207117, 33: 32.97145891, 34: 33.96786701,
+            36: 35.96708070}
+# xR of the VCDT standard. 33R and 36R from Ding et al. (2001)
+R_VCDT = {33: 0.0078772, 34: R34_VCDT, 36: 0.0001533}
+# Reference exponents of the capital delta notation, D33S and D36S
+CAP_DELTA_EXPONENTS = {33: 0.515, 36: 1.90}
+
+
+def delta_to_ratio(delta, r_std=R34_VCDT):
+    '''
+    Function that converts delta values to isotopic ratios.
+    Parameters
+    ----------
+    delta: float or array-like.
+    Delta 34S in permil.
+    r_std: float.
+    34R of the standard.
+    Returns
+    -------
+    34R
+    '''
+    return ((delta/1000)+1)*r_std
+
+
+def ratio_to_delta(r, r_std=R34_VCDT):
+    '''
+    Function that converts isotopic ratios to delta values.
+    Parameters
+    ----------
+    r: float or array-like.
+    34R.
+    r_std: float.
+    34R of the standard.
+    Returns
+    -------
+    Delta 34S in permil
+    '''
+    return ((r/r_std)-1)*1000
+
+
+def ratio_to_fraction(r):
+    '''
+    Function that converts isotopic ratios to fractional abundances.
+    Parameters
+    ----------
+    r: float or array-like.
+    34R.
+    Returns
+    -------
+    34F
+    '''
+    return r/(1+r)
+
+
+def fraction_to_ratio(f):
+    '''
+    Function that converts fractional abundances to isotopic ratios.
+    Parameters
+    ----------
+    f: float or array-like.
+    34F.
+    Returns
+    -------
+    34R
+    '''
+    return f/(1-f)
+
+
+def delta_to_fraction(delta, r_std=R34_VCDT):
+    '''
+    Function that converts delta values to fractional abundances.
+    Parameters
+    ----------
+    delta: float or array-like.
+    Delta 34S in permil.
+    r_std: float.
+    34R of the standard.
+    Returns
+    -------
+    34F
+    '''
+    return ratio_to_fraction(delta_to_ratio(delta, r_std))
+
+
+def fraction_to_delta(f, r_std=R34_VCDT):
+    '''
+    Function that converts fractional abundances to delta values.
+    Parameters
+    ----------
+    f: float or array-like.
+    34F.
+    r_std: float.
+    34R of the standard.
+    Returns
+    -------
+    Delta 34S in permil
+    '''
+    return ratio_to_delta(fraction_to_ratio(f), r_std)
+
+
+def lin_approx(delta):
+    '''
+    Function that calculates the linear approximation 1000 × ln (1+δ34S/1000)
+    used to get the fractionation factor from the slope of a Rayleigh plot.
+    Parameters
+    ----------
+    delta: float or array-like.
+    Delta 34S in permil.
+    Returns
+    -------
+    1000 × ln (1+δ34S/1000)
+    '''
+    return 1000*np.log1p(delta/1000)
+
+
+def isotopes(c, r_34_std=R34_VCDT, delta_in=DELTA_IN_ASSAY):
+    '''
+    Function that splits a DMSP concentration (or flux) in the proportion of
+    heavy (34) and light (32) atoms.
+    Parameters
+    ----------
+    c: float or array-like.
+    Concentration of DMSP.
+    r_34_std: float.
+    34R of the VCDT standard. Error = +-0.0093
+    delta_in: float or array-like.
+    Delta 34S of the DMSP. Use DELTA_IN_ASSAY for the DMSP used in the assays
+    and DELTA_IN_OCEAN for newly synthesized DMSP.
+    Returns
+    -------
+    Concentration of 34DMSP, concentration of 32DMSP
+    '''
+    # Calculate 34R in DMSP from Eq. 3
+    r_34_dmsp = delta_to_ratio(delta_in, r_34_std)
+    # Calculate 32_DMSP from Eq. 2
+    dmsp_32 = c/(1 + r_34_dmsp)
+    # Calculate 34_DMSP from Eq. 1
+    dmsp_34 = c - dmsp_32
+
+    return dmsp_34, dmsp_32
+
+
+def isotopologues_to_delta(dmsp_34, dmsp_32, r_34_std=R34_VCDT):
+    '''
+    Function that calculates the delta 34S of DMSP from the concentrations of
+    34DMSP and 32DMSP.
+    Parameters
+    ----------
+    dmsp_34: float or array-like.
+    Concentration of 34DMSP.
+    dmsp_32: float or array-like.
+    Concentration of 32DMSP.
+    r_34_std: float.
+    34R of the VCDT standard.
+    Returns
+    -------
+    Delta 34S of DMSP in permil
+    '''
+    return ratio_to_delta(dmsp_34/dmsp_32, r_34_std)
+
+
+def mass_law_exponent(mass_number, law='equilibrium'):
+    '''
+    Function that calculates the exponent theta of the mass-dependent
+    fractionation law xalpha = 34alpha^theta of a sulfur isotope x relative
+    to 32S.
+    Parameters
+    ----------
+    mass_number: int or array-like.
+    Mass number of the isotope (32, 33, 34 or 36).
+    law: str.
+    'equilibrium', theta = (1/m32 - 1/mx)/(1/m32 - 1/m34), or 'kinetic',
+    theta = ln(m32/mx)/ln(m32/m34).
+    Returns
+    -------
+    Theta, 1 for 34S and 0 for 32S
+    '''
+    mass = np.vectorize(S_MASSES.get, otypes=[float])(mass_number)
+    if law == 'equilibrium':
+        return (1/S_MASSES[32] - 1/mass)/(1/S_MASSES[32] - 1/S_MASSES[34])
+    elif law == 'kinetic':
+        return np.log(S_MASSES[32]/mass)/np.log(S_MASSES[32]/S_MASSES[34])
+    raise ValueError(f"Unknown law {law}, use 'equilibrium' or 'kinetic'")
+
+
+def isotopologues(c, mass_numbers=MASS_NUMBERS, delta_in=DELTA_IN_ASSAY,
+                  cap_delta_in=None):
+    '''
+    Function that splits a DMSP concentration (or flux) into any set of
+    isotopologues. It generalizes isotopes, which it reproduces for
+    mass_numbers=(34, 32).
+    Parameters
+    ----------
+    c: float or array-like.
+    Concentration of DMSP.
+    mass_numbers: tuple.
+    Mass numbers of the isotopologues, with 32 last.
+    delta_in: float or array-like.
+    Delta 34S of the DMSP.
+    cap_delta_in: dict.
+    Capital delta of the other heavy isotopes of the DMSP in permil, e.g.
+    {33: 0.1}. Missing isotopes are mass-dependent (capital delta 0).
+    Returns
+    -------
+    Array with the concentration of each isotopologue in the first dimension
+    '''
+    if mass_numbers[-1] != 32:
+        raise ValueError('32 must be the last of mass_numbers')
+    cap_delta_in = {} if cap_delta_in is None else cap_delta_in
+    #xR of each heavy isotope from d34S and the capital delta, with
+    # ln(xR/xR_std) = lambda ln(34R/34R_std) + D/1000
+    lin_34 = lin_approx(np.asarray(delta_in, dtype=float))
+    ratios = [R_VCDT[x]*np.exp((CAP_DELTA_EXPONENTS.get(x, 1)*lin_34 +
+                                cap_delta_in.get(x, 0))/1000)
+              for x in mass_numbers[:-1]]
+    total = sum(ratios)
+    dmsp_32 = c/(1 + total)
+    #The heavy isotopologues share the rest in proportion to their ratios,
+    # so that 34DMSP = c - 32DMSP with only 34S and 32S, as in isotopes
+    heavy = [(c - dmsp_32)*(r/total) for r in ratios]
+    return np.stack(np.broadcast_arrays(*heavy, dmsp_32))
+
+
+def isotopologues_to_deltas(c, mass_numbers=MASS_NUMBERS):
+    '''
+    Function that calculates the delta values of the heavy isotopes from the
+    concentrations of the isotopologues.
+    Parameters
+    ----------
+    c: array-like.
+    Concentrations of the isotopologues in the first dimension, in the
+    order of mass_numbers.
+    mass_numbers: tuple.
+    Mass numbers of the isotopologues, with 32 last.
+    Returns
+    -------
+    Dictionary with the delta of each heavy isotope in permil
+    '''
+    return {x: ratio_to_delta(c[i]/c[-1], R_VCDT[x])
+            for i, x in enumerate(mass_numbers[:-1])}
+
+
+def cap_delta(delta_x, delta_34, mass_number):
+    '''
+    Function that calculates the capital delta, i.e. the deviation from the
+    reference mass-dependent fractionation line, in the log notation
+    D'xS = 1000 ln(1 + dxS/1000) - lambda 1000 ln(1 + d34S/1000).
+    Parameters
+    ----------
+    delta_x: float or array-like.
+    Delta xS in permil.
+    delta_34: float or array-like.
+    Delta 34S in permil.
+    mass_number: int.
+    33 or 36.
+    Returns
+    -------
+    D33S or D36S in permil
+    '''
+    return (lin_approx(delta_x) -
+            CAP_DELTA_EXPONENTS[mass_number]*lin_approx(delta_34))
@@ -0,0 +1,84 @@
+"""
+Log-ratio formulation of the DMSP models. Instead of the concentrations of
+34DMSP and 32DMSP, which differ by a factor of ~22 and whose ratio changes by
+only a few permil, the models are integrated for the logarithm of total DMSP
+and the logarithm of the isotopic ratio 34DMSP/32DMSP, ln R. The d34S of
+DMSP is then a state variable of order one instead of the small difference
+between two large numbers, so the solvers resolve it with loose tolerances.
+"""
+import numpy as np
+
+from .isotopes import ratio_to_delta, R34_VCDT
+
+
+def to_log_ratio(c, iso=(-2, -1)):
+    '''
+    Function that converts a state with the concentrations of 34DMSP and
+    32DMSP to the log-ratio state.
+    Parameters
+    ----------
+    c: array-like.
+    State of the model, with the variables in the last dimension.
+    iso: tuple.
+    Positions of 34DMSP and 32DMSP in the state, e.g. (1, 2) for
+    dmsp_enz_deg and (0, 1) for dmsp_system_3_comp_mm.
+    Returns
+    -------
+    State with ln(34DMSP + 32DMSP) and ln(34DMSP/32DMSP) in the positions of
+    34DMSP and 32DMSP
+    '''
+    y = np.array(c, dtype=float)
+    dmsp_34, dmsp_32 = y[..., iso[0]].copy(), y[..., iso[1]].copy()
+    y[..., iso[0]] = np.log(dmsp_34 + dmsp_32)
+    y[..., iso[1]] = np.log(dmsp_34/dmsp_32)
+    return y
+
+
+def from_log_ratio(y, iso=(-2, -1)):
+    '''
+    Function that converts a log-ratio state back to the concentrations of
+    34DMSP and 32DMSP. It is the inverse of to_log_ratio.
+    '''
+    c = np.array(y, dtype=float)
+    total, ratio = np.exp(c[..., iso[0]]), np.exp(c[..., iso[1]])
+    c[..., iso[0]] = total*ratio/(1 + ratio)
+    c[..., iso[1]] = total/(1 + ratio)
+    return c
+
+
+def log_ratio_to_delta(y, iso=(-2, -1), r_std=R34_VCDT):
+    '''
+    Function that returns the d34S of DMSP in permil of a log-ratio state.
+    '''
+    return ratio_to_delta(np.exp(np.asarray(y)[..., iso[1]]), r_std)
+
+
+def log_ratio_rhs(rhs, iso=(-2, -1)):
+    '''
+    Function that wraps the right-hand side of a DMSP model so that it
+    computes the derivatives of the log-ratio state:
+
+        d ln(D)/dt = (dD34_dt + dD32_dt)/D
+        d ln(R)/dt = dD34_dt/D34 - dD32_dt/D32
+
+    Parameters
+    ----------
+    rhs: callable.
+    Right-hand side of the model with the signature of odeint, rhs(c, t,
+    *args), e.g. dmsp_enz_deg or dmsp_system_3_comp_mm.
+    iso: tuple.
+    Positions of 34DMSP and 32DMSP in the state.
+    Returns
+    -------
+    Function with the same signature that takes and returns log-ratio
+    states
+    '''
+    def fun(y, t, *args):
+        c = from_log_ratio(y, iso)
+        dc_dt = np.array(rhs(c, t, *args), dtype=float)
+        dmsp_34, dmsp_32 = c[..., iso[0]], c[..., iso[1]]
+        d34_dt, d32_dt = dc_dt[..., iso[0]].copy(), dc_dt[..., iso[1]].copy()
+        dc_dt[..., iso[0]] = (d34_dt + d32_dt)/(dmsp_34 + dmsp_32)
+        dc_dt[..., iso[1]] = d34_dt/dmsp_34 - d32_dt/dmsp_32
+        return dc_dt
+    return fun
@@ -0,0 +1,761 @@
+"""
+Steady-state model of DMSP in the ocean, in which DMSP is produced with a
+constant flux and degraded by DmdA (DMSP demethylase), Alma1 (eukaryotic
+DMSP lyase) and DddP (most abundant bacterial DMSP lyase) with
+Michaelis-Menten kinetics.
+"""
+import numpy as np
+import pandas as pd
+from scipy.integrate import odeint
+from scipy.optimize import fsolve
+
+from .isotopes import (isotopes, isotopologues, isotopologues_to_delta,
+                       mass_law_exponent, DELTA_IN_OCEAN, R34_VCDT)
+
+#Number of proteins/mRNA.
+prots_mrna = 1000
+#Avogadro number
+avog_n = 6.022E23
+
+#Weight of DmdA in g/mol
+dmda_w = 39.5E3
+#Weight of DddP in g/mol
+dddp_w = 50E3
+#Weight of Alma1 in g/mol
+alma1_w = 160E3
+
+#Ocean volume in liters
+ocean_vol = 1.3E21
+
+#Order of magnitude estimate of the proportion of enzyme relative to total
+# protein in the cell
+total_prot_enzyme_ratio = 1/1E-6
+
+#Average DMSP concentration in nM, used as the initial condition
+dmsp_ocean = 10
+#Time points used to integrate until steady state, in min
+t_steady_state = np.linspace(0, 1E10, 1000)
+
+#Arguments of dmsp_system_3_comp_mm after the state and the time, in order
+args_3_comp_mm = ('f_total_in', 'alpha_d', 'alpha_c1', 'alpha_cp',
+                  'kappa_32_d', 'kappa_32_c1', 'kappa_32_cp',
+                  'vmax_34_d', 'vmax_34_c1', 'vmax_34_cp',
+                  'vmax_32_d', 'vmax_32_c1', 'vmax_32_cp',
+                  'transcripts_d', 'transcripts_c1', 'transcripts_cp')
+
+
+def dmsp_system_3_comp_mm(
+    c,
+    t,
+    f_total_in,
+    alpha_d,
+    alpha_c1,
+    alpha_cp,
+    kappa_32_d,
+    kappa_32_c1,
+    kappa_32_cp,
+    vmax_34_d,
+    vmax_34_c1,
+    vmax_34_cp,
+    vmax_32_d,
+    vmax_32_c1,
+    vmax_32_cp,
+    transcripts_d,
+    transcripts_c1,
+    transcripts_cp
+):
+    """
+    Function that computes dD32_dt and dD34_dt of DMSP
+    Parameters
+    ----------
+    c: float.
+    Concentration of DMSP in nM.
+    t: int
+    Integration time in min.
+    f_total_in: float.
+    [DMSP] that enters the system in nmol/min. Range: 0.2-2.5 nmol/l/h. From Simo et al. (2009)
+    alpha_d: float.
+    Alpha for demethylation from this study.
+    Epsilon has an error of +-0.17
+    alpha_c1: float.
+    Alpha for cleavage by Alma1 from this study.
+    Epsilon has an error of +-0.06
+    alpha_cp: float.
+    Alpha for cleavage from this study.
+    Epsilon has an error of +-0.14
+    kappa_32_d:float.
+    Ratio of 32^V_max to 32^K_M for demethylation in l/min/mg enz.
+    kappa_32_c1:float.
+    Ratio of 32^V_max to 32^K_M for cleavage by Alma1 in l/min/mg enz.
+    kappa_32_cp:float.
+    Ratio of 32^V_max to 32^K_M for cleavage by DddP in l/min/mg enz.
+    vmax_34_d: int.
+    34^V_max for demethylation in nmol/min/mg enz.
+    vmax_34_c1: int.
+    34^V_max for cleavage by Alma1 in nmol/min/mg enz.
+    vmax_34_cp: int.
+    34^V_max for cleavage by DddP in nmol/min/mg enz.
+    vmax_32_d: int.
+    32^V_max for demethylation in nmol/min/mg enz.
+    vmax_32_c1: int.
+    32^V_max for cleavage by Alma1 in nmol/min/mg enz.
+    vmax_32_cp: int.
+    32^V_max for cleavage by DddP in nmol/min/mg enz.
+    transcripts_d: int.
+    Concentration of DmdA (demethylase) in the ocean from Varaljay et al. (2015).
+    Units of mRNA/l.
+    transcripts_c1: int.
+    Concentration of DMSP lyase in the ocean from approximation based on Vorobev et al. (2020)
+    Units of mRNA/l.
+    transcripts_cp: int.
+    Concentration of DMSP lyase in the ocean from Varaljay et al. (2015)
+    Units of mRNA/l.
+
+    Returns
+    -------
+    The dD32_dt and dD34_dt of DMSP
+    """
+    # Unpack isotopes
+    dmsp_34, dmsp_32 = c
+    #Flux in of each DMSP
+    f_34_in, f_32_in = isotopes(f_total_in, delta_in=DELTA_IN_OCEAN)
+
+    #Determination of kappa 34 for cleavage by Alma1 from kappa 32 and the fractionation factor
+    kappa_34_c1 = kappa_32_c1 * alpha_c1
+    #Determination of kappa 34 for cleavage by DddP from kappa 32 and the fractionation factor
+    kappa_34_cp = kappa_32_cp * alpha_cp
+    #Determination of kappa 34 for demethylation from kappa 32 and the fractionation factor
+    kappa_34_d = kappa_32_d * alpha_d
+
+    # Calculate enzyme concentrations in units of mg/L
+    # Final 1000 is the conversion of grams to milligrams.
+
+    dmda = prots_mrna*transcripts_d*(1/avog_n)*dmda_w*1000
+    alma1 = prots_mrna*transcripts_c1*(1/avog_n)*alma1_w*1000
+    dddp = prots_mrna*transcripts_cp*(1/avog_n)*dddp_w*1000
+
+    #Calculate flux out of 32^DMSP in units of nmol/min
+    f_32_out = ((kappa_32_c1 * alma1 * (vmax_32_c1 * dmsp_32/((vmax_32_c1)+(kappa_32_c1 * dmsp_32))))+
+                (kappa_32_cp * dddp * (vmax_32_cp * dmsp_32/((vmax_32_cp)+(kappa_32_cp * dmsp_32))))+
+                (kappa_32_d * dmda * (vmax_32_d * dmsp_32/((vmax_32_d)+(kappa_32_d* dmsp_32)))))*ocean_vol
+
+    # Calculate dD32_dt in units of nmol/l/min
+    dD32_dt = (f_32_in - f_32_out)/ocean_vol
+
+    #Calculate flux out of 34^DMSP in units of nmol/min
+    f_34_out = ((kappa_34_c1 * alma1 * (vmax_34_c1 * dmsp_34/((vmax_34_c1)+(kappa_34_c1 * dmsp_34))))+
+                (kappa_34_cp * dddp * (vmax_34_cp * dmsp_34/((vmax_34_cp)+(kappa_34_cp * dmsp_34))))+
+                (kappa_34_d * dmda * (vmax_34_d * dmsp_34/((vmax_34_d)+(kappa_34_d * dmsp_34)))))*ocean_vol
+    # Calculate dD34_dt in units of nmol/l/min
+    dD34_dt = (f_34_in - f_34_out)/ocean_vol
+
+    return [dD34_dt, dD32_dt]
+
+
+def dmsp_system_3_comp_mm_jac(
+    c,
+    t,
+    f_total_in,
+    alpha_d,
+    alpha_c1,
+    alpha_cp,
+    kappa_32_d,
+    kappa_32_c1,
+    kappa_32_cp,
+    vmax_34_d,
+    vmax_34_c1,
+    vmax_34_cp,
+    vmax_32_d,
+    vmax_32_c1,
+    vmax_32_cp,
+    transcripts_d,
+    transcripts_c1,
+    transcripts_cp
+):
+    """
+    Function that computes the Jacobian of dmsp_system_3_comp_mm. Since
+    34DMSP and 32DMSP are degraded independently, the Jacobian is diagonal.
+    The arguments are the same as in dmsp_system_3_comp_mm.
+
+    Returns
+    -------
+    2 x 2 array with the partial derivatives of dD34_dt and dD32_dt with
+    respect to 34DMSP and 32DMSP
+    """
+    # Unpack isotopes
+    dmsp_34, dmsp_32 = c
+
+    kappa_34_c1 = kappa_32_c1 * alpha_c1
+    kappa_34_cp = kappa_32_cp * alpha_cp
+    kappa_34_d = kappa_32_d * alpha_d
+
+    # Calculate enzyme concentrations in units of mg/L
+    dmda = prots_mrna*transcripts_d*(1/avog_n)*dmda_w*1000
+    alma1 = prots_mrna*transcripts_c1*(1/avog_n)*alma1_w*1000
+    dddp = prots_mrna*transcripts_cp*(1/avog_n)*dddp_w*1000
+
+    #The derivative of kappa * E * Vmax * D/(Vmax + kappa * D) with respect to
+    # D is kappa * E * Vmax^2/(Vmax + kappa * D)^2
+    jac = np.zeros((2, 2))
+    jac[0, 0] = -((kappa_34_c1 * alma1 * vmax_34_c1**2/(vmax_34_c1 + kappa_34_c1 * dmsp_34)**2)+
+                  (kappa_34_cp * dddp * vmax_34_cp**2/(vmax_34_cp + kappa_34_cp * dmsp_34)**2)+
+                  (kappa_34_d * dmda * vmax_34_d**2/(vmax_34_d + kappa_34_d * dmsp_34)**2))
+    jac[1, 1] = -((kappa_32_c1 * alma1 * vmax_32_c1**2/(vmax_32_c1 + kappa_32_c1 * dmsp_32)**2)+
+                  (kappa_32_cp * dddp * vmax_32_cp**2/(vmax_32_cp + kappa_32_cp * dmsp_32)**2)+
+                  (kappa_32_d * dmda * vmax_32_d**2/(vmax_32_d + kappa_32_d * dmsp_32)**2))
+
+    return jac
+
+
+def steady_state(args, c=None, t=None, rtol=1E-9):
+    """
+    Function that finds the steady-state concentrations of 34DMSP and 32DMSP
+    of dmsp_system_3_comp_mm by solving dD34_dt = dD32_dt = 0 directly.
+    If the root solve does not converge, the system is integrated with
+    ODEint over t and the last time point is returned instead.
+    Parameters
+    ----------
+    args: tuple.
+    Arguments of dmsp_system_3_comp_mm after c and t.
+    c: array-like.
+    Initial guess of the concentration of 34DMSP and 32DMSP in nM. Default
+    is the isotopic composition of dmsp_ocean.
+    t: array-like.
+    Time points for the fallback integration. Default is t_steady_state.
+    rtol: float.
+    Maximum residual of the root solve, relative to the flux of each
+    isotopologue into the system.
+
+    Returns
+    -------
+    Concentration of 34DMSP and 32DMSP at steady state, and the method used
+    to find it ('root' or 'odeint')
+    """
+    if c is None:
+        c = isotopes(dmsp_ocean, delta_in=DELTA_IN_OCEAN)
+    if t is None:
+        t = t_steady_state
+    c = np.asarray(c, dtype=float)
+
+    #Flux in of each isotopologue in nmol/l/min, used to scale the residual
+    f_in = np.asarray(isotopes(args[0], delta_in=DELTA_IN_OCEAN))/ocean_vol
+
+    #Solve for the logarithm of the concentrations, which keeps them positive
+    # and makes the problem well scaled even when the steady state is orders
+    # of magnitude away from the initial guess
+    def residual(u):
+        return np.asarray(dmsp_system_3_comp_mm(np.exp(u), 0, *args))/f_in
+
+    #Jacobian of the residual with respect to the log-concentrations
+    def residual_jac(u):
+        x = np.exp(u)
+        return dmsp_system_3_comp_mm_jac(x, 0, *args) * x[None, :]/f_in[:, None]
+
+    u, info, ier, _ = fsolve(residual, np.log(c), fprime=residual_jac,
+                             full_output=True, xtol=1E-13)
+    if ier == 1 and np.all(np.abs(info['fvec']) <= rtol):
+        return np.exp(u), 'root'
+
+    #Fall back to the integration until steady state
+    dmsp_iso = odeint(dmsp_system_3_comp_mm, c, t, args=tuple(args))
+    return dmsp_iso[-1], 'odeint'
+
+
+def enzyme_table():
+    """
+    Function that returns the default table of DMSP degrading enzymes for
+    OceanModel. The fractionation factors come from the slopes of the
+    Rayleigh plots of our EA data (code/analysis/bayesian_inference.ipynb).
+    DmdA, Alma1 and DddP use the intermediate kinetic parameters and the
+    weights of the expected_d34s_dmsp scripts. The bacterial DMSP lyases
+    DddD, DddK, DddQ and DddY use the kinetic parameters of DddP, weights
+    approximated from the length of their sequences, and no transcripts, so
+    that by default the model reproduces dmsp_system_3_comp_mm. The errors
+    of epsilon of DmdA, Alma1 and DddP are those of dmsp_system_3_comp_mm,
+    and those of the other enzymes are the half-widths of the 95% credible
+    regions of their slopes.
+
+    Returns
+    -------
+    Dataframe with one row per enzyme and the columns 'Enzyme', 'alpha',
+    'epsilon_error' (permil), 'kappa_32' (l/min/mg enz), 'vmax_32' and
+    'vmax_34' (nmol/min/mg enz), 'weight' (g/mol) and 'transcripts' (mRNA/l)
+    """
+    d_enzymes = {
+        'Enzyme': ['DmdA', 'Alma1', 'DddP', 'DddD', 'DddK', 'DddQ', 'DddY'],
+        'alpha': [(-2.72/1000)+1, (-1.18/1000)+1, (-3.97/1000)+1,
+                  (-5.97/1000)+1, (-9.09/1000)+1, (-5.26/1000)+1,
+                  (-5.09/1000)+1],
+        'epsilon_error': [0.17, 0.06, 0.14, 0.19, 1.46, 0.41, 0.19],
+        'kappa_32': [10000, 2000, 600, 600, 600, 600, 600],
+        'vmax_32': [1E7/2, 4E7/2, 9E7/2, 9E7/2, 9E7/2, 9E7/2, 9E7/2],
+        'vmax_34': [1E7/2, 4E7/2, 9E7/2, 9E7/2, 9E7/2, 9E7/2, 9E7/2],
+        'weight': [dmda_w, alma1_w, dddp_w, 92E3, 15E3, 22E3, 45E3],
+        'transcripts': [1E7, 1E7, 1E7, 0, 0, 0, 0],
+    }
+    return pd.DataFrame(data=d_enzymes)
+
+
+def kinetic_bounds():
+    """
+    Function that returns the lower and upper estimates of the kinetic
+    parameters of DmdA, Alma1 and DddP in their native organisms, reported
+    by Jonkers et al. (2000) and Stefels et al. (2007), for open ocean
+    conditions.
+
+    Returns
+    -------
+    Dataframe indexed by 'Enzyme' with the columns 'vmax_low' and
+    'vmax_high' (nmol/min/mg cell protein), 'km_low' and 'km_high' (nM),
+    'vmax_enz_low' and 'vmax_enz_high' (nmol/min/mg enz) and 'kappa_low' and
+    'kappa_high' (V_max/K_M in l/min/mg enz)
+    """
+    df = pd.DataFrame({
+        'Enzyme': ['DmdA', 'Alma1', 'DddP'],
+        'vmax_low': [0.089*1000, 0.011*1000, 0.0144*1000],
+        'km_low': [15500, 500000, 70000],
+        'vmax_high': [0.3*1000, 0.0835*1000, 0.0201*1000],
+        'km_high': [4100, 12000, 20000]}).set_index('Enzyme')
+    df['vmax_enz_low'] = df['vmax_low']*total_prot_enzyme_ratio
+    df['vmax_enz_high'] = df['vmax_high']*total_prot_enzyme_ratio
+    df['kappa_low'] = df['vmax_enz_low']/df['km_low']
+    df['kappa_high'] = df['vmax_enz_high']/df['km_high']
+    return df
+
+
+class OceanModel():
+    """
+    Steady-state model of DMSP in the ocean degraded by an arbitrary number
+    of enzymes with Michaelis-Menten kinetics. All the constants derived from
+    the enzyme table (enzyme concentrations, 34kappa, fluxes in) are computed
+    once when the model is built, and the right-hand side sums over the
+    enzymes with array operations.
+
+    The parameters of the enzymes can carry extra trailing dimensions (e.g.
+    transcripts with shape (n_enzymes, n_points)) to evaluate a batch of
+    scenarios at once. In that case the state has shape (2, n_points).
+
+    By default the state holds 34DMSP and 32DMSP. With mass_numbers, e.g.
+    (34, 33, 36, 32), it holds any set of isotopologues with 34DMSP first and
+    32DMSP last, and the state has shape (n_isotopologues, *batch).
+    Parameters
+    ----------
+    df_enzymes: dataframe.
+    Table of enzymes with the columns of enzyme_table.
+    f_total_in: float or array-like.
+    [DMSP] that enters the system in nmol/min. An array is a batch of fluxes,
+    whose dimensions are aligned with the batch dimensions of the enzyme
+    parameters.
+    transcripts: array-like.
+    Transcripts of each enzyme in mRNA/l, overriding the column of
+    df_enzymes. The first dimension runs over the enzymes.
+    kappa_32: array-like.
+    kappa_32 of each enzyme in l/min/mg enz, overriding the column of
+    df_enzymes. The first dimension runs over the enzymes.
+    alpha: array-like.
+    Fractionation factor of each enzyme, overriding the column of
+    df_enzymes. The first dimension runs over the enzymes.
+    vmax_32, vmax_34: array-like.
+    32^Vmax and 34^Vmax of each enzyme in nmol/min/mg enz, overriding the
+    columns of df_enzymes. The first dimension runs over the enzymes.
+    delta_in: float.
+    Delta 34S of newly synthesized DMSP.
+    mass_numbers: tuple.
+    Mass numbers of the isotopologues of the state, with 34 first and 32
+    last. The kappa of isotopologue x is kappa_32 * alpha^theta_x, with
+    theta_x from the mass law, and the heavy isotopologues have the Vmax of
+    34DMSP.
+    law: str.
+    Mass law of the fractionation factors, 'equilibrium' or 'kinetic' (see
+    mass_law_exponent).
+    cap_delta_in: dict.
+    Capital delta of newly synthesized DMSP for the other heavy isotopes,
+    e.g. {33: 0.1}. Default is mass-dependent DMSP.
+    """
+    def __init__(self, df_enzymes, f_total_in, transcripts=None,
+                 kappa_32=None, alpha=None, vmax_32=None, vmax_34=None,
+                 delta_in=DELTA_IN_OCEAN, mass_numbers=(34, 32),
+                 law='equilibrium', cap_delta_in=None):
+        if mass_numbers[0] != 34 or mass_numbers[-1] != 32:
+            raise ValueError('mass_numbers must start with 34 and end with 32')
+        self.mass_numbers = tuple(mass_numbers)
+        self.n_iso = len(self.mass_numbers)
+        self.enzymes = list(df_enzymes['Enzyme'])
+        n = len(self.enzymes)
+
+        def column(values, name):
+            if values is None:
+                values = df_enzymes[name].to_numpy(dtype=float)
+            values = np.asarray(values, dtype=float)
+            if values.shape[0] != n:
+                raise ValueError(f'{name} must have one row per enzyme')
+            return values
+
+        transcripts = column(transcripts, 'transcripts')
+        kappa_32 = column(kappa_32, 'kappa_32')
+        alpha = column(alpha, 'alpha')
+        vmax_32 = column(vmax_32, 'vmax_32')
+        vmax_34 = column(vmax_34, 'vmax_34')
+        weight = df_enzymes['weight'].to_numpy(dtype=float)
+        f_total_in = np.asarray(f_total_in, dtype=float)
+
+        #Add trailing dimensions so that the columns broadcast over the batch
+        ndim = max(transcripts.ndim, kappa_32.ndim, alpha.ndim, vmax_32.ndim,
+                   vmax_34.ndim, f_total_in.ndim + 1)
+
+        def pad(values):
+            return values.reshape(values.shape + (1,) * (ndim - values.ndim))
+
+        # Calculate enzyme concentrations in units of mg/L
+        enzyme = prots_mrna*pad(transcripts)*(1/avog_n)*pad(weight)*1000
+        enzyme, kappa_32, alpha, vmax_32, vmax_34, _ = np.broadcast_arrays(
+            enzyme, pad(kappa_32), pad(alpha), pad(vmax_32), pad(vmax_34),
+            pad(f_total_in[None]))
+        self.batch_shape = enzyme.shape[1:]
+        self.alpha = alpha
+        self.enzyme = enzyme
+        #Derivative of the enzyme concentration with respect to the transcripts
+        self.enzyme_per_transcript = prots_mrna*(1/avog_n)*pad(weight)*1000
+
+        #Kappa and Vmax with shape (isotopologue, enzyme, *batch), with 34 in
+        # the first row and 32 in the last one as in the state
+        theta = mass_law_exponent(self.mass_numbers[1:-1], law)
+        self.kappa = np.stack([kappa_32 * alpha] +
+                              [kappa_32 * alpha**th for th in theta] +
+                              [kappa_32])
+        self.vmax = np.stack([vmax_34]*(self.n_iso - 1) + [vmax_32])
+        #kappa * E, the first-order rate constant of each enzyme when DMSP
+        # is far from saturation
+        self.kappa_enz = self.kappa * enzyme[None]
+
+        #Flux in of each isotopologue in nmol/l/min
+        self.f_in = isotopologues(pad(f_total_in[None])[0], self.mass_numbers,
+                                  delta_in=delta_in,
+                                  cap_delta_in=cap_delta_in)/ocean_vol
+        self.f_in = np.broadcast_to(self.f_in, (self.n_iso,) + self.batch_shape)
+
+    def forcing(self, t):
+        """
+        Function that returns the flux in of each isotopologue and kappa * E
+        of each enzyme at time t. They are constant in OceanModel; subclasses
+        override this method to force the model with time series.
+        """
+        return self.f_in, self.kappa_enz
+
+    def rhs(self, c, t=0):
+        """
+        Function that computes dD34_dt and dD32_dt of DMSP in nmol/l/min.
+        c is the concentration of 34DMSP and 32DMSP in nM, with shape
+        (2, *batch), or of each isotopologue of mass_numbers. Flattened
+        states (as used by odeint) are reshaped.
+        """
+        flat = np.ndim(c) == 1 and self.batch_shape != ()
+        dmsp = np.reshape(c, (self.n_iso,) + self.batch_shape)[:, None]
+        f_in, kappa_enz = self.forcing(t)
+        f_out = (kappa_enz * self.vmax * dmsp/
+                 (self.vmax + self.kappa * dmsp)).sum(axis=1)
+        dc_dt = f_in - f_out
+        return dc_dt.ravel() if flat else dc_dt
+
+    def jac_diag(self, c, t=0):
+        """
+        Function that computes the diagonal of the Jacobian of rhs, i.e. the
+        derivatives of dD34_dt and dD32_dt with respect to 34DMSP and 32DMSP,
+        with shape (2, *batch).
+        """
+        dmsp = np.reshape(c, (self.n_iso,) + self.batch_shape)[:, None]
+        _, kappa_enz = self.forcing(t)
+        return -(kappa_enz * self.vmax**2/
+                 (self.vmax + self.kappa * dmsp)**2).sum(axis=1)
+
+    def jac(self, c, t=0):
+        """
+        Function that computes the Jacobian of rhs for an unbatched model,
+        with the signature used by odeint.
+        """
+        return np.diag(self.jac_diag(c, t).ravel())
+
+    def steady_state(self, c=None, t=None, rtol=1E-9, maxiter=100):
+        """
+        Function that finds the steady state of all the scenarios of the
+        model at once with Newton iterations on the logarithm of the
+        concentrations. Since 34DMSP and 32DMSP are degraded independently,
+        each iteration only needs the diagonal of the Jacobian. The scenarios
+        that do not converge are integrated with ODEint over t instead.
+        Parameters
+        ----------
+        c: array-like.
+        Initial guess of the concentration of 34DMSP and 32DMSP in nM.
+        Default is the isotopic composition of dmsp_ocean.
+        t: array-like.
+        Time points for the fallback integration. Default is t_steady_state.
+        rtol: float.
+        Maximum residual relative to the flux of each isotopologue into the
+        system.
+        maxiter: int.
+        Maximum number of Newton iterations.
+
+        Returns
+        -------
+        Concentration of 34DMSP and 32DMSP at steady state with shape
+        (2, *batch), and the method used to find each one ('root' or
+        'odeint'), with shape batch
+        """
+        if c is None:
+            c = isotopologues(dmsp_ocean, self.mass_numbers,
+                              delta_in=DELTA_IN_OCEAN)
+        if t is None:
+            t = t_steady_state
+        c = np.asarray(c, dtype=float)
+        if c.ndim == 1:
+            c = c.reshape((self.n_iso,) + (1,) * len(self.batch_shape))
+        c0 = np.broadcast_to(c, (self.n_iso,) + self.batch_shape)
+        u = np.log(c0)
+
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            for _ in range(maxiter):
+                x = np.exp(u)
+                residual = self.rhs(x)/self.f_in
+                if np.all(np.abs(residual) <= rtol):
+                    break
+                #Derivative of the residual with respect to u
+                slope = self.jac_diag(x) * x/self.f_in
+                #Damp the steps to at most a factor of e^2 in concentration
+                u = u - np.clip(residual/slope, -2, 2)
+            x = np.exp(u)
+            converged = np.all(np.abs(self.rhs(x)/self.f_in) <= rtol, axis=0)
+
+        method = np.where(converged, 'root', 'odeint')
+        #Fall back to the integration until steady state
+        if self.batch_shape == ():
+            not_converged = [] if converged else [()]
+        else:
+            not_converged = zip(*np.nonzero(~converged))
+        for idx in not_converged:
+            select = (slice(None),) + idx
+            model = self._single(idx)
+            x[select] = odeint(model.rhs, c0[select], t, Dfun=model.jac)[-1]
+
+        if self.batch_shape == ():
+            return x, str(method)
+        return x, method
+
+    def steady_state_sensitivity(self, x):
+        """
+        Function that calculates the derivatives of the d34S of DMSP at
+        steady state with respect to the parameters of each enzyme. As the
+        steady state satisfies rhs(x) = 0, dx/dparameter =
+        -(d rhs/d parameter)/(d rhs/dx), so no extra solve is needed.
+        Parameters
+        ----------
+        x: array-like.
+        Concentration of 34DMSP and 32DMSP at steady state, with shape
+        (2, *batch), e.g. from steady_state.
+
+        Returns
+        -------
+        d34S of DMSP at steady state with shape batch, and dictionary with
+        its derivatives with respect to 'alpha', 'kappa_32' (in l/min/mg enz)
+        and 'transcripts' (in mRNA/l) of each enzyme, with shape
+        (n_enzymes, *batch)
+        """
+        #Only 34DMSP and 32DMSP, the first and last isotopologues, set d34S
+        x = np.reshape(x, (self.n_iso,) + self.batch_shape)
+        jac_diag = self.jac_diag(x)[[0, -1], None]
+        x = x[[0, -1]]
+        kappa, vmax = self.kappa[[0, -1]], self.vmax[[0, -1]]
+        dmsp = x[:, None]
+        den = vmax + kappa * dmsp
+        #Derivatives of the rates of consumption by each enzyme with respect
+        # to its kappa and its concentration
+        dr_dkappa = self.enzyme[None] * vmax**2 * dmsp/den**2
+        dr_denz = kappa * vmax * dmsp/den
+
+        #Derivatives of rhs with respect to the parameters, with shape
+        # (isotopologue, enzyme, *batch). kappa_34 = kappa_32 * alpha
+        zeros = np.zeros_like(dr_dkappa[1])
+        drhs = {
+            'alpha': -np.stack([dr_dkappa[0] * kappa[1], zeros]),
+            'kappa_32': -np.stack([dr_dkappa[0] * self.alpha, dr_dkappa[1]]),
+            'transcripts': -dr_denz * self.enzyme_per_transcript[None],
+        }
+
+        d34s = isotopologues_to_delta(x[0], x[1])
+        d_d34s = {}
+        for name, value in drhs.items():
+            dx = -value/jac_diag
+            #d34S = (34DMSP/32DMSP/R_std - 1)*1000
+            d_d34s[name] = 1000/R34_VCDT * (dx[0]/x[1] - x[0]*dx[1]/x[1]**2)
+        return d34s, d_d34s
+
+    def _single(self, idx):
+        """
+        Function that returns a copy of the model for a single scenario of
+        the batch.
+        """
+        model = OceanModel.__new__(OceanModel)
+        model.enzymes = self.enzymes
+        model.mass_numbers, model.n_iso = self.mass_numbers, self.n_iso
+        model.batch_shape = ()
+        select = (slice(None), slice(None)) + idx
+        model.kappa = np.broadcast_to(self.kappa, self.kappa_enz.shape)[select]
+        model.vmax = np.broadcast_to(self.vmax, self.kappa_enz.shape)[select]
+        model.kappa_enz = self.kappa_enz[select]
+        model.f_in = self.f_in[(slice(None),) + idx]
+        return model
+
+
+def d34s_steady_state(compositions, df_enzymes, f_total_in, column='transcripts',
+                      total=1.0, c=None, t=None):
+    """
+    Function that calculates the d34S of DMSP at steady state for a batch of
+    compositions of one of the parameters of the enzymes (e.g. transcripts or
+    kappa_32). It is a top-level function so that it can be sent to the
+    worker processes of dmsp.sweeps.run_sweep (e.g. with functools.partial).
+    Parameters
+    ----------
+    compositions: array-like.
+    Array of shape (M, n_enzymes) with the fraction of the total of the
+    parameter assigned to each enzyme, in the order of df_enzymes.
+    df_enzymes: dataframe.
+    Table of enzymes with the columns of enzyme_table.
+    f_total_in: float.
+    [DMSP] that enters the system in nmol/min.
+    column: str.
+    Parameter that is varied: 'transcripts', 'kappa_32' or 'alpha'.
+    total: float.
+    Total of the parameter among all the enzymes. With the default of 1,
+    compositions are the values of the parameter themselves.
+    c, t: array-like.
+    Initial guess and fallback time points of OceanModel.steady_state.
+
+    Returns
+    -------
+    Array of M values of d34S of DMSP at steady state
+    """
+    values = (np.asarray(compositions, dtype=float) * total).T
+    model = OceanModel(df_enzymes, f_total_in, **{column: values})
+    dmsp_ss, _ = model.steady_state(c, t)
+    return isotopologues_to_delta(dmsp_ss[0], dmsp_ss[1])
+
+
+def d34s_monte_carlo(df_enzymes, f_total_in, n_samples=1000, transcripts=None,
+                     kappa_32=None, n_sigma=1, kappa_log_sd=0, vmax_log_sd=0,
+                     quantiles=(0.025, 0.5, 0.975), batch_size=100, seed=None,
+                     c=None, t=None):
+    """
+    Function that propagates the uncertainty of the fractionation factors
+    (and optionally of the kinetic parameters) to the d34S of DMSP at steady
+    state by Monte Carlo. For each sample, epsilon of each enzyme is drawn
+    from a normal distribution with a standard deviation of
+    epsilon_error/n_sigma, and kappa_32 and Vmax from log-normal
+    distributions around their values. 32^Vmax and 34^Vmax of an enzyme are
+    multiplied by the same factor, so that the samples add no isotope effect
+    on Vmax. Batches of samples are solved at once for all the scenarios
+    with OceanModel.
+    Parameters
+    ----------
+    df_enzymes: dataframe.
+    Table of enzymes with the columns of enzyme_table.
+    f_total_in: float.
+    [DMSP] that enters the system in nmol/min.
+    n_samples: int.
+    Number of Monte Carlo samples.
+    transcripts, kappa_32: array-like.
+    Transcripts (mRNA/l) and kappa_32 (l/min/mg enz) of each enzyme in each
+    scenario, with shape (n_enzymes, n_scenarios), overriding the columns of
+    df_enzymes. The sampled kappa_32 are multiplied by these values.
+    n_sigma: float.
+    Number of standard deviations that the column 'epsilon_error'
+    represents, e.g. 1.96 for the half-width of a 95% interval.
+    kappa_log_sd: float or array-like.
+    Standard deviation of ln(kappa_32) of each enzyme. 0 keeps kappa_32
+    fixed.
+    vmax_log_sd: float or array-like.
+    Standard deviation of ln(Vmax) of each enzyme. 0 keeps Vmax fixed.
+    quantiles: array-like.
+    Quantiles of d34S to return.
+    batch_size: int.
+    Number of samples solved at once.
+    seed: int.
+    Seed of the random number generator.
+    c, t: array-like.
+    Initial guess and fallback time points of OceanModel.steady_state.
+
+    Returns
+    -------
+    Array of shape (len(quantiles), n_scenarios) with the quantiles of the
+    d34S of DMSP in each scenario
+    """
+    rng = np.random.default_rng(seed)
+    n = len(df_enzymes)
+
+    def scenarios(values, name):
+        if values is None:
+            values = df_enzymes[name].to_numpy(dtype=float)
+        values = np.asarray(values, dtype=float)
+        return values.reshape(n, 1, -1)
+
+    transcripts = scenarios(transcripts, 'transcripts')
+    kappa_32 = scenarios(kappa_32, 'kappa_32')
+    epsilon = (1 - df_enzymes['alpha'].to_numpy(dtype=float))*1000
+    epsilon_sd = df_enzymes['epsilon_error'].to_numpy(dtype=float)/n_sigma
+    kappa_log_sd = np.broadcast_to(np.asarray(kappa_log_sd, dtype=float), (n,))
+    vmax_log_sd = np.broadcast_to(np.asarray(vmax_log_sd, dtype=float), (n,))
+    vmax_32 = df_enzymes['vmax_32'].to_numpy(dtype=float)[:, None, None]
+    vmax_34 = df_enzymes['vmax_34'].to_numpy(dtype=float)[:, None, None]
+
+    d34s = []
+    for start in range(0, n_samples, batch_size):
+        size = min(batch_size, n_samples - start)
+        #Samples along the second dimension, scenarios along the third one
+        epsilon_sample = rng.normal(epsilon[:, None], epsilon_sd[:, None],
+                                    (n, size))
+        kappa_factor = np.exp(rng.normal(0, kappa_log_sd[:, None], (n, size)))
+        #Only drawn when used, so that the samples of epsilon and kappa_32
+        # of a seed do not change
+        vmax_factor = np.ones((n, size, 1))
+        if np.any(vmax_log_sd):
+            vmax_factor = np.exp(rng.normal(0, vmax_log_sd[:, None],
+                                            (n, size)))[:, :, None]
+        model = OceanModel(df_enzymes, f_total_in, transcripts=transcripts,
+                           kappa_32=kappa_32*kappa_factor[:, :, None],
+                           alpha=((-epsilon_sample/1000)+1)[:, :, None],
+                           vmax_32=vmax_32*vmax_factor,
+                           vmax_34=vmax_34*vmax_factor)
+        dmsp_ss, _ = model.steady_state(c, t)
+        d34s.append(isotopologues_to_delta(dmsp_ss[0], dmsp_ss[1]))
+
+    return np.quantile(np.concatenate(d34s), quantiles, axis=0)
+
+
+def d34s_steady_state_3_comp(args, c=None, t=None, tie_vmax=False):
+    """
+    Function that calculates the d34S of DMSP at steady state of
+    dmsp_system_3_comp_mm for a batch of sets of arguments at once, with the
+    vectorized solver of OceanModel.
+    Parameters
+    ----------
+    args: array-like.
+    Array of shape (M, 16) with the arguments of dmsp_system_3_comp_mm of
+    each set, in the order of args_3_comp_mm.
+    c, t: array-like.
+    Initial guess and fallback time points of OceanModel.steady_state.
+    tie_vmax: bool.
+    If True, args has shape (M, 13), without the columns of 32^V_max, and
+    32^V_max = 34^V_max as in the expected_d34s_dmsp scripts.
+
+    Returns
+    -------
+    Array of M values of d34S of DMSP at steady state
+    """
+    args = np.asarray(args, dtype=float).T
+    if tie_vmax:
+        args = np.concatenate([args[:10], args[7:10], args[10:]])
+    #DmdA, Alma1 and DddP, in the order of the arguments
+    df_enzymes = enzyme_table().iloc[:3]
+    model = OceanModel(df_enzymes, args[0], alpha=args[1:4],
+                       kappa_32=args[4:7], vmax_34=args[7:10],
+                       vmax_32=args[10:13], transcripts=args[13:16])
+    dmsp_ss, _ = model.steady_state(c, t)
+    return isotopologues_to_delta(dmsp_ss[0], dmsp_ss[1])
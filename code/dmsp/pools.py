@@ -0,0 +1,210 @@
+"""
+Ocean model of DMSP in which the enzymes are state variables instead of an
+algebraic function of the transcripts: each enzyme is produced from its
+transcripts and decays with a first-order rate constant, as dE_dt = -k·E in
+dmsp_enz_deg. At steady state the enzyme pools match the enzymes of
+OceanModel, so the steady state is found with the Newton solver of
+OceanModel.
+"""
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+
+from .ocean import OceanModel
+from .seasonal import ForcedOceanModel
+
+
+class EnzymePoolModel():
+    """
+    Model of the isotopologues of DMSP (34DMSP and 32DMSP by default) and
+    the pools of n enzymes in the ocean:
+
+        dD_dt = f_in(t) - sum_k kappa_k E_k Vmax_k D/(Vmax_k + kappa_k D)
+        dE_k_dt = k_k (E*_k(t) - E_k)
+
+    where E*_k is the enzyme of OceanModel for the transcripts at time t,
+    so that the enzymes are produced at a rate proportional to the
+    transcripts and decay at a rate k_k E_k. The state has shape
+    (n_iso + n, *batch): the isotopologues of DMSP in nM, in the order of
+    mass_numbers of OceanModel, followed by the enzymes in mg/l.
+    Parameters
+    ----------
+    df_enzymes: dataframe.
+    Table of enzymes with the columns of enzyme_table.
+    f_total_in: float, array-like or callable.
+    [DMSP] that enters the system in nmol/min, or a function of time, as in
+    ForcedOceanModel.
+    k_deg: float or array-like.
+    First-order decay constant of each enzyme in min^-1, with shape (n,) or
+    broadcastable to (n, *batch).
+    transcripts: array-like or callable.
+    Transcripts of each enzyme in mRNA/l, or a function of time, as in
+    ForcedOceanModel.
+    kwargs:
+    Other arguments of OceanModel (kappa_32, alpha, vmax_32, vmax_34,
+    delta_in, mass_numbers, law, cap_delta_in).
+    """
+    def __init__(self, df_enzymes, f_total_in, k_deg, transcripts=None,
+                 **kwargs):
+        self.ocean = ForcedOceanModel(df_enzymes, f_total_in,
+                                      transcripts=transcripts, **kwargs)
+        #Arguments to build OceanModel with the forcing frozen at a time
+        self._frozen_args = (df_enzymes, f_total_in, transcripts, kwargs)
+        self.enzymes = self.ocean.enzymes
+        self.n_enzymes = len(self.enzymes)
+        self.batch_shape = self.ocean.batch_shape
+        self.n_iso = self.ocean.n_iso
+        self.shape = (self.n_iso + self.n_enzymes,) + self.batch_shape
+        k_deg = np.asarray(k_deg, dtype=float)
+        if k_deg.ndim > 0:
+            k_deg = k_deg.reshape(k_deg.shape + (1,)*(len(self.shape) -
+                                                     k_deg.ndim))
+        self.k_deg = np.broadcast_to(k_deg, (self.n_enzymes,) +
+                                     self.batch_shape)
+
+        #Sparsity of the Jacobian of the flattened state: each DMSP depends on
+        # itself and on the enzymes of the same scenario, and each enzyme
+        # only on itself
+        n_batch = int(np.prod(self.batch_shape, dtype=int))
+        index = np.arange(self.shape[0]*n_batch).reshape(self.shape[0],
+                                                          n_batch)
+        dmsp, enzyme = index[:self.n_iso], index[self.n_iso:]
+        rows = [dmsp, np.broadcast_to(dmsp[:, None],
+                                      (self.n_iso,) + enzyme.shape), enzyme]
+        cols = [dmsp, np.broadcast_to(enzyme, (self.n_iso,) + enzyme.shape),
+                enzyme]
+        self._rows = np.concatenate([r.ravel() for r in rows])
+        self._cols = np.concatenate([c.ravel() for c in cols])
+        self.jac_sparsity = sparse.coo_matrix(
+            (np.ones(len(self._rows)), (self._rows, self._cols))).tocsc()
+
+    def _split(self, c):
+        state = np.reshape(c, self.shape)
+        return state[:self.n_iso], state[self.n_iso:]
+
+    def rhs(self, c, t=0):
+        """
+        Function that computes the derivatives of the isotopologues of DMSP
+        (nmol/l/min) and the enzymes (mg/l/min). c has shape (n_iso + n,
+        *batch) or is flattened.
+        """
+        dmsp, enzyme = self._split(c)
+        f_in, _ = self.ocean.forcing(t)
+        kappa, vmax = self.ocean.kappa, self.ocean.vmax
+        f_out = (kappa * enzyme[None] * vmax * dmsp[:, None]/
+                 (vmax + kappa * dmsp[:, None])).sum(axis=1)
+        de_dt = self.k_deg * (self.ocean.enzyme_at(t) - enzyme)
+        dc_dt = np.concatenate([f_in - f_out, de_dt])
+        return dc_dt.ravel() if np.ndim(c) == 1 else dc_dt
+
+    def jac(self, c, t=0):
+        """
+        Function that computes the Jacobian of rhs with respect to the
+        flattened state as a sparse matrix, with the pattern of
+        jac_sparsity.
+        """
+        dmsp, enzyme = self._split(c)
+        kappa, vmax = self.ocean.kappa, self.ocean.vmax
+        n_batch = self.jac_sparsity.shape[0]//self.shape[0]
+        denom = vmax + kappa * dmsp[:, None]
+        #d dD_dt/dD, d dD_dt/dE_k and d dE_dt/dE
+        d_dmsp = -(kappa * enzyme[None] * vmax**2/denom**2).sum(axis=1)
+        d_enzyme = -np.broadcast_to(kappa * vmax * dmsp[:, None]/denom,
+                                    (self.n_iso,) + enzyme.shape)
+        d_pool = -np.broadcast_to(self.k_deg, enzyme.shape)
+        values = np.concatenate([d_dmsp.ravel(), d_enzyme.ravel(),
+                                 d_pool.ravel()])
+        n = self.shape[0]*n_batch
+        return sparse.coo_matrix((values, (self._rows, self._cols)),
+                                 shape=(n, n)).tocsc()
+
+    def steady_enzymes(self, t=0):
+        """
+        Function that returns the enzyme pools in equilibrium with the
+        transcripts at time t, with shape (n, *batch).
+        """
+        return np.broadcast_to(self.ocean.enzyme_at(t),
+                               (self.n_enzymes,) + self.batch_shape)
+
+    def initial_state(self, c=None, t=0):
+        """
+        Function that builds the initial state from the concentration of
+        each isotopologue of DMSP, with the enzyme pools in equilibrium with
+        the transcripts at time t. Default c is the steady state at time t.
+        """
+        if c is None:
+            return self.steady_state(t)[0]
+        else:
+            c = np.asarray(c, dtype=float)
+            if c.ndim == 1:
+                c = c.reshape((self.n_iso,) + (1,) * len(self.batch_shape))
+            dmsp = np.broadcast_to(c, (self.n_iso,) + self.batch_shape)
+        return np.concatenate([dmsp, self.steady_enzymes(t)])
+
+    def steady_state(self, t=0, **options):
+        """
+        Function that finds the steady state for the forcing frozen at time
+        t. The enzyme pools are then in equilibrium with the transcripts, and
+        DMSP is at the steady state of OceanModel, which is found with its
+        Newton solver.
+        Parameters
+        ----------
+        t: float.
+        Time of the forcing in min.
+        options:
+        Extra arguments of OceanModel.steady_state.
+        Returns
+        -------
+        State at steady state with shape (n_iso + n, *batch), and the method
+        used to find the concentrations of DMSP
+        """
+        df_enzymes, f_total_in, transcripts, kwargs = self._frozen_args
+        ocean = OceanModel(
+            df_enzymes, f_total_in(t) if callable(f_total_in) else f_total_in,
+            transcripts=transcripts(t) if callable(transcripts) else transcripts,
+            **kwargs)
+        dmsp, method = ocean.steady_state(**options)
+        return np.concatenate([dmsp, self.steady_enzymes(t)]), method
+
+    def integrate(self, c, t, method='BDF', **kwargs):
+        """
+        Function that integrates the model with a stiff solver. The
+        enzymes and DMSP turn over on very different time scales and have
+        very different magnitudes, so by default the model is integrated
+        with BDF and the sparse analytical Jacobian, and the absolute
+        tolerance of each variable is set relative to its scale.
+        Parameters
+        ----------
+        c: array-like.
+        Initial state with shape (n_iso + n, *batch), e.g. from
+        initial_state.
+        t: array-like.
+        Time points in which the solution is returned, in min.
+        method: str.
+        'BDF', 'Radau' or 'LSODA'. LSODA uses the dense Jacobian.
+        kwargs:
+        Extra keyword arguments passed to solve_ivp.
+        Returns
+        -------
+        Array of shape (len(t), n_iso + n, *batch) with the solution (nan in
+        the time points after a failed integration stopped) and the result
+        of solve_ivp
+        """
+        c0 = np.broadcast_to(np.asarray(c, dtype=float), self.shape).ravel()
+        t = np.asarray(t, dtype=float)
+        rtol = kwargs.setdefault('rtol', 1E-8)
+        #Scale of each variable: its initial value, or the largest initial
+        # value of its kind if it starts at 0
+        scale = np.abs(np.reshape(c0, (self.shape[0], -1)))
+        for kind in [scale[:self.n_iso], scale[self.n_iso:]]:
+            kind[kind == 0] = kind.max() if kind.max() > 0 else 1E-30
+        kwargs.setdefault('atol', rtol*1E-3*scale.ravel())
+        if method == 'LSODA':
+            jac = lambda time, y: self.jac(y, time).toarray()
+        else:
+            jac = lambda time, y: self.jac(y, time)
+        out = solve_ivp(lambda time, y: self.rhs(y, time), (t[0], t[-1]), c0,
+                        method=method, t_eval=t, jac=jac, **kwargs)
+        sol = np.full((len(t), len(c0)), np.nan)
+        sol[:out.y.shape[1]] = out.y.T
+        return sol.reshape((-1,) + self.shape), out
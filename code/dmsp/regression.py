@@ -0,0 +1,85 @@
+"""
+Linear regressions of many series at once, used to extract the
+fractionation factor (the slope of the linear approximation of d34S vs.
+-ln(f_R)) from all the runs of a sweep.
+"""
+import numpy as np
+
+
+def linregress_batch(x, y, exclude_first=False):
+    '''
+    Function that fits a least squares line to each row of x and y in a
+    single pass, equivalent to calling scipy.stats.linregress on each row.
+    Parameters
+    ----------
+    x, y: array-like.
+    Arrays of shape (N, T) with the T points of each of the N series. They are
+    broadcast against each other, so a single time axis of shape (T,) can be
+    used for x.
+    exclude_first: bool.
+    If True, the first point of each series is not used, e.g. t = 0, where
+    -ln(f_R) = 0.
+    Returns
+    -------
+    Arrays of shape (N,) with the slope, intercept and r^2 of each series.
+    Series in which x does not change have slope and r^2 nan.
+    '''
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                               np.asarray(y, dtype=float))
+    if exclude_first:
+        x, y = x[..., 1:], y[..., 1:]
+    #Center the data on the means of each series to reduce rounding errors
+    x_mean = x.mean(axis=-1)
+    y_mean = y.mean(axis=-1)
+    dx = x - x_mean[..., None]
+    dy = y - y_mean[..., None]
+    ssxm = np.einsum('...i,...i->...', dx, dx)
+    ssym = np.einsum('...i,...i->...', dy, dy)
+    ssxym = np.einsum('...i,...i->...', dx, dy)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = ssxym/ssxm
+        r2 = ssxym**2/(ssxm*ssym)
+    #A horizontal line fits perfectly, as in linregress
+    r2 = np.where((ssym == 0) & (ssxm != 0), 1.0, np.minimum(r2, 1.0))
+    intercept = y_mean - slope*x_mean
+    return slope, intercept, r2
+
+
+def slope_derivative(x, y, dx, dy, exclude_first=False):
+    '''
+    Function that calculates the derivatives of the least squares slope of
+    y vs. x with respect to a set of parameters, from the derivatives of each
+    point of x and y (e.g. from a forward sensitivity integration).
+    Parameters
+    ----------
+    x, y: array-like.
+    Arrays of shape (..., T) with the points of each series.
+    dx, dy: array-like.
+    Arrays of shape (..., T, P) with the derivatives of x and y with respect
+    to each of the P parameters.
+    exclude_first: bool.
+    If True, the first point of each series is not used.
+    Returns
+    -------
+    Array of shape (..., P) with the derivatives of the slope
+    '''
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    dx, dy = np.asarray(dx, dtype=float), np.asarray(dy, dtype=float)
+    if exclude_first:
+        x, y = x[..., 1:], y[..., 1:]
+        dx, dy = dx[..., 1:, :], dy[..., 1:, :]
+    #Centered values and centered derivatives
+    xc = x - x.mean(axis=-1, keepdims=True)
+    yc = y - y.mean(axis=-1, keepdims=True)
+    dxc = dx - dx.mean(axis=-2, keepdims=True)
+    dyc = dy - dy.mean(axis=-2, keepdims=True)
+    ssxm = np.einsum('...i,...i->...', xc, xc)
+    ssxym = np.einsum('...i,...i->...', xc, yc)
+    #Derivatives of the sums of squares, by the product rule
+    d_ssxm = 2*np.einsum('...i,...ip->...p', xc, dxc)
+    d_ssxym = (np.einsum('...ip,...i->...p', dxc, yc) +
+               np.einsum('...i,...ip->...p', xc, dyc))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return ((d_ssxym*ssxm[..., None] - ssxym[..., None]*d_ssxm)/
+                ssxm[..., None]**2)
@@ -0,0 +1,294 @@
+"""
+Ocean model of DMSP forced with time-varying fluxes of DMSP and transcripts
+of the enzymes (e.g. seasonal cycles), and its periodic steady state found by
+stroboscopic sampling: the state is sampled once per period and the period
+map is solved with Newton steps, instead of integrating for many years.
+"""
+import numpy as np
+from scipy.integrate import odeint
+
+from .isotopes import isotopologues, DELTA_IN_OCEAN
+from .ocean import OceanModel, ocean_vol
+
+#Length of a year in min
+year = 365*24*60
+
+
+def periodic_forcing(mean, amplitude=0, phase=0, period=year):
+    '''
+    Function that builds a sinusoidal forcing.
+    Parameters
+    ----------
+    mean: float or array-like.
+    Average value over a period.
+    amplitude: float or array-like.
+    Amplitude relative to the mean, between 0 and 1.
+    phase: float or array-like.
+    Time of the maximum in min.
+    period: float.
+    Period in min.
+    Returns
+    -------
+    Function of time f(t) = mean*(1 + amplitude*cos(2*pi*(t - phase)/period))
+    '''
+    mean = np.asarray(mean, dtype=float)
+    amplitude = np.asarray(amplitude, dtype=float)
+    phase = np.asarray(phase, dtype=float)
+
+    def fun(t):
+        return mean*(1 + amplitude*np.cos(2*np.pi*(t - phase)/period))
+    return fun
+
+
+def interpolated_forcing(t, values, period=year):
+    '''
+    Function that builds a forcing by linear interpolation of a time series,
+    e.g. monthly climatologies.
+    Parameters
+    ----------
+    t: array-like.
+    Time points of the series in min.
+    values: array-like.
+    Values of the series, with time in the last dimension.
+    period: float.
+    Period of the series in min, so that it wraps around. None to hold the
+    first and last values outside of t.
+    Returns
+    -------
+    Function of time f(t)
+    '''
+    t = np.asarray(t, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if period is not None:
+        #Close the cycle with the first point one period later
+        order = np.argsort(t % period)
+        t = np.append(t[order] % period, t[order][0] % period + period)
+        values = np.concatenate([values[..., order], values[..., order[:1]]],
+                                axis=-1)
+        t = np.insert(t, 0, t[-2] - period)
+        values = np.concatenate([values[..., -2:-1], values], axis=-1)
+    flat = values.reshape(-1, len(t))
+
+    def fun(time):
+        if period is not None:
+            time = time % period
+        return np.array([np.interp(time, t, v) for v in flat]).reshape(
+            values.shape[:-1])
+    return fun
+
+
+class ForcedOceanModel(OceanModel):
+    """
+    OceanModel in which the flux of DMSP and the transcripts of the enzymes
+    can be functions of time.
+    Parameters
+    ----------
+    df_enzymes: dataframe.
+    Table of enzymes with the columns of enzyme_table.
+    f_total_in: float, array-like or callable.
+    [DMSP] that enters the system in nmol/min, or a function of time in min
+    that returns it, e.g. from periodic_forcing or interpolated_forcing.
+    transcripts: array-like or callable.
+    Transcripts of each enzyme in mRNA/l, or a function of time that returns
+    them, with the first dimension running over the enzymes.
+    kwargs:
+    Other arguments of OceanModel (kappa_32, alpha, vmax_32, vmax_34,
+    delta_in).
+    """
+    def __init__(self, df_enzymes, f_total_in, transcripts=None, **kwargs):
+        self.f_total_in_t = f_total_in if callable(f_total_in) else None
+        self.transcripts_t = transcripts if callable(transcripts) else None
+        #The values at t = 0 set the shape of the batch
+        super().__init__(
+            df_enzymes,
+            f_total_in(0) if callable(f_total_in) else f_total_in,
+            transcripts=transcripts(0) if callable(transcripts) else transcripts,
+            **kwargs)
+        #Flux in of each isotopologue per unit of f_total_in
+        self.f_in_unit = isotopologues(
+            1.0, self.mass_numbers,
+            delta_in=kwargs.get('delta_in', DELTA_IN_OCEAN),
+            cap_delta_in=kwargs.get('cap_delta_in'))/ocean_vol
+        self.f_in_unit = self.f_in_unit.reshape((self.n_iso,) +
+                                                (1,)*len(self.batch_shape))
+
+    def enzyme_at(self, t):
+        """
+        Function that returns the concentration of each enzyme in mg/l at
+        time t, with shape (n_enzymes, *batch).
+        """
+        if self.transcripts_t is None:
+            return self.enzyme
+        transcripts = np.asarray(self.transcripts_t(t), dtype=float)
+        ndim = self.enzyme.ndim
+        return self.enzyme_per_transcript*transcripts.reshape(
+            transcripts.shape + (1,)*(ndim - transcripts.ndim))
+
+    def forcing(self, t):
+        """
+        Function that returns the flux in of each isotopologue and kappa * E
+        of each enzyme at time t.
+        """
+        f_in, kappa_enz = self.f_in, self.kappa_enz
+        ndim = len(self.batch_shape)
+        if self.f_total_in_t is not None:
+            f_total_in = np.asarray(self.f_total_in_t(t), dtype=float)
+            f_in = self.f_in_unit*f_total_in.reshape(
+                f_total_in.shape + (1,)*(ndim - f_total_in.ndim))
+        if self.transcripts_t is not None:
+            kappa_enz = self.kappa*self.enzyme_at(t)
+        return f_in, kappa_enz
+
+    def jac_diag2(self, c, t=0):
+        """
+        Function that computes the second derivatives of dD34_dt and dD32_dt
+        with respect to 34DMSP and 32DMSP, with shape (2, *batch).
+        """
+        dmsp = np.reshape(c, (self.n_iso,) + self.batch_shape)[:, None]
+        _, kappa_enz = self.forcing(t)
+        return (2 * kappa_enz * self.kappa * self.vmax**2/
+                (self.vmax + self.kappa * dmsp)**3).sum(axis=1)
+
+    @staticmethod
+    def _odeint_options(c, **kwargs):
+        #The concentrations of the model are far below the default absolute
+        # tolerance of odeint, so it is set relative to them
+        kwargs.setdefault('rtol', 1E-10)
+        kwargs.setdefault('atol', 1E-10*np.min(np.abs(c)))
+        kwargs.setdefault('mxstep', 5000)
+        return kwargs
+
+    def period_map(self, c, t0, period, **kwargs):
+        """
+        Function that integrates the model over one period together with the
+        derivative of the final state with respect to the initial state.
+        Since each concentration is degraded independently, the derivative
+        is diagonal and follows dv/dt = (d rhs/dc) v, v(t0) = 1. The
+        concentration and its derivative are interleaved so that the
+        Jacobian of the extended system is banded.
+        Parameters
+        ----------
+        c: array-like.
+        Concentration of 34DMSP and 32DMSP at t0, with shape (2, *batch).
+        t0: float.
+        Start of the period in min.
+        period: float.
+        Period in min.
+        kwargs:
+        Extra keyword arguments passed to odeint.
+        Returns
+        -------
+        Concentration at t0 + period and its derivative with respect to the
+        concentration at t0, both with shape (2, *batch)
+        """
+        shape = (self.n_iso,) + self.batch_shape
+
+        def rhs(y, t):
+            y = y.reshape(shape + (2,))
+            dc_dt = self.rhs(y[..., 0], t)
+            dv_dt = self.jac_diag(y[..., 0], t)*y[..., 1]
+            return np.stack([dc_dt, dv_dt], axis=-1).ravel()
+
+        def jac(y, t):
+            #Main diagonal and first lower diagonal
+            y = y.reshape(shape + (2,))
+            diag = self.jac_diag(y[..., 0], t)
+            lower = np.stack([self.jac_diag2(y[..., 0], t)*y[..., 1],
+                              np.zeros(shape)], axis=-1).ravel()
+            return np.stack([np.repeat(diag.ravel(), 2), lower])
+
+        y0 = np.stack([np.broadcast_to(c, shape), np.ones(shape)],
+                      axis=-1).ravel()
+        kwargs = self._odeint_options(c, **kwargs)
+        y = odeint(rhs, y0, [t0, t0 + period], Dfun=jac, ml=1, mu=0,
+                   **kwargs)[-1].reshape(shape + (2,))
+        return y[..., 0], y[..., 1]
+
+    def periodic_steady_state(self, period=year, c=None, t0=0, tol=1E-9,
+                              max_periods=200, accelerate=True, **kwargs):
+        """
+        Function that finds the periodic steady state of the model by
+        stroboscopic sampling: the model is integrated one period at a time
+        and the state at the start of the period is updated until it repeats
+        itself. With accelerate, the state is updated with a Newton step on
+        the period map, c <- c + (P(c) - c)/(1 - P'(c)), which converges in a
+        few periods even if the model takes many years to relax.
+        Parameters
+        ----------
+        period: float.
+        Period of the forcing in min.
+        c: array-like.
+        Initial guess of the concentration of 34DMSP and 32DMSP at t0 in nM.
+        Default is the steady state with the forcing frozen at t = 0.
+        t0: float.
+        Phase of the stroboscopic sampling in min.
+        tol: float.
+        Maximum change of the concentrations over a period, relative to the
+        concentrations.
+        max_periods: int.
+        Maximum number of periods integrated.
+        accelerate: bool.
+        Whether to update the state with Newton steps (True) or simply with
+        the state after each period (False).
+        kwargs:
+        Extra keyword arguments passed to odeint (e.g. rtol, atol).
+        Returns
+        -------
+        Concentration of 34DMSP and 32DMSP at t0 in the periodic steady
+        state, with shape (2, *batch), the number of periods integrated and
+        whether it converged
+        """
+        if c is None:
+            #Steady state with the forcing frozen at t = 0
+            c, _ = self.steady_state()
+        c = np.asarray(c, dtype=float)
+        if c.ndim == 1:
+            c = c.reshape((self.n_iso,) + (1,) * len(self.batch_shape))
+        c = np.broadcast_to(c, (self.n_iso,) + self.batch_shape).copy()
+
+        for n_periods in range(1, max_periods + 1):
+            x, v = self.period_map(c, t0, period, **kwargs)
+            change = x - c
+            if np.all(np.abs(change) <= tol*np.abs(x)):
+                return x, n_periods, True
+            if accelerate:
+                #Newton step, c + (P(c) - c)/(1 - P'(c)) = P(c) + P'(c)(P(c)
+                # - c)/(1 - P'(c)), limited to a factor of e^2 from P(c)
+                c = np.clip(x + v*change/(1 - v), x*np.exp(-2), x*np.exp(2))
+            else:
+                c = x
+        return x, n_periods, False
+
+    def seasonal_cycle(self, t, period=year, c=None, tol=1E-9,
+                       max_periods=200, accelerate=True, **kwargs):
+        """
+        Function that integrates the periodic steady state over one period.
+        Parameters
+        ----------
+        t: array-like.
+        Time points within a period in min, starting at the phase t[0].
+        period: float.
+        Period of the forcing in min.
+        c: array-like.
+        Initial guess of the concentration of 34DMSP and 32DMSP.
+        tol, max_periods, accelerate:
+        Arguments of periodic_steady_state.
+        kwargs:
+        Extra keyword arguments passed to odeint (e.g. rtol, atol).
+        Returns
+        -------
+        Array of shape (len(t), 2, *batch) with the concentration of 34DMSP
+        and 32DMSP, the number of periods integrated to find the periodic
+        steady state and whether it converged
+        """
+        t = np.asarray(t, dtype=float)
+        c0, n_periods, converged = self.periodic_steady_state(
+            period, c=c, t0=t[0], tol=tol, max_periods=max_periods,
+            accelerate=accelerate, **kwargs)
+        shape = (self.n_iso,) + self.batch_shape
+        #The Jacobian is diagonal
+        sol = odeint(lambda y, time: self.rhs(y.reshape(shape), time).ravel(),
+                     c0.ravel(), t, Dfun=lambda y, time: self.jac_diag(
+                         y.reshape(shape), time).reshape(1, -1),
+                     ml=0, mu=0, **self._odeint_options(c0, **kwargs))
+        return sol.reshape((len(t),) + shape), n_periods, converged
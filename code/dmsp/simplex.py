@@ -0,0 +1,192 @@
+"""
+Enumeration of the compositions of three enzymes (e.g. the fractions of
+transcripts or of kappa of Alma1, DddP and DmdA) used to build the ternary
+maps of the expected d34S of DMSP.
+"""
+import numpy as np
+
+
+def lattice_size(n):
+    '''
+    Function that calculates the number of points of the simplex lattice with
+    n subdivisions per edge.
+    Parameters
+    ----------
+    n: int.
+    Number of subdivisions of each edge of the simplex.
+    Returns
+    -------
+    Number of points
+    '''
+    return (n + 1) * (n + 2) // 2
+
+
+def simplex_lattice(n, total=1.0, start=0, stop=None):
+    '''
+    Function that enumerates the points of the {3, n} simplex lattice, i.e.
+    all the compositions (a, b, c) with a + b + c = total in which each
+    component is a multiple of total/n. Only feasible compositions are
+    generated, in the same order as two nested loops over a (outer) and
+    b (inner).
+    Parameters
+    ----------
+    n: int.
+    Number of subdivisions of each edge of the simplex.
+    total: float.
+    Sum of the three components, e.g. 1 for fractions or the total number
+    of transcripts.
+    start, stop: int.
+    Range of points of the lattice to return, to generate it in batches.
+    Returns
+    -------
+    Array of shape (number of points, 3) with the compositions
+    '''
+    size = lattice_size(n)
+    stop = size if stop is None else min(stop, size)
+    k = np.arange(start, stop)
+    #Number of points before the row with a = i is i*(n+1) - i*(i-1)/2.
+    # Invert this expression to find the row of each point.
+    i = np.floor(((2*n + 3) - np.sqrt((2*n + 3)**2 - 8*k))/2).astype(int)
+    #Correct for rounding errors in the square root
+    first = i*(n + 1) - i*(i - 1)//2
+    i = np.where(first > k, i - 1, i)
+    first = i*(n + 1) - i*(i - 1)//2
+    i = np.where(k >= first + (n + 1 - i), i + 1, i)
+    first = i*(n + 1) - i*(i - 1)//2
+    j = k - first
+
+    counts = np.stack([i, j, n - i - j], axis=1)
+    return counts * (total/n)
+
+
+def simplex_batches(n, batch_size, total=1.0):
+    '''
+    Generator that yields the points of simplex_lattice in batches, so that
+    lattices with many subdivisions can be evaluated without holding all the
+    model states in memory.
+    Parameters
+    ----------
+    n: int.
+    Number of subdivisions of each edge of the simplex.
+    batch_size: int.
+    Maximum number of points per batch.
+    total: float.
+    Sum of the three components.
+    Yields
+    ------
+    Arrays of shape (batch size, 3) with the compositions
+    '''
+    size = lattice_size(n)
+    for start in range(0, size, batch_size):
+        yield simplex_lattice(n, total, start, start + batch_size)
+
+
+def ternary_xy(fr_alma1, fr_dddp, fr_dmda):
+    '''
+    Function that translates compositions to the Cartesian coordinates used
+    in the ternary plots of code/figures/modelling.
+    Parameters
+    ----------
+    fr_alma1, fr_dddp, fr_dmda: array-like.
+    Fractions of each enzyme.
+    Returns
+    -------
+    x and y coordinates
+    '''
+    total = fr_alma1 + fr_dddp + fr_dmda
+    x = 0.5 * (2.*fr_dddp + fr_dmda)/total
+    y = 0.5*np.sqrt(3) * fr_dmda/total
+    return x, y
+
+
+def _lattice_triangles(n):
+    '''
+    Function that returns the triangles of the simplex lattice with n
+    subdivisions as an array of shape (number of triangles, 3, 2) with the
+    first two integer coordinates of their vertices.
+    '''
+    i, j = np.nonzero(np.add.outer(np.arange(n), np.arange(n)) <= n - 1)
+    up = np.stack([np.stack([i, j], 1), np.stack([i + 1, j], 1),
+                   np.stack([i, j + 1], 1)], axis=1)
+    i, j = np.nonzero(np.add.outer(np.arange(n), np.arange(n)) <= n - 2)
+    down = np.stack([np.stack([i + 1, j], 1), np.stack([i, j + 1], 1),
+                     np.stack([i + 1, j + 1], 1)], axis=1)
+    return np.concatenate([up, down])
+
+
+def adaptive_simplex(fun, tol, n_initial=8, max_depth=6):
+    '''
+    Function that samples a function of the composition of three enzymes
+    (e.g. the d34S of DMSP at steady state) adaptively. It starts with the
+    triangles of a coarse simplex lattice and splits into four only the
+    triangles in which the values at the vertices differ by more than tol,
+    until they are below tol or max_depth splits are reached.
+    Parameters
+    ----------
+    fun: callable.
+    Function that takes an array of compositions of shape (M, 3), with the
+    fractions of the three enzymes, and returns an array of M values.
+    All the new points of each level are evaluated in a single call.
+    tol: float.
+    Maximum difference between the values at the vertices of a triangle.
+    n_initial: int.
+    Number of subdivisions of the initial lattice.
+    max_depth: int.
+    Maximum number of times that a triangle of the initial lattice is split.
+    Returns
+    -------
+    Array of compositions of shape (P, 3) and array of P values. The
+    compositions can be translated with ternary_xy and passed directly to
+    tri.Triangulation.
+    '''
+    #Work with integer coordinates on the finest possible lattice, so that
+    # the points shared by neighbouring triangles are evaluated only once
+    scale = 2**max_depth
+    n_fine = n_initial * scale
+    triangles = _lattice_triangles(n_initial) * scale
+
+    #Integer keys of the evaluated points, sorted, and their position in
+    # points and values
+    keys = np.empty(0, dtype=np.int64)
+    order = np.empty(0, dtype=np.int64)
+    points = []
+    values = []
+
+    def evaluate(coords):
+        #Evaluate the points that have not been evaluated yet and return the
+        # index of the vertices of each triangle
+        nonlocal keys, order
+        coord_keys = coords[..., 0].astype(np.int64)*(n_fine + 1) + coords[..., 1]
+        new = np.setdiff1d(np.unique(coord_keys), keys)
+        if new.size:
+            a, b = np.divmod(new, n_fine + 1)
+            comps = np.stack([a, b, n_fine - a - b], axis=1)/n_fine
+            start = len(points)
+            points.extend(comps)
+            values.extend(np.asarray(fun(comps), dtype=float))
+            keys = np.concatenate([keys, new])
+            order = np.concatenate([order, np.arange(start, len(points))])
+            sort = np.argsort(keys)
+            keys, order = keys[sort], order[sort]
+        return order[np.searchsorted(keys, coord_keys)]
+
+    vertices = evaluate(triangles)
+    for depth in range(max_depth):
+        vals = np.asarray(values)[vertices]
+        refine = (vals.max(axis=1) - vals.min(axis=1)) > tol
+        if not np.any(refine):
+            break
+        tris = triangles[refine]
+        #Midpoints of the edges of the triangles that are split
+        m01 = (tris[:, 0] + tris[:, 1])//2
+        m12 = (tris[:, 1] + tris[:, 2])//2
+        m02 = (tris[:, 0] + tris[:, 2])//2
+        children = np.concatenate([
+            np.stack([tris[:, 0], m01, m02], axis=1),
+            np.stack([m01, tris[:, 1], m12], axis=1),
+            np.stack([m02, m12, tris[:, 2]], axis=1),
+            np.stack([m01, m12, m02], axis=1)])
+        triangles = np.concatenate([triangles[~refine], children])
+        vertices = evaluate(triangles)
+
+    return np.array(points), np.array(values)
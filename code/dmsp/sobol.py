@@ -0,0 +1,137 @@
+"""
+Global sensitivity analysis with Sobol indices. The parameters are sampled
+with Saltelli's scheme from a scrambled Sobol sequence, and the first-order
+and total indices are estimated with the estimators of Saltelli et al. (2010)
+and Jansen (1999).
+"""
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from .sweeps import run_sweep
+
+
+def saltelli_sample(bounds, n, log_scale=None, seed=None):
+    '''
+    Function that draws the two independent matrices of Saltelli's scheme.
+    Parameters
+    ----------
+    bounds: array-like.
+    Array of shape (k, 2) with the lower and upper bound of each parameter.
+    n: int.
+    Number of base samples. A power of 2 keeps the balance of the Sobol
+    sequence.
+    log_scale: array-like of bool.
+    Parameters sampled uniformly in log space, e.g. kinetic parameters
+    that span orders of magnitude.
+    seed: int.
+    Seed of the scrambling of the Sobol sequence.
+    Returns
+    -------
+    Matrices A and B of shape (n, k)
+    '''
+    bounds = np.asarray(bounds, dtype=float)
+    k = len(bounds)
+    log_scale = (np.zeros(k, dtype=bool) if log_scale is None
+                 else np.asarray(log_scale, dtype=bool))
+    low, high = bounds.T
+    low = np.where(log_scale, np.log(np.where(log_scale, low, 1)), low)
+    high = np.where(log_scale, np.log(np.where(log_scale, high, 1)), high)
+
+    sample = qmc.Sobol(2*k, scramble=True, seed=seed).random(n)
+    sample = low + sample.reshape(n, 2, k)*(high - low)
+    sample = np.where(log_scale, np.exp(sample), sample)
+    return sample[:, 0], sample[:, 1]
+
+
+def saltelli_matrix(a, b):
+    '''
+    Function that stacks the n*(k+2) parameter sets at which the model is
+    evaluated: A, B and the k matrices AB_i, which are A with the column i
+    taken from B.
+    Returns
+    -------
+    Array of shape ((k+2)*n, k)
+    '''
+    n, k = a.shape
+    ab = np.repeat(a[None], k, axis=0)
+    ab[np.arange(k), :, np.arange(k)] = b.T
+    return np.concatenate([a[None], b[None], ab]).reshape(-1, k)
+
+
+def sobol_indices(y, k):
+    '''
+    Function that estimates the first-order and total Sobol indices from the
+    model evaluated at the parameter sets of saltelli_matrix.
+    Parameters
+    ----------
+    y: array-like.
+    Array of (k+2)*n model outputs in the order of saltelli_matrix.
+    k: int.
+    Number of parameters.
+    Returns
+    -------
+    Arrays of shape (k,) with the first-order and total indices
+    '''
+    y = np.asarray(y, dtype=float).reshape(k + 2, -1)
+    y_a, y_b, y_ab = y[0], y[1], y[2:]
+    var = np.var(np.concatenate([y_a, y_b]))
+    first = np.mean(y_b*(y_ab - y_a), axis=1)/var
+    total = 0.5*np.mean((y_a - y_ab)**2, axis=1)/var
+    return first, total
+
+
+def sobol_analysis(fun, bounds, n, names=None, log_scale=None,
+                   n_convergence=None, seed=None, chunk_size=10000,
+                   n_workers=None, checkpoint_dir=None):
+    '''
+    Function that calculates the Sobol indices of a vectorized model, with
+    the model evaluations distributed among processes with
+    dmsp.sweeps.run_sweep, and reports how the indices converge with the
+    number of samples.
+    Parameters
+    ----------
+    fun: callable.
+    Picklable function that takes an array of parameter sets of shape (M, k)
+    and returns an array of M outputs, e.g. d34s_steady_state_3_comp.
+    bounds: array-like.
+    Array of shape (k, 2) with the lower and upper bound of each parameter.
+    n: int.
+    Number of base samples. The model is evaluated (k+2)*n times.
+    names: list.
+    Names of the parameters.
+    log_scale: array-like of bool.
+    Parameters sampled uniformly in log space.
+    n_convergence: list of int.
+    Numbers of base samples (at most n) at which the indices are also
+    estimated, using the first samples of the sequence. Default is the
+    powers of 2 from 64 to n.
+    seed: int.
+    Seed of the scrambling of the Sobol sequence.
+    chunk_size, n_workers, checkpoint_dir:
+    Arguments of run_sweep.
+    Returns
+    -------
+    Dataframe with the columns 'n_samples', 'n_evaluations', 'parameter',
+    'S1' and 'ST'
+    '''
+    bounds = np.asarray(bounds, dtype=float)
+    k = len(bounds)
+    names = [f'x{i}' for i in range(k)] if names is None else list(names)
+    if n_convergence is None:
+        n_convergence = [2**i for i in range(6, int(np.log2(n)) + 1)]
+    n_convergence = sorted(set(min(m, n) for m in n_convergence) | {n})
+
+    a, b = saltelli_sample(bounds, n, log_scale, seed)
+    params = saltelli_matrix(a, b)
+    y = run_sweep(fun, params, chunk_size=chunk_size,
+                  checkpoint_dir=checkpoint_dir, n_workers=n_workers)
+    y = y.reshape(k + 2, n)
+
+    rows = []
+    for m in n_convergence:
+        first, total = sobol_indices(y[:, :m], k)
+        for name, s1, st in zip(names, first, total):
+            rows.append({'n_samples': m, 'n_evaluations': (k + 2)*m,
+                         'parameter': name, 'S1': s1, 'ST': st})
+    return pd.DataFrame(rows)
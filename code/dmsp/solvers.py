@@ -0,0 +1,78 @@
+"""
+Common interface to the ODE solvers used to integrate the DMSP models.
+"""
+import numpy as np
+from scipy.integrate import odeint, solve_ivp
+
+# Solvers available through integrate
+methods = ('odeint', 'LSODA', 'BDF', 'Radau', 'RK45')
+
+
+def integrate(rhs, c, t, args=(), jac=None, method='odeint', **kwargs):
+    """
+    Function that integrates a DMSP model with the selected solver.
+    Parameters
+    ----------
+    rhs: callable.
+    Right-hand side of the model with the signature of odeint, rhs(c, t, *args).
+    c: array-like.
+    Initial state.
+    t: array-like.
+    Time points in which the solution is returned.
+    args: tuple.
+    Extra arguments of rhs and jac.
+    jac: callable.
+    Jacobian of rhs with the same signature, returning the matrix
+    d rhs_i/d c_j. If None, the solver estimates it by finite differences.
+    method: str.
+    'odeint' (LSODA from ODEPACK) or one of the methods of solve_ivp
+    ('LSODA', 'BDF', 'Radau', 'RK45').
+    kwargs:
+    Extra keyword arguments passed to the solver (e.g. rtol, atol).
+
+    Returns
+    -------
+    Array of shape (len(t), len(c)) with the solution (nan in the time points
+    after a failed integration stopped), and a dictionary with
+    the method, the number of calls to rhs ('nfev', including those used to
+    estimate the Jacobian by finite differences) and to jac ('njev'), and
+    whether the integration was successful ('success')
+    """
+    if method not in methods:
+        raise ValueError(f'method must be one of {methods}, not {method}')
+
+    c = np.asarray(c, dtype=float)
+    t = np.asarray(t, dtype=float)
+    args = tuple(args)
+
+    #Count the calls to rhs and jac, so that all the solvers report the
+    # number of evaluations in the same way
+    counts = {'nfev': 0, 'njev': 0}
+
+    def fun(y, time, *fargs):
+        counts['nfev'] += 1
+        return rhs(y, time, *fargs)
+
+    def fun_jac(y, time, *fargs):
+        counts['njev'] += 1
+        return jac(y, time, *fargs)
+
+    if method == 'odeint':
+        sol, out = odeint(fun, c, t, args=args,
+                          Dfun=None if jac is None else fun_jac,
+                          full_output=True, **kwargs)
+        success = out['message'] == 'Integration successful.'
+    else:
+        #solve_ivp uses the signature f(t, y)
+        if jac is not None and method != 'RK45':
+            kwargs['jac'] = lambda time, y: fun_jac(y, time, *args)
+        out = solve_ivp(lambda time, y: fun(y, time, *args), (t[0], t[-1]), c,
+                        method=method, t_eval=t, **kwargs)
+        #A failed integration stops early: the time points that were not
+        # reached are nan, so that the rows still match t
+        sol = np.full((len(t), len(c)), np.nan)
+        sol[:out.y.shape[1]] = out.y.T
+        success = bool(out.success)
+
+    info = {'method': method, 'success': success, **counts}
+    return sol, info
@@ -0,0 +1,199 @@
+"""
+Runner for parameter sweeps of the DMSP models. The parameter sets are split
+into chunks that are evaluated in a pool of processes, and every finished
+chunk is saved to disk, so that an interrupted sweep resumes from the chunks
+that are already done. The checkpoint is deleted when the sweep is complete.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .cache import cache_key
+
+
+def _chunk_path(checkpoint_dir, i):
+    return os.path.join(checkpoint_dir, f'chunk_{i:06d}.npy')
+
+
+def _save_chunk(checkpoint_dir, i, result):
+    #Write to a temporary file and rename it, so that a preempted run never
+    # leaves a partially written chunk behind
+    path = _chunk_path(checkpoint_dir, i)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, result)
+    os.replace(tmp, path)
+
+
+def _check_manifest(checkpoint_dir, fun, params, chunk_size, key):
+    '''
+    Function that creates the manifest of a checkpoint directory, or checks
+    that an existing one was written for the same sweep. The manifest
+    includes a hash of fun, its arguments (e.g. those of a functools.partial)
+    and the source code of its module, as in dmsp.cache, so that the chunks
+    of a sweep are not reused after the model or the solver change. A
+    directory that is not empty and has no manifest is not a checkpoint, and
+    is refused so that its files are never deleted with the checkpoint.
+    '''
+    manifest = {'key': key,
+                'fun': cache_key(fun),
+                'n_points': len(params),
+                'chunk_size': chunk_size,
+                'params_sha1': hashlib.sha1(
+                    np.ascontiguousarray(params).tobytes()).hexdigest()}
+    #Compare the manifests as they are stored, e.g. with tuples as lists
+    manifest = json.loads(json.dumps(manifest))
+    path = os.path.join(checkpoint_dir, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(f'The checkpoint in {checkpoint_dir} was written '
+                             'for a different sweep. Delete it or use '
+                             'another checkpoint_dir.')
+    else:
+        if os.path.isdir(checkpoint_dir) and os.listdir(checkpoint_dir):
+            raise ValueError(f'{checkpoint_dir} is not empty and is not a '
+                             'checkpoint. Use an empty or new directory.')
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+
+
+def run_sweep(fun, params, chunk_size=1000, checkpoint_dir=None, key=None,
+              n_workers=None):
+    '''
+    Function that evaluates fun over all the parameter sets in chunks, in a
+    pool of processes, with an optional on-disk checkpoint.
+    Parameters
+    ----------
+    fun: callable.
+    Function that takes an array with a chunk of parameter sets (a slice of
+    params along the first axis) and returns an array with one result per
+    parameter set. It must be picklable, i.e. a top-level function or a
+    functools.partial of one.
+    params: array-like.
+    Array with one parameter set per row.
+    chunk_size: int.
+    Number of parameter sets per chunk. It is part of the checkpoint, since
+    batched solvers (e.g. OceanModel.steady_state) iterate all the sets of a
+    chunk together, so their results can differ in the last digits with
+    other chunk sizes.
+    checkpoint_dir: str.
+    Directory in which each finished chunk is saved. If it already contains
+    chunks of the same sweep, they are loaded instead of evaluated again.
+    It must be new, empty or a checkpoint. The chunks and the manifest are
+    deleted once all the chunks are done, and the directory too if nothing
+    else is left in it. None disables the checkpoint.
+    key: JSON-serializable.
+    Description of everything else that determines the results (e.g. the
+    parameters of the model), saved with the checkpoint so that chunks of a
+    sweep with other settings are never reused. fun and the source code of
+    its module are always part of the checkpoint.
+    n_workers: int.
+    Number of worker processes. Default is the number of CPUs. With 1, the
+    chunks are evaluated in the current process.
+    Returns
+    -------
+    Array with the results of all the parameter sets, in the order of params.
+    They do not depend on n_workers, nor on whether the sweep was resumed.
+    '''
+    params = np.asarray(params)
+    n_chunks = -(-len(params) // chunk_size)
+    chunks = [params[i*chunk_size:(i + 1)*chunk_size] for i in range(n_chunks)]
+
+    results = [None] * n_chunks
+    if checkpoint_dir is not None:
+        _check_manifest(checkpoint_dir, fun, params, chunk_size, key)
+        for i in range(n_chunks):
+            if os.path.exists(_chunk_path(checkpoint_dir, i)):
+                results[i] = np.load(_chunk_path(checkpoint_dir, i))
+
+    def store(i, result):
+        results[i] = np.asarray(result)
+        if checkpoint_dir is not None:
+            _save_chunk(checkpoint_dir, i, results[i])
+
+    pending = [i for i in range(n_chunks) if results[i] is None]
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    if n_workers == 1 or len(pending) <= 1:
+        for i in pending:
+            store(i, fun(chunks[i]))
+    else:
+        #Fork the workers where possible, so that scripts without a
+        # __main__ guard can use the pool
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            'fork' if 'fork' in methods else None)
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(pending)),
+                                 mp_context=context) as pool:
+            futures = {pool.submit(fun, chunks[i]): i for i in pending}
+            for future in as_completed(futures):
+                store(futures[future], future.result())
+
+    results = np.concatenate(results) if n_chunks else np.empty(0)
+    #All the chunks are done, so the checkpoint is no longer needed
+    if checkpoint_dir is not None:
+        for i in range(n_chunks):
+            os.remove(_chunk_path(checkpoint_dir, i))
+            #Leftovers of a preempted write
+            if os.path.exists(_chunk_path(checkpoint_dir, i) + '.tmp'):
+                os.remove(_chunk_path(checkpoint_dir, i) + '.tmp')
+        os.remove(os.path.join(checkpoint_dir, 'manifest.json'))
+        if not os.listdir(checkpoint_dir):
+            os.rmdir(checkpoint_dir)
+    return results
+
+
+def save_grid(path, grid):
+    '''
+    Function that saves a gridded result in the format of
+    xarray.Dataset.to_dict (dims, coords, data_vars and attrs) to a
+    compressed .npz file.
+    Parameters
+    ----------
+    path: str.
+    Path of the .npz file.
+    grid: dict.
+    Gridded result, e.g. from dmsp.enz_deg.epsilon_surface.
+    '''
+    arrays = {}
+    dims = {}
+    for group in ['coords', 'data_vars']:
+        for name, var in grid[group].items():
+            arrays[f'{group}/{name}'] = np.asarray(var['data'])
+            dims[f'{group}/{name}'] = list(var['dims'])
+    meta = {'dims': dims, 'attrs': grid.get('attrs', {})}
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+
+
+def load_grid(path):
+    '''
+    Function that loads a gridded result saved with save_grid.
+    Parameters
+    ----------
+    path: str.
+    Path of the .npz file.
+    Returns
+    -------
+    Dictionary in the format of xarray.Dataset.to_dict, which can be converted
+    with xarray.Dataset.from_dict
+    '''
+    grid = {'dims': {}, 'coords': {}, 'data_vars': {}}
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        for key, dims in meta['dims'].items():
+            group, name = key.split('/', 1)
+            grid[group][name] = {'dims': tuple(dims), 'data': data[key]}
+            grid['dims'].update(zip(dims, data[key].shape))
+    grid['attrs'] = meta['attrs']
+    return grid
@@ -0,0 +1,83 @@
+# %%
+#For numerical calculations
+import time
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes, isotopologues_to_delta, DELTA_IN_OCEAN
+from dmsp.enz_deg import dmsp_enz_deg, dmsp_enz_deg_jac
+from dmsp.ocean import (dmsp_system_3_comp_mm, dmsp_system_3_comp_mm_jac,
+                        t_steady_state)
+from dmsp.solvers import integrate
+
+# %%
+# Let's compare the solvers available through integrate for both DMSP
+# models, with and without the analytic Jacobian. All the solvers use the
+# same tolerances, and the error is the difference in the final d34S of DMSP
+# relative to a reference solution with very tight tolerances.
+rtol = 1E-8
+atol = 1E-12
+
+def benchmark(rhs, jac, c, t, args, iso_idx, methods):
+    '''
+    Function that integrates a model with each solver and returns a dataframe
+    with the time, number of evaluations and error in the final d34S.
+    iso_idx is the index of 34DMSP and 32DMSP in the state.
+    '''
+    #Reference solution
+    sol_ref, _ = integrate(rhs, c, t, args, jac=jac, method='odeint',
+                           rtol=1E-12, atol=1E-20)
+    d34s_ref = isotopologues_to_delta(sol_ref[-1, iso_idx[0]],
+                                      sol_ref[-1, iso_idx[1]])
+    rows = []
+    for method in methods:
+        for use_jac in [False, True]:
+            start = time.perf_counter()
+            sol, info = integrate(rhs, c, t, args,
+                                  jac=jac if use_jac else None,
+                                  method=method, rtol=rtol, atol=atol)
+            elapsed = time.perf_counter() - start
+            d34s = isotopologues_to_delta(sol[-1, iso_idx[0]],
+                                          sol[-1, iso_idx[1]])
+            rows.append({'method': method, 'analytic_jac': use_jac,
+                         'time_s': elapsed, 'nfev': info['nfev'],
+                         'njev': info['njev'],
+                         'error_d34S': abs(d34s - d34s_ref)})
+    return pd.DataFrame(rows)
+
+# %%
+# Enzyme degradation model, with the parameters of DMSP_enz_deg.py
+alpha = (-3.97/1000)+1
+dmsp_init = 207*1000
+c = (3.479,*isotopes(dmsp_init))
+km = 2E9
+vmax=(17000*(dmsp_init+km))/(dmsp_init*c[0])
+args = (alpha, vmax, vmax*0.8, vmax/km, 0.08)
+t = np.linspace(0, 53, 50)
+
+df_enz_deg = benchmark(dmsp_enz_deg, dmsp_enz_deg_jac, c, t, args, (1, 2),
+                       ['odeint', 'LSODA', 'BDF', 'Radau', 'RK45'])
+df_enz_deg
+
+# %%
+# Ocean model, with the intermediate kinetic parameters and 1E7 transcripts/L
+# of each enzyme, integrated until steady state
+f_total_in = (0.000015/60)*7.24E19
+args = (f_total_in, (-2.72/1000)+1, (-1.18/1000)+1, (-3.97/1000)+1,
+        10000, 2000, 600,
+        1E7/2, 4E7/2, 9E7/2, 1E7/2, 4E7/2, 9E7/2,
+        1E7, 1E7, 1E7)
+c = isotopes(10, delta_in=DELTA_IN_OCEAN)
+
+df_ocean = benchmark(dmsp_system_3_comp_mm, dmsp_system_3_comp_mm_jac, c,
+                     t_steady_state, args, (0, 1),
+                     ['odeint', 'LSODA', 'BDF', 'Radau'])
+df_ocean
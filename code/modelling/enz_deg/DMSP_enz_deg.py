@@ -13,94 +13,16 @@ import git
 repo = git.Repo("./", search_parent_directories=True)
 homedir = repo.working_dir
 
-# %% 
-#Let's define the function isotopes, which calculates the amount of 
-# 34DMSP and 32DMSP for a given DMSP concentration.
-
-def isotopes(c, r_34_std = 0.0450045, delta_in = 14.3):
-    
-    '''
-    Function that splits a DMSP concentration in the proportion of
-    heavy and light atoms.
-    Parameters
-    ----------
-    c: float.
-    Concentration of DMSP.
-    r_34_std: float.
-    34R of the VCDT standard. Error = +-0.0093
-    delta_in: float.
-    Delta 34S of the DMSP used in the assays for the assays, from Sigma.
-    Returns
-    -------
-    Concentration of 34DMSP, concentration of 32DMSP
-    '''
-        
-    # Calculate 34R in DMSP from Eq. 3
-    r_34_dmsp =r_34_std *(1+(delta_in/1000))
-    # Calculate 32_DMSP from Eq. 2
-    dmsp_32 = c/(1 + r_34_dmsp)
-    # Calculate 34_DMSP from Eq. 1
-    dmsp_34 = c - dmsp_32
-        
-    return [dmsp_34,dmsp_32]
-
-# %% 
-# Now, let's define a function that will numerically integrate the change in the 
-# concentrations of 34DMSP and 32DMSP over time.
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes, isotopologues_to_delta
+from dmsp.enz_deg import dmsp_enz_deg
+from dmsp.cache import SolutionCache
 
-def dmsp_enz_deg(
-    c, 
-    t,   
-    alpha,
-    vmax,
-    vmax_32,
-    kappa_32,
-    k
-):
-    """
-    Function that computes dD32_dt and dD34_dt of DMSP
-    Parameters
-    ----------
-    c: float.
-    Concentration of DMSP in nM.
-    t: int
-    Integration time in min.
-    alpha: float.
-    Alpha for cleavage by DddP from this study. 
-    vmax: float.
-    Vmax for cleavage by DddP, calculated from the K M that the enzyme should have to 
-    exhibit the pattern of d34S DMSP vs. time, in nM/min/nM enzyme
-    Vmax_d: float.
-    km: float.
-    K M that the enzyme should have to exhibit the pattern of d34S DMSP vs. time, in nM.
-    k: float.
-    Degradation rate of the enzyme, in min^-1.
-
-    Returns
-    -------
-    The dD32_dt and dD34_dt of DMSP
-    """
-
-    # Unpack isotopes
-    enzyme, dmsp_34, dmsp_32 = c
-    
-    #Calculate vmax_34 assuming that Vmax total = Vmax_32 + Vmax_34
-    #This assumption would only hold true at saturation
-    vmax_34 = vmax-vmax_32
-    
-    #Determination of kappa 32 from kappa 34 and the fractionation factor
-    kappa_34 = kappa_32 * alpha
-    
-    # Calculate dD34_dt
-    dD34_dt = - ((kappa_34 * enzyme * (vmax_34 * enzyme * dmsp_34/((vmax_34 * enzyme)+(kappa_34 * enzyme * dmsp_34)))))
-    
-    # Calculate dD32_dt
-    dD32_dt = - ((kappa_32 * enzyme * (vmax_32 * enzyme * dmsp_32/((vmax_32 * enzyme)+(kappa_32 * enzyme * dmsp_32)))))
-    
-    #Calculate dE_dt
-    dE_dt = -k*enzyme
-
-    return [dE_dt, dD34_dt, dD32_dt]
+#Cache of the solutions of the model, so that they are only integrated again
+# when the model or its parameters change
+cache = SolutionCache(f'{homedir}/data/modelling/.cache')
 
 # %% 
 #Let's define the parameters for integration
@@ -152,19 +74,16 @@ args = (
     kappa_32,
     k
 )
-# Integrate numerically with ODEint
-dmsp_iso = odeint(dmsp_enz_deg, c, t, args=args)
+# Integrate numerically with ODEint, or load the solution from the cache
+dmsp_iso, _ = cache.integrate(dmsp_enz_deg, c, t, args)
 
 # Split the values returned by the integration, using k=0
 enzyme_change_0= dmsp_iso[:,0]
 DMSP_34_0 = dmsp_iso[:,1]
 DMSP_32_0 = dmsp_iso[:,2]
 
-# Calculate 34R for k=0
-r_34_0 = DMSP_34_0/DMSP_32_0
-
 # Calculate d34S and total DMSP for k=0
-d34s_0 = (np.divide(r_34_0,r_34_std)-1) * 1000
+d34s_0 = isotopologues_to_delta(DMSP_34_0, DMSP_32_0, r_34_std)
 total_0 = DMSP_34_0+DMSP_32_0
 
 # Calculate the fraction of substrate remaining for k=0
@@ -189,19 +108,16 @@ args = (
     k
 )
 
-# Integrate numerically with ODEint
-dmsp_iso = odeint(dmsp_enz_deg, c, t, args=args)
+# Integrate numerically with ODEint, or load the solution from the cache
+dmsp_iso, _ = cache.integrate(dmsp_enz_deg, c, t, args)
 
 # Split the values returned by the integration, using k=!0
 enzyme_change_k= dmsp_iso[:,0]
 DMSP_34_k = dmsp_iso[:,1]
 DMSP_32_k = dmsp_iso[:,2]
 
-# Calculate 34R for k=!0
-r_34_k = DMSP_34_k/DMSP_32_k
-
 # Calculate d34S and total DMSP for k=!0
-d34s_k = (np.divide(r_34_k,r_34_std)-1) * 1000
+d34s_k = isotopologues_to_delta(DMSP_34_k, DMSP_32_k, r_34_std)
 total_k = DMSP_34_k+DMSP_32_k
 
 # Calculate the fraction of substrate remaining for k=!0
@@ -0,0 +1,99 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+from scipy.optimize import least_squares
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes
+from dmsp.enz_deg import integrate_events, dose
+# %%
+# In the Alma1 addition experiments further DMSP (experiment A) or Alma1
+# (experiment B) was added in the middle of the run. Instead of fitting
+# V_max to the data before and after the addition separately, each
+# treatment is fitted over the whole run with one V_max per unit of enzyme
+# and one rate of enzyme loss, integrating the additions as dosing events.
+df_add = pd.read_csv(f'{homedir}/data/raw/enz_deg/Alma1_add_exps.csv',
+                     encoding='utf-8-sig')
+df_add.head()
+# %%
+#K_M of Alma1 in uM, as in the separate fits
+km = 9000
+#The enzyme is in ug/ml and DMSP in uM, so V_max is in uM/min/(ug/ml)
+
+def simulate(params, data, experiment):
+    '''
+    Function that integrates the treatments of an experiment, with the
+    addition as a dosing event between the last sample before it and the
+    first sample after it.
+    Parameters
+    ----------
+    params: array-like.
+    V_max and rate of enzyme loss (min^-1) of each treatment, followed in
+    experiment A by the DMSP added to each treatment in uM.
+    data: dataframe.
+    Data of the experiment.
+    experiment: str.
+    'A' (DMSP added) or 'B' (Alma1 added).
+    Returns
+    -------
+    Array with the total DMSP of each treatment at the sampling times, with
+    shape (treatments, times)
+    '''
+    treatments = data['Treatment'].unique()
+    n = len(treatments)
+    vmax, k = params[:n], params[n:2*n]
+    before = data[data['Type'] == 'Before'].groupby('Treatment')
+    after = data[data['Type'] == 'After'].groupby('Treatment')
+    t_event = 0.5*(before['Time_min'].max().mean() +
+                   after['Time_min'].min().mean())
+    if experiment == 'A':
+        amounts = dose(dmsp=params[2*n:3*n])
+    else:
+        amounts = dose(enzyme=(after['Enzyme_ug_ml'].first() -
+                               before['Enzyme_ug_ml'].first()).to_numpy())
+    c = np.stack([before['Enzyme_ug_ml'].first().to_numpy(),
+                  *isotopes(before['DMSP_uM'].first().to_numpy())], axis=1)
+    t = np.sort(data['Time_min'].unique())
+    sol = integrate_events(c, t, [(t_event, amounts)], 1, vmax, 0.8*vmax,
+                           vmax/km, k)
+    return sol[:, :, 1] + sol[:, :, 2], t, treatments
+
+
+def residuals(params, data, experiment):
+    dmsp, t, treatments = simulate(params, data, experiment)
+    df_sim = pd.DataFrame(dmsp, index=treatments, columns=t).stack()
+    return (df_sim.loc[list(zip(data['Treatment'], data['Time_min']))].to_numpy()
+            - data['DMSP_uM'].to_numpy())
+# %%
+#Fit both experiments over the whole run
+fits = []
+for experiment, data in df_add.groupby('Experiment'):
+    n = data['Treatment'].nunique()
+    x0 = [0.01]*n + [0.001]*n + ([200]*n if experiment == 'A' else [])
+    fit = least_squares(residuals, x0, args=(data, experiment), bounds=(0, np.inf),
+                        x_scale='jac')
+    treatments = data['Treatment'].unique()
+    df_fit = pd.DataFrame({'Experiment': experiment, 'Treatment': treatments,
+                           'vmax': fit.x[:n], 'k': fit.x[n:2*n]})
+    if experiment == 'A':
+        df_fit['dmsp_added'] = fit.x[2*n:]
+    df_fit['rmse'] = [np.sqrt(np.mean(fit.fun[(data['Treatment'] == tr).to_numpy()]**2))
+                      for tr in treatments]
+    fits.append(df_fit)
+df_fits = pd.concat(fits, ignore_index=True)
+df_fits
+# %%
+#Fitted trajectories of experiment B, with the addition of Alma1
+data_b = df_add[df_add['Experiment'] == 'B']
+fit_b = df_fits[df_fits['Experiment'] == 'B']
+dmsp_b, t_b, treatments_b = simulate(
+    np.r_[fit_b['vmax'], fit_b['k']], data_b, 'B')
+pd.DataFrame(dmsp_b.T, index=t_b, columns=treatments_b)
@@ -0,0 +1,75 @@
+# %%
+#For numerical calculations
+import time
+import numpy as np
+from scipy.integrate import odeint
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes, isotopologues_to_delta
+from dmsp.enz_deg import dmsp_enz_deg, integrate_ensemble
+
+# %%
+# Compare the time that it takes to integrate a sweep of enzyme degradation
+# rates by looping over odeint (as in the epsilon34_variable_* scripts before
+# the ensemble integrator) and with a single call to integrate_ensemble.
+# The parameters are the same as in epsilon34_variable_enz_deg_rates.py
+
+# For DddP (this study)
+alpha = (-3.97/1000)+1
+# Initial concentration of DMSP in nM
+dmsp_init = 207*1000
+#Starting enzyme concentration, 34DMSP and 32DMSP in nM
+c = (3.479,*isotopes(dmsp_init))
+#K_M in nM
+km = 2E9
+#Vmax in nM/min/nM enzyme
+vmax=(17000*(dmsp_init+km))/(dmsp_init*c[0])
+vmax_32=vmax*0.8
+kappa_32 = vmax/km
+#Define the time points for integration
+t = np.linspace(0, 53, 50)
+
+# %%
+#Number of parameter sets in each sweep
+n_sweep = [10, 100, 1000, 10000]
+
+#Initialize empty lists
+time_loop = []
+time_ensemble = []
+max_diff_d34s = []
+
+for n in n_sweep:
+    #Create an array with a range of enzyme degradation rates
+    k = np.linspace(0, 1, n)
+
+    #Loop over odeint
+    start = time.perf_counter()
+    dmsp_iso_loop = np.array([odeint(dmsp_enz_deg, c, t,
+                              args=(alpha, vmax, vmax_32, kappa_32, i))
+                              for i in k])
+    time_loop.append(time.perf_counter() - start)
+
+    #Single call to the ensemble integrator
+    start = time.perf_counter()
+    dmsp_iso_ens = integrate_ensemble(c, t, alpha, vmax, vmax_32, kappa_32, k)
+    time_ensemble.append(time.perf_counter() - start)
+
+    #Largest difference in d34S between both methods in permil
+    d34s_loop = isotopologues_to_delta(dmsp_iso_loop[:,:,1], dmsp_iso_loop[:,:,2])
+    d34s_ens = isotopologues_to_delta(dmsp_iso_ens[:,:,1], dmsp_iso_ens[:,:,2])
+    max_diff_d34s.append(np.abs(d34s_loop - d34s_ens).max())
+
+df_benchmark = pd.DataFrame({'n_params': n_sweep,
+                             'time_loop_s': time_loop,
+                             'time_ensemble_s': time_ensemble,
+                             'max_diff_d34S': max_diff_d34s})
+df_benchmark['speedup'] = df_benchmark['time_loop_s']/df_benchmark['time_ensemble_s']
+df_benchmark
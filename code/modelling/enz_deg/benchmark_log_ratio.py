@@ -0,0 +1,117 @@
+# %%
+#For numerical calculations
+import time
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes, isotopologues_to_delta, DELTA_IN_OCEAN
+from dmsp.enz_deg import dmsp_enz_deg, dmsp_enz_deg_jac, integrate_ensemble
+from dmsp.ocean import dmsp_system_3_comp_mm, enzyme_table, dmsp_ocean
+from dmsp.logratio import log_ratio_rhs, to_log_ratio, log_ratio_to_delta
+from dmsp.solvers import integrate
+
+# %%
+# Compare the number of evaluations of the model and the error in d34S when
+# the models are integrated for the concentrations of 34DMSP and 32DMSP
+# (as in the other scripts) and for ln(total DMSP) and ln(34DMSP/32DMSP).
+# The error is relative to a reference solution with tight tolerances.
+
+def benchmark(rhs, c, t, args, iso, tolerances, atol_scale, jac=None):
+    '''
+    Function that integrates a model in both formulations with odeint for a
+    range of tolerances.
+    Parameters
+    ----------
+    rhs: callable.
+    Right-hand side of the model.
+    c: array-like.
+    Initial state with concentrations.
+    t: array-like.
+    Time points for integration.
+    args: tuple.
+    Arguments of the model.
+    iso: tuple.
+    Positions of 34DMSP and 32DMSP in the state.
+    tolerances: list.
+    Relative tolerances. The absolute tolerance of the log-ratio state is
+    the same, and that of the concentrations is scaled by atol_scale.
+    atol_scale: float.
+    Typical concentration of the model.
+    jac: callable.
+    Jacobian of the model in concentrations.
+    Returns
+    -------
+    Dataframe with the number of evaluations and the largest error in d34S
+    of each formulation and tolerance
+    '''
+    ref, _ = integrate(rhs, c, t, args, jac=jac, rtol=1E-13,
+                       atol=1E-13*atol_scale, mxstep=100000)
+    d34s_ref = isotopologues_to_delta(ref[:, iso[0]], ref[:, iso[1]])
+    rhs_log = log_ratio_rhs(rhs, iso)
+    y = to_log_ratio(c, iso)
+    rows = []
+    for tol in tolerances:
+        sol, info = integrate(rhs, c, t, args, jac=jac, rtol=tol,
+                              atol=tol*atol_scale, mxstep=100000)
+        d34s = isotopologues_to_delta(sol[:, iso[0]], sol[:, iso[1]])
+        sol_log, info_log = integrate(rhs_log, y, t, args, rtol=tol, atol=tol,
+                                      mxstep=100000)
+        rows.append({'rtol': tol,
+                     'nfev_conc': info['nfev'] + info['njev'],
+                     'error_d34S_conc': np.abs(d34s - d34s_ref).max(),
+                     'nfev_log_ratio': info_log['nfev'],
+                     'error_d34S_log_ratio':
+                         np.abs(log_ratio_to_delta(sol_log, iso) -
+                                d34s_ref).max()})
+    return pd.DataFrame(rows)
+
+tolerances = [1E-4, 1E-6, 1E-8, 1E-10]
+# %%
+#Enzyme degradation model with the parameters of DMSP_enz_deg.py (DddP)
+alpha = (-3.97/1000)+1
+dmsp_init = 207*1000
+c = np.array([3.479, *isotopes(dmsp_init)])
+km = 2E9
+vmax = (17000*(dmsp_init+km))/(dmsp_init*c[0])
+args = (alpha, vmax, vmax*0.8, vmax/km, 0.01)
+t = np.linspace(0, 53, 50)
+df_enz_deg = benchmark(dmsp_enz_deg, c, t, args, (1, 2), tolerances,
+                       dmsp_init, jac=dmsp_enz_deg_jac)
+df_enz_deg
+# %%
+#Ocean model until steady state from the average DMSP concentration
+df_enzymes = enzyme_table().iloc[:3]
+args_ocean = ((0.000015/60)*7.24E19, *df_enzymes['alpha'],
+              *df_enzymes['kappa_32'], *df_enzymes['vmax_34'],
+              *df_enzymes['vmax_32'], *df_enzymes['transcripts'])
+c_ocean = np.array(isotopes(dmsp_ocean, delta_in=DELTA_IN_OCEAN))
+t_ocean = np.r_[0, np.logspace(0, 10, 60)]
+#The concentrations fall to ~1E-6 nM, which sets the absolute tolerance
+df_ocean = benchmark(dmsp_system_3_comp_mm, c_ocean, t_ocean, args_ocean,
+                     (0, 1), tolerances, 1E-9)
+df_ocean
+# %%
+#Sweep of enzyme degradation rates with integrate_ensemble in both
+# formulations
+k = np.linspace(0, 1, 10000)
+ref = integrate_ensemble(c, t, *args[:4], k, rtol=1E-12, atol=1E-10)
+d34s_ref = isotopologues_to_delta(ref[:, :, 1], ref[:, :, 2])
+rows = []
+for log_ratio, tol in [(False, 1E-8), (False, 1E-10), (True, 1E-6),
+                       (True, 1E-8)]:
+    start = time.perf_counter()
+    sol = integrate_ensemble(c, t, *args[:4], k, log_ratio=log_ratio,
+                             rtol=tol, atol=tol)
+    rows.append({'log_ratio': log_ratio, 'rtol': tol,
+                 'time_s': time.perf_counter() - start,
+                 'error_d34S': np.abs(isotopologues_to_delta(
+                     sol[:, :, 1], sol[:, :, 2]) - d34s_ref).max()})
+pd.DataFrame(rows)
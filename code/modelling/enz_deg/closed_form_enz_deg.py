@@ -0,0 +1,72 @@
+# %%
+#For numerical calculations
+import time
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes, isotopologues_to_delta
+from dmsp.enz_deg import (integrate_ensemble, integrate_closed_form,
+                          integrate_fast)
+
+# %%
+# dmsp_enz_deg has a closed form: the enzyme decays exponentially and each
+# isotopologue is consumed independently. Far below saturation (DMSP << K_M)
+# it is first order in DMSP, i.e. Rayleigh fractionation. integrate_fast
+# picks the first-order solution, the exact closed form or odeint for each
+# parameter set, with a bound of the error in d34S of the first-order
+# solution.
+
+# For DddP (this study), as in DMSP_enz_deg.py
+alpha = (-3.97/1000)+1
+dmsp_init = 207*1000
+c = (3.479,*isotopes(dmsp_init))
+km = 2E9
+vmax=(17000*(dmsp_init+km))/(dmsp_init*c[0])
+kappa = vmax/km
+t = np.linspace(0, 53, 50)
+
+# %%
+#Regime of each K_M, with the same kappa and with k = 0 and k = 0.1 min^-1
+km_values = np.array([2E12, 2E11, 2E10, 2E9, 2E7, 2E5])
+k_values = np.array([0, 0.1])
+grid_km, grid_k = np.meshgrid(km_values, k_values, indexing='ij')
+args = (alpha, kappa*grid_km.ravel(), 0.8*kappa*grid_km.ravel(), kappa,
+        grid_k.ravel())
+
+#Reference with tight tolerances
+ref = integrate_ensemble(c, t, *args, rtol=1E-13, atol=1E-300,
+                         mxstep=100000)
+d34s_ref = isotopologues_to_delta(ref[..., 1], ref[..., 2])
+sol, method, bound = integrate_fast(c, t, *args)
+first_order = integrate_closed_form(c, t, *args, first_order=True)
+df_regimes = pd.DataFrame({
+    'km': grid_km.ravel(), 'k': grid_k.ravel(), 'method': method,
+    'bound_d34S': bound,
+    'error_d34S_first_order': np.abs(isotopologues_to_delta(
+        first_order[..., 1], first_order[..., 2]) - d34s_ref).max(axis=1),
+    'error_d34S_fast': np.abs(isotopologues_to_delta(
+        sol[..., 1], sol[..., 2]) - d34s_ref).max(axis=1)})
+df_regimes
+
+# %%
+#Time of an ensemble of degradation rates of the enzyme, as in
+# epsilon34_variable_enz_deg_rates.py
+k = np.linspace(0, 1, 10000)
+rows = []
+for name, fun in [
+        ('odeint', lambda: integrate_ensemble(c, t, alpha, vmax, 0.8*vmax,
+                                              kappa, k)),
+        ('fast', lambda: integrate_fast(c, t, alpha, vmax, 0.8*vmax,
+                                        kappa, k)[0])]:
+    start = time.perf_counter()
+    fun()
+    rows.append({'method': name, 'time_s': time.perf_counter() - start})
+pd.DataFrame(rows)
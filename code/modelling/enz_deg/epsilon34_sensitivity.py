@@ -0,0 +1,69 @@
+# %%
+#For numerical calculations
+import time
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes
+from dmsp.enz_deg import epsilon_sensitivity, epsilon_batch, param_names
+
+# %%
+# Local sensitivity of the apparent 34epsilon of the enzyme degradation model
+# to each of its parameters, with the parameters of DMSP_enz_deg.py. The
+# derivatives come from a single integration of the model augmented with
+# d state/d parameters, and are compared with central finite differences,
+# which need two extra integrations per parameter.
+
+# For DddP (this study)
+alpha = (-3.97/1000)+1
+# Initial concentration of DMSP in nM
+dmsp_init = 207*1000
+#Starting enzyme concentration, 34DMSP and 32DMSP in nM
+c = (3.479,*isotopes(dmsp_init))
+#K_M in nM
+km = 2E9
+#Vmax in nM/min/nM enzyme
+vmax=(17000*(dmsp_init+km))/(dmsp_init*c[0])
+#Define the time points for integration
+t = np.linspace(0, 53, 50)
+#alpha, vmax, vmax_32, kappa_32 and k
+params = np.array([alpha, vmax, vmax*0.8, vmax/km, 0.08])
+#Tolerances of the integration
+tol = {'rtol': 1E-11, 'atol': 1E-12}
+
+# %%
+#Forward sensitivity
+start = time.perf_counter()
+d34s, d_d34s, epsilon, d_epsilon = epsilon_sensitivity(c, t, *params, **tol)
+time_sensitivity = time.perf_counter() - start
+
+#Central finite differences with a relative step of 1E-6
+start = time.perf_counter()
+d_epsilon_fd = []
+for i, p in enumerate(params):
+    h = 1E-6*abs(p) if p != 0 else 1E-6
+    params_fd = np.array([params, params])
+    params_fd[0, i] += h
+    params_fd[1, i] -= h
+    epsilon_fd = epsilon_batch(params_fd, c, t, **tol)[:, 0]
+    d_epsilon_fd.append((epsilon_fd[0] - epsilon_fd[1])/(2*h))
+time_fd = time.perf_counter() - start
+
+#Derivatives and elasticities (relative change of epsilon per relative change
+# of each parameter)
+df_sensitivity = pd.DataFrame({'parameter': param_names,
+                               'value': params,
+                               'd_34epsilon': d_epsilon,
+                               'd_34epsilon_fd': d_epsilon_fd,
+                               'elasticity': d_epsilon*params/epsilon})
+print(f'34epsilon = {epsilon:.4f}, sensitivity {time_sensitivity:.3f} s, '
+      f'finite differences {time_fd:.3f} s')
+df_sensitivity
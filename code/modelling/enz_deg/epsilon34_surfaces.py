@@ -0,0 +1,69 @@
+# %%
+#For numerical calculations
+import numpy as np
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes
+from dmsp.enz_deg import epsilon_surface
+from dmsp.sweeps import save_grid
+
+# %%
+# The epsilon34_variable_* scripts vary a single parameter of the enzyme
+# degradation model at a time. Here, we calculate the apparent fractionation
+# on grids of two parameters at once: the degradation rate of the enzyme (k)
+# with 32^Vmax, and k with kappa_32. The other parameters are the same as in
+# those scripts.
+
+# For DddP (this study)
+alpha = (-3.97/1000)+1
+# Initial concentration of DMSP in nM
+dmsp_init = 207*1000
+#Starting enzyme concentration, 34DMSP and 32DMSP in nM
+c = (3.479,*isotopes(dmsp_init))
+#K_M in nM
+km = 2E9
+#Vmax in nM/min/nM enzyme
+vmax=(17000*(dmsp_init+km))/(dmsp_init*c[0])
+#Define the time points for integration
+t = np.linspace(0, 53, 50)
+
+#Number of values of each parameter
+n_grid = 200
+#Number of grid points integrated together, and number of processes (None
+# uses all the CPUs)
+chunk_size = 500
+n_workers = None
+#Solve the model analytically (dmsp.enz_deg.integrate_fast), which is exact
+# also when almost all the DMSP is consumed
+fast = True
+
+# %%
+# k x 32^Vmax, with the same total Vmax and kappa_32 as in
+# epsilon34_variable_32_vmax.py
+surface_k_vmax_32 = epsilon_surface(
+    {'k': np.linspace(0, 1, n_grid),
+     'vmax_32': np.linspace(1E6, 1E9, n_grid)},
+    c, t, chunk_size=chunk_size, n_workers=n_workers, fast=fast,
+    alpha=alpha, vmax=2E9, kappa_32=vmax/km)
+
+save_grid(f'{homedir}/data/modelling/34e_surface_k_vmax_32.npz',
+          surface_k_vmax_32)
+
+# %%
+# k x kappa_32, with the same Vmax and 32^Vmax as in
+# epsilon34_variable_32_ratio.py
+surface_k_kappa_32 = epsilon_surface(
+    {'k': np.linspace(0, 1, n_grid),
+     'kappa_32': np.linspace(1E-5, 5E-1, n_grid)},
+    c, t, chunk_size=chunk_size, n_workers=n_workers, fast=fast,
+    alpha=alpha, vmax=vmax, vmax_32=vmax*0.8)
+
+save_grid(f'{homedir}/data/modelling/34e_surface_k_kappa_32.npz',
+          surface_k_kappa_32)
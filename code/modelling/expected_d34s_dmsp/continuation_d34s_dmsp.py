@@ -0,0 +1,92 @@
+# %%
+#For numerical calculations
+import time
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import enzyme_table, OceanModel, ocean_vol
+from dmsp.column import WaterColumnModel
+from dmsp.continuation import continuation, continuation_path
+from dmsp.isotopes import isotopologues_to_delta
+# %%
+# Steady states of sweeps found by continuation: the points of the sweep are
+# solved in order and each solve starts from a prediction from the previous
+# solutions instead of from the average DMSP concentration. Neighbouring
+# points converge in a couple of Newton iterations.
+
+#Enzymes: DmdA, Alma1 and DddP, and flux of DMSP as in the other scripts
+df_enzymes = enzyme_table().iloc[:3]
+f_total_in = (0.000015/60)*7.24E19
+
+#Grid of the kappa of DmdA and DddP in l/min/mg enz, with kappa of Alma1
+# fixed. The path runs along the kappa of DddP, and all the values of the
+# kappa of DmdA are solved at once at each step.
+n_grid = 300
+kappa_values = np.logspace(2, 5, n_grid)
+kappa_32 = np.stack([np.broadcast_to(kappa_values[:, None], (n_grid, n_grid)),
+                     np.full((n_grid, n_grid), 2000),
+                     np.broadcast_to(kappa_values[None, :], (n_grid, n_grid))])
+model = OceanModel(df_enzymes, f_total_in, kappa_32=kappa_32)
+
+start = time.perf_counter()
+dmsp_cold, _ = model.steady_state()
+time_cold = time.perf_counter() - start
+start = time.perf_counter()
+dmsp_ss, status, iterations = continuation(model, axis=1,
+                                           s=np.log(kappa_values))
+time_continuation = time.perf_counter() - start
+
+d34s = isotopologues_to_delta(dmsp_ss[0], dmsp_ss[1])
+pd.DataFrame({
+    'time_s': [time_cold, time_continuation],
+    'newton_iterations_per_point': [np.nan, iterations.mean()],
+    'max_difference_d34S': [0, np.nanmax(np.abs(
+        d34s - isotopologues_to_delta(dmsp_cold[0], dmsp_cold[1])))]},
+    index=['cold start', 'continuation'])
+# %%
+#Status of the points of a path that decreases the transcripts of DddP,
+# the only enzyme, until it cannot degrade the flux of DMSP and the steady
+# state is lost
+transcripts = np.stack([np.zeros(50), np.zeros(50), np.logspace(4, -6, 50)])
+model_path = OceanModel(df_enzymes, f_total_in, transcripts=transcripts)
+dmsp_path, status_path, iterations_path = continuation(model_path)
+pd.DataFrame({'transcripts_dddp': transcripts[2], 'status': status_path,
+              'iterations': iterations_path,
+              'DMSP': dmsp_path.sum(axis=0)}).iloc[::5]
+# %%
+#Water column of water_column_expected_d34s_dmsp.py with simplified
+# profiles, for eddy diffusivities scaled from 0.01 to 10 times the
+# reference profile. Each column is solved with its banded Newton solver,
+# starting from the prediction of continuation_path.
+edges = np.linspace(0, 200, 201)
+depth = 0.5*(edges[1:] + edges[:-1])
+production = f_total_in/ocean_vol*np.exp(-depth/50)
+kz = 60*(1E-5 + (1E-2 - 1E-5)*0.5*(1 - np.tanh((edges - 50)/5)))
+transcripts_column = np.stack([1E7*np.exp(-depth/100)]*3)
+scales = np.logspace(-2, 1, 40)
+
+def solve(scale, c):
+    return WaterColumnModel(df_enzymes, edges, production, kz*scale,
+                            transcripts=transcripts_column).steady_state(c)
+
+start = time.perf_counter()
+cold = [solve(scale, None) for scale in scales]
+time_cold = time.perf_counter() - start
+start = time.perf_counter()
+columns, info = continuation_path(solve, scales, s=np.log(scales))
+time_continuation = time.perf_counter() - start
+
+df_kz = pd.DataFrame({'kz_scale': scales, **info,
+                      'd34S_surface': [isotopologues_to_delta(*x[:, 0])
+                                       for x in columns]})
+print(f'Cold start: {time_cold:.2f} s, continuation: '
+      f'{time_continuation:.2f} s')
+df_kz.iloc[::5]
@@ -0,0 +1,43 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.emulator import D34sEmulator
+# %%
+# Train emulators of the d34S of DMSP at steady state, so that the ternary
+# maps can be queried for any composition of transcripts without solving the
+# model again. The first one only varies the composition of transcripts,
+# with the intermediate kinetic parameters. The second one also varies the
+# kappa_32 of each enzyme between its lower and upper estimates (see
+# df_params_low and df_params_high in the expected_d34s_dmsp scripts).
+
+emulator_transcripts = D34sEmulator.train(n_simplex=200, seed=42)
+emulator_transcripts.save(f'{homedir}/data/modelling/d34s_emulator_transcripts.npz')
+
+emulator_kappa = D34sEmulator.train(
+    n_simplex=60,
+    log_axes={'kappa_32_d': (5742, 73171, 9),
+              'kappa_32_c1': (22, 6958, 13),
+              'kappa_32_cp': (205.7, 1005, 7)},
+    seed=42)
+emulator_kappa.save(f'{homedir}/data/modelling/d34s_emulator_kappa.npz')
+
+#Errors of the emulators in permil at random points of their training box
+pd.DataFrame([emulator_transcripts.validation, emulator_kappa.validation],
+             index=['transcripts', 'transcripts and kappa_32'])
+# %%
+# Example of a batched query: d34S of DMSP along the edge between DmdA and
+# Alma1, with a kappa_32 of Alma1 ten times lower than the intermediate value
+fr_alma1 = np.linspace(0, 1, 11)
+emulator = D34sEmulator.load(f'{homedir}/data/modelling/d34s_emulator_kappa.npz')
+emulator(fr_alma1, 0, 1 - fr_alma1,
+         kappa_32_d=10000, kappa_32_c1=200, kappa_32_cp=600)
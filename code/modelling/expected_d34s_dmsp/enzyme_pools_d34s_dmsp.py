@@ -0,0 +1,63 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import enzyme_table
+from dmsp.pools import EnzymePoolModel
+from dmsp.isotopes import isotopologues_to_delta
+# %%
+# Response of the d34S of DMSP to a doubling of the transcripts of the DMSP
+# lyases (e.g. at the onset of a bloom) when the enzymes are state
+# variables that decay with a first-order rate constant, for enzyme
+# lifetimes of a day, a week and a month. In dmsp_system_3_comp_mm the
+# enzymes follow the transcripts instantly.
+
+df_enzymes = enzyme_table().iloc[:3]
+transcripts = df_enzymes['transcripts'].to_numpy()
+#Annual average flux of DMSP for the Mediterranean (Simó et al. 2019) in a
+# surface ocean 200 m deep, in nmol/min
+f_total_in = (0.000015/60)*7.24E19
+
+#Lifetime of the enzymes in days, one scenario each
+lifetimes = np.array([1, 7, 30])
+k_deg = 1/(lifetimes*24*60)
+
+#Transcripts before and after the doubling of Alma1 and DddP
+transcripts_before = np.repeat(transcripts[:, None], len(lifetimes), axis=1)
+transcripts_after = transcripts_before*np.array([1, 2, 2])[:, None]
+# %%
+#Steady state before the doubling, with the enzyme pools in equilibrium
+# with the transcripts, found with the Newton solver of OceanModel
+model_before = EnzymePoolModel(df_enzymes, f_total_in, k_deg[None],
+                               transcripts=transcripts_before)
+c0, method = model_before.steady_state()
+model_after = EnzymePoolModel(df_enzymes, f_total_in, k_deg[None],
+                              transcripts=transcripts_after)
+c_end, _ = model_after.steady_state()
+print(method)
+# %%
+#Transient after the doubling, integrated with BDF and the sparse
+# Jacobian
+t = np.r_[0, np.logspace(1, 7, 61)]
+sol, out = model_after.integrate(c0, t)
+print(out.message, out.nfev, out.njev)
+df_transient = pd.DataFrame(
+    isotopologues_to_delta(sol[:, 0], sol[:, 1]), index=t/(24*60),
+    columns=[f'{lifetime} d' for lifetime in lifetimes])
+df_transient.index.name = 'days'
+df_transient.iloc[::6]
+# %%
+#The transient ends at the steady state of OceanModel
+pd.DataFrame({'d34S_before': isotopologues_to_delta(*c0[:2]),
+              'd34S_after': isotopologues_to_delta(*c_end[:2]),
+              'd34S_end_transient': isotopologues_to_delta(*sol[-1, :2])},
+             index=df_transient.columns)
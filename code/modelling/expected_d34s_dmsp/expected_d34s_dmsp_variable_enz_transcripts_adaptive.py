@@ -0,0 +1,68 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+from functools import partial
+pd.set_option('display.precision',5)
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes, DELTA_IN_OCEAN
+from dmsp.ocean import enzyme_table, d34s_steady_state
+from dmsp.simplex import adaptive_simplex
+# %%
+# Same model as expected_d34s_dmsp_variable_enz_transcripts.py, but instead of
+# a uniform grid of compositions of transcripts, the simplex is sampled
+# adaptively: only the triangles in which the d34S of DMSP changes by more
+# than a tolerance are refined.
+
+#Initial concentration of DMSP in nM
+c = isotopes(10, delta_in=DELTA_IN_OCEAN)
+# Flux of DMSP into the ocean in nmol/l/min from Simó et al. (2019)
+#(Annual average for the Mediterranean)
+f_in = (0.000015/60)
+# Volume of the surface ocean in liters, assuming a depth of 200 m
+surface_ocean_vol = 7.24E19
+# Flux of DMSP into the ocean in nmol/l/min
+f_total_in = f_in*surface_ocean_vol
+
+#Table with the fractionation factors, kappas (l/min/mg enz) and Vmax
+# (nmol/min/mg enz) of Alma1, DddP and DmdA, with the intermediate values
+# used in expected_d34s_dmsp_variable_enz_transcripts.py
+df_enzymes = enzyme_table().set_index('Enzyme').loc[
+    ['Alma1', 'DddP', 'DmdA']].reset_index()
+df_enzymes
+
+#Total number of transcripts in mRNA/L
+total_transcripts = 3E7
+#Maximum difference in d34S (permil) between the vertices of a triangle
+tol = 0.05
+
+# %%
+#d34S of DMSP at steady state for an array of fractions of transcripts of
+# Alma1, DddP and DmdA, of shape (M, 3)
+d34s_fr = partial(d34s_steady_state, df_enzymes=df_enzymes,
+                  f_total_in=f_total_in, column='transcripts',
+                  total=total_transcripts, c=c)
+
+#Sample the simplex adaptively, starting from a lattice with 8 subdivisions
+fr, d34s_int = adaptive_simplex(d34s_fr, tol, n_initial=8,
+                                max_depth=6)
+
+#Create dataframe with the information from the model
+df_dmsp_system_transcripts = pd.DataFrame(
+    {'fr_alma1': fr[:,0],
+     'fr_dddp': fr[:,1],
+     'fr_dmda': fr[:,2],
+     'd34S': d34s_int
+    })
+df_dmsp_system_transcripts.head()
+# %%
+#Export dataframe
+df_dmsp_system_transcripts.to_csv(f'{homedir}/data/modelling/expected_d34s_DMSP_variable_enz_transcripts_adaptive.csv')
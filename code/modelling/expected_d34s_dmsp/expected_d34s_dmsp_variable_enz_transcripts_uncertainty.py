@@ -0,0 +1,81 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+pd.set_option('display.precision',5)
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import isotopes, DELTA_IN_OCEAN
+from dmsp.ocean import enzyme_table, d34s_monte_carlo
+from dmsp.simplex import simplex_lattice
+# %%
+# Same model and grid of compositions of transcripts as
+# expected_d34s_dmsp_variable_enz_transcripts.py, but instead of a single
+# d34S of DMSP per composition, the errors of the fractionation factors of
+# Alma1, DddP and DmdA are propagated by Monte Carlo, and the median and the
+# 95% interval of d34S are reported.
+
+#Initial concentration of DMSP in nM
+c = isotopes(10, delta_in=DELTA_IN_OCEAN)
+# Flux of DMSP into the ocean in nmol/l/min from Simó et al. (2019)
+#(Annual average for the Mediterranean)
+f_in = (0.000015/60)
+# Volume of the surface ocean in liters, assuming a depth of 200 m
+surface_ocean_vol = 7.24E19
+# Flux of DMSP into the ocean in nmol/l/min
+f_total_in = f_in*surface_ocean_vol
+
+#Table with the fractionation factors and their errors, kappas
+# (l/min/mg enz) and Vmax (nmol/min/mg enz) of Alma1, DddP and DmdA
+df_enzymes = enzyme_table().set_index('Enzyme').loc[
+    ['Alma1', 'DddP', 'DmdA']].reset_index()
+df_enzymes
+
+#Total number of transcripts in mRNA/L, divided among the three enzymes in
+# n_subdivisions equal parts
+total_transcripts = 3E7
+n_subdivisions = 19
+
+#Number of Monte Carlo samples. The errors of epsilon are taken as one
+# standard deviation (n_sigma = 1), and the kinetic parameters are fixed
+# (kappa_log_sd = vmax_log_sd = 0). A kappa_log_sd or vmax_log_sd of e.g.
+# 0.5 adds a log-normal spread of kappa_32 or of Vmax (32^Vmax and 34^Vmax
+# together) of each enzyme.
+n_samples = 5000
+n_sigma = 1
+kappa_log_sd = 0
+vmax_log_sd = 0
+quantiles = [0.025, 0.5, 0.975]
+
+# %%
+#Compositions of transcripts of Alma1, DddP and DmdA
+transcripts = simplex_lattice(n_subdivisions, total=total_transcripts)
+fr_alma1, fr_dddp, fr_dmda = (transcripts/total_transcripts).T
+
+#Quantiles of d34S of DMSP at steady state for each composition
+d34s_quantiles = d34s_monte_carlo(df_enzymes, f_total_in, n_samples,
+                                  transcripts=transcripts.T, n_sigma=n_sigma,
+                                  kappa_log_sd=kappa_log_sd,
+                                  vmax_log_sd=vmax_log_sd,
+                                  quantiles=quantiles, seed=42, c=c)
+
+#Create dataframe with the information from the model
+df_dmsp_system_transcripts = pd.DataFrame(
+    {'fr_alma1': fr_alma1,
+     'fr_dddp': fr_dddp,
+     'fr_dmda': fr_dmda,
+     'd34S_q2.5': d34s_quantiles[0],
+     'd34S_median': d34s_quantiles[1],
+     'd34S_q97.5': d34s_quantiles[2]
+    })
+df_dmsp_system_transcripts.head()
+# %%
+#Export dataframe
+df_dmsp_system_transcripts.to_csv(f'{homedir}/data/modelling/expected_d34s_DMSP_variable_enz_transcripts_uncertainty.csv')
@@ -0,0 +1,50 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import enzyme_table, d34s_steady_state
+from dmsp.simplex import simplex_lattice
+from dmsp.inverse import D34sIndex
+# %%
+# The ternary maps give the expected d34S of DMSP for each composition of
+# Alma1, DddP and DmdA. Here we answer the reverse question: which
+# compositions are consistent with a measured d34S of DMSP and its
+# uncertainty.
+
+#Measured d34S of DMSP and its uncertainty in permil
+d34s_obs = 19.6
+d34s_err = 0.1
+
+#Index of the map with variable transcripts from
+# expected_d34s_dmsp_variable_enz_transcripts.py
+index_transcripts = D34sIndex.from_csv(
+    f'{homedir}/data/modelling/expected_d34s_DMSP_variable_enz_transcripts.csv')
+
+#Modelled compositions within the uncertainty of the measurement
+fr, d34s = index_transcripts.query(d34s_obs, d34s_err)
+df_feasible = pd.DataFrame({'fr_alma1': fr[:,0], 'fr_dddp': fr[:,1],
+                            'fr_dmda': fr[:,2], 'd34S': d34s})
+df_feasible
+# %%
+#Range of the fraction of each enzyme in the feasible region, including the
+# compositions between the points of the grid
+index_transcripts.feasible_range(d34s_obs, d34s_err)
+# %%
+# The index can also be built from a freshly computed, finer grid of
+# compositions, here with 200 subdivisions per edge
+f_total_in = (0.000015/60)*7.24E19
+df_enzymes = enzyme_table().set_index('Enzyme').loc[
+    ['Alma1', 'DddP', 'DmdA']].reset_index()
+fr_grid = simplex_lattice(200)
+d34s_grid = d34s_steady_state(fr_grid, df_enzymes, f_total_in, total=3E7)
+index_fine = D34sIndex(fr_grid, d34s_grid)
+index_fine.feasible_range(d34s_obs, d34s_err)
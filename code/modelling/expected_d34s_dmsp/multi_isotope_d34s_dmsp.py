@@ -0,0 +1,62 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import enzyme_table, OceanModel
+from dmsp.enz_deg import integrate_multi
+from dmsp.isotopes import (isotopologues, isotopologues_to_deltas, cap_delta,
+                           MASS_NUMBERS)
+# %%
+# Expected D33S and D36S of DMSP, tracking 32S, 33S, 34S and 36S with the
+# fractionation factors of 33S and 36S from those of 34S and a mass law.
+# Deviations from the reference line of the capital delta notation are a
+# check of mass-dependent fractionation by the enzymes.
+
+#Enzymes: DmdA, Alma1 and DddP, with varying transcripts of each one
+df_enzymes = enzyme_table().iloc[:3]
+rng = np.random.default_rng(0)
+transcripts = 10**rng.uniform(6, 8, size=(3, 200))
+#Flux of DMSP as in the expected_d34s_dmsp scripts
+f_total_in = (0.000015/60)*7.24E19
+
+rows = []
+for law in ['equilibrium', 'kinetic']:
+    model = OceanModel(df_enzymes, f_total_in, transcripts=transcripts,
+                       mass_numbers=MASS_NUMBERS, law=law)
+    dmsp_ss, method = model.steady_state()
+    deltas = isotopologues_to_deltas(dmsp_ss, MASS_NUMBERS)
+    rows.append(pd.DataFrame({
+        'law': law, 'd34S': deltas[34],
+        'D33S': cap_delta(deltas[33], deltas[34], 33),
+        'D36S': cap_delta(deltas[36], deltas[34], 36), 'method': method}))
+df_ocean = pd.concat(rows, ignore_index=True)
+df_ocean.groupby('law')[['d34S', 'D33S', 'D36S']].describe().T
+# %%
+# Enzyme degradation assay of DddP, as in DMSP_enz_deg.py
+alpha = (-3.97/1000)+1
+dmsp_init = 207*1000
+c = (3.479, *isotopologues(dmsp_init, MASS_NUMBERS))
+km = 2E9
+vmax=(17000*(dmsp_init+km))/(dmsp_init*c[0])
+t = np.linspace(0, 53, 50)
+
+rows = []
+for law in ['equilibrium', 'kinetic']:
+    sol = integrate_multi(c, t, alpha, vmax, vmax*0.8, vmax/km, 0, law=law,
+                          rtol=1E-12, atol=1E-12)
+    deltas = isotopologues_to_deltas(sol[:, 1:].T, MASS_NUMBERS)
+    rows.append(pd.DataFrame({
+        'law': law, 'time': t, 'f_R': sol[:, 1:].sum(axis=1)/dmsp_init,
+        'd34S': deltas[34], 'D33S': cap_delta(deltas[33], deltas[34], 33),
+        'D36S': cap_delta(deltas[36], deltas[34], 36)}))
+df_assay = pd.concat(rows, ignore_index=True)
+df_assay.groupby('law').tail(1)
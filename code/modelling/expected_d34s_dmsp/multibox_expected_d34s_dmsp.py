@@ -0,0 +1,98 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+from scipy import sparse
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import enzyme_table, ocean_vol
+from dmsp.boxes import MultiBoxModel
+from dmsp.isotopes import isotopologues_to_delta
+# %%
+# Expected d34S of DMSP in the ocean regions of the Tara Oceans
+# metatranscriptomes (Curson et al. 2018), each one a box with its own
+# volume, flux of DMSP and transcripts of DMSP lyases that exchanges water
+# with the neighbouring regions.
+
+#Average transcripts per million sequences of the DMSP lyases in each region
+df_lyases = pd.read_csv(
+    f'{homedir}/data/processed/genetics/stab8_cursonetal_2018_tidy.csv')
+df_regions = df_lyases.groupby(['Ocean_and_sea_regions', 'Sample_ID'])[
+    'Total_transcripts_per_million_sequences'].sum().groupby(
+    'Ocean_and_sea_regions').mean().to_frame('lyases_tpm')
+regions = df_regions.index.tolist()
+#Transcripts of the lyases relative to the average of all the regions
+df_regions['lyases_rel'] = df_regions['lyases_tpm']/df_regions['lyases_tpm'].mean()
+df_regions
+# %%
+#Enzymes: DmdA, Alma1 and DddP
+df_enzymes = enzyme_table().iloc[:3]
+#Transcripts in mRNA/l. DmdA is not in the table, so it is constant, and
+# the transcripts of Alma1 and DddP follow the lyases of each region.
+base_transcripts = 1E7
+transcripts = np.stack([
+    np.full(len(regions), base_transcripts),
+    base_transcripts*df_regions['lyases_rel'].to_numpy(),
+    base_transcripts*df_regions['lyases_rel'].to_numpy()])
+
+#Approximate surface area of each region in km^2
+area = pd.Series({'IO': 70.56E6, 'NAO': 41.49E6, 'NPO': 77.01E6,
+                  'SAO': 40.27E6, 'SO': 21.96E6, 'SPO': 84.75E6})[regions]
+#Volume of each region in liters, its share of the ocean volume of
+# dmsp_system_3_comp_mm
+volumes = ocean_vol*(area/area.sum()).to_numpy()
+#Volume of the surface ocean of each region in liters, 200 m deep
+surface_vol = (area*1E6*200*1000).to_numpy()
+
+#Flux of DMSP in nmol/l/min. The annual average for the Mediterranean
+# (Simó et al. 2019) is scaled by an assumed production of DMSP in each
+# region relative to it, higher in the productive Southern Ocean and North
+# Atlantic than in the oligotrophic South Pacific and Indian Ocean.
+f_in = (0.000015/60)*pd.Series({'IO': 0.7, 'NAO': 1.5, 'NPO': 1.0,
+                                'SAO': 0.8, 'SO': 2.0, 'SPO': 0.6})[regions]
+df_regions['f_in_rel'] = f_in.to_numpy()/(0.000015/60)
+#Flux of DMSP into each region in nmol/min
+f_total_in = f_in.to_numpy()*surface_vol
+
+#Neighbouring regions, exchanging 10 Sv (1E10 l/s) of water in each
+# direction, so that the volume of each region is constant
+neighbours = [('NAO', 'SAO'), ('NPO', 'SPO'), ('SAO', 'SO'), ('SPO', 'SO'),
+              ('IO', 'SO'), ('IO', 'SAO'), ('IO', 'SPO')]
+q_exchange = 1E10*60
+i, j = np.array([[regions.index(a), regions.index(b)]
+                 for a, b in neighbours]).T
+exchange = sparse.coo_matrix((np.full(2*len(i), q_exchange),
+                              (np.r_[i, j], np.r_[j, i])),
+                             shape=(len(regions), len(regions)))
+# %%
+#Steady state of the regions, isolated and with exchange
+isolated = MultiBoxModel(df_enzymes, f_total_in, volumes,
+                         sparse.coo_matrix((len(regions), len(regions))),
+                         transcripts=transcripts)
+dmsp_isolated, _ = isolated.steady_state()
+model = MultiBoxModel(df_enzymes, f_total_in, volumes, exchange,
+                      transcripts=transcripts)
+dmsp_boxes, method = model.steady_state()
+
+df_regions['d34S_isolated'] = isotopologues_to_delta(*dmsp_isolated)
+df_regions['d34S_exchange'] = isotopologues_to_delta(*dmsp_boxes)
+df_regions['DMSP_exchange'] = dmsp_boxes.sum(axis=0)
+print(method)
+df_regions
+# %%
+#Approach to steady state from the average DMSP concentration, integrated
+# with BDF and the sparse Jacobian
+t = np.logspace(0, 7, 50)
+t = np.r_[0, t]
+sol, out = model.integrate(None, t, method='BDF')
+print(out.message, out.nfev, out.njev)
+d34s_t = pd.DataFrame(isotopologues_to_delta(sol[:, 0], sol[:, 1]),
+                      index=t, columns=regions)
+d34s_t.tail()
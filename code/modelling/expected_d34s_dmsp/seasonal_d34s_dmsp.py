@@ -0,0 +1,74 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import enzyme_table
+from dmsp.seasonal import (ForcedOceanModel, periodic_forcing,
+                           interpolated_forcing, year)
+from dmsp.isotopes import isotopologues_to_delta
+# %%
+# Seasonal cycle of the d34S of DMSP when the flux of DMSP and the
+# transcripts of the enzymes change over the year, instead of the constant
+# annual averages of the other scripts. The periodic steady state is found
+# by sampling the model once per year, so only a few years are integrated.
+
+df_enzymes = enzyme_table().iloc[:3]
+transcripts = df_enzymes['transcripts'].to_numpy()
+#Annual average flux of DMSP for the Mediterranean (Simó et al. 2019) in a
+# surface ocean 200 m deep, in nmol/min
+f_total_in = (0.000015/60)*7.24E19
+
+#Time points of the cycle: the first day of each month, in min
+months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
+          'Oct', 'Nov', 'Dec']
+t = np.linspace(0, year, 13)
+# %%
+#Sinusoidal forcing: the flux of DMSP peaks in early July with an amplitude
+# of 80 % of the mean, and the transcripts of the lyases (Alma1, DddP) peak
+# a month later than those of DmdA
+day = 24*60
+f_in_t = periodic_forcing(f_total_in, amplitude=0.8, phase=182*day)
+transcripts_t = periodic_forcing(transcripts, amplitude=[0.2, 0.5, 0.5],
+                                 phase=[182*day, 212*day, 212*day])
+model = ForcedOceanModel(df_enzymes, f_in_t, transcripts=transcripts_t)
+sol, n_periods, converged = model.seasonal_cycle(t)
+print(n_periods, converged)
+
+df_cycle = pd.DataFrame({'month': months + ['Jan'],
+                         'f_total_in': f_in_t(t),
+                         'DMSP': sol.sum(axis=1),
+                         'd34S': isotopologues_to_delta(sol[:, 0], sol[:, 1])})
+df_cycle
+# %%
+#Same flux from a monthly climatology interpolated in time (relative to
+# the annual average), with constant transcripts
+f_rel = np.array([0.4, 0.4, 0.6, 1.0, 1.4, 1.8, 1.9, 1.6, 1.2, 0.8, 0.5, 0.4])
+f_monthly = f_total_in*f_rel/f_rel.mean()
+model_monthly = ForcedOceanModel(
+    df_enzymes, interpolated_forcing(t[:-1], f_monthly), transcripts=transcripts)
+sol_monthly, n_periods, converged = model_monthly.seasonal_cycle(t)
+print(n_periods, converged)
+df_cycle['d34S_monthly_flux'] = isotopologues_to_delta(sol_monthly[:, 0],
+                                                       sol_monthly[:, 1])
+df_cycle
+# %%
+#Stroboscopic sampling with and without the Newton update of the state, as
+# the number of years integrated. With few transcripts DMSP takes centuries
+# to relax, and plain sampling needs as many periods.
+model_slow = ForcedOceanModel(
+    df_enzymes, f_in_t, transcripts=periodic_forcing(
+        transcripts*1E-5, amplitude=[0.2, 0.5, 0.5],
+        phase=[182*day, 212*day, 212*day]))
+for accelerate in [True, False]:
+    _, n_periods, converged = model_slow.periodic_steady_state(
+        accelerate=accelerate, max_periods=1000)
+    print(accelerate, n_periods, converged)
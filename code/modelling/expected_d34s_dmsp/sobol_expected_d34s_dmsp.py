@@ -0,0 +1,91 @@
+# %%
+#For numerical calculations
+import numpy as np
+from functools import partial
+import pandas as pd
+pd.set_option('display.precision',4)
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import (enzyme_table, kinetic_bounds, args_3_comp_mm,
+                        d34s_steady_state_3_comp)
+from dmsp.sobol import sobol_analysis
+# %%
+# Global sensitivity analysis of the d34S of DMSP at steady state of
+# dmsp_system_3_comp_mm to its arguments. The kinetic parameters vary
+# between the lower and upper estimates of Jonkers et al. (2000) and
+# Stefels et al. (2007), the fractionation factors within their errors, and
+# the flux of DMSP within an order of magnitude of the flux of the
+# expected_d34s_dmsp scripts (Simó et al. 2019), whose maps these indices
+# explain, so that their nominal scenario is at the center of the sampled
+# box.
+# As in the expected_d34s_dmsp scripts, 34^V_max = 32^V_max, so each enzyme
+# has a single V_max and the model has 13 parameters. Sampling 34^V_max and
+# 32^V_max independently would add an isotope effect on V_max (of up to the
+# ratio of the bounds) that the model never assumes.
+
+# Volume of the surface ocean in liters, assuming a depth of 200 m
+surface_ocean_vol = 7.24E19
+# Flux of DMSP into the ocean in nmol/l/min of the expected_d34s_dmsp
+# scripts
+f_in = (0.000015/60)
+
+#Lower and upper estimates of V_max (nmol/min/mg enz) and V_max/K_M
+# (l/min/mg enz) of DmdA, Alma1 and DddP
+df_kinetics = kinetic_bounds()
+df_kinetics
+
+# %%
+#Fractionation factors and their errors
+df_enzymes = enzyme_table().set_index('Enzyme').loc[['DmdA', 'Alma1', 'DddP']]
+epsilon = (1 - df_enzymes['alpha'])*1000
+epsilon_error = df_enzymes['epsilon_error']
+
+#Bounds of each parameter: the arguments of dmsp_system_3_comp_mm, in order,
+# with one V_max per enzyme instead of 34^V_max and 32^V_max
+names = (list(args_3_comp_mm[:7]) + ['vmax_d', 'vmax_c1', 'vmax_cp'] +
+         list(args_3_comp_mm[13:]))
+bounds = np.array(
+    #Flux of DMSP, from 0.1 to 10 times f_in, in nmol/min
+    [[0.1*f_in*surface_ocean_vol, 10*f_in*surface_ocean_vol]] +
+    #alpha_d, alpha_c1, alpha_cp
+    [sorted([(-(e - err)/1000)+1, (-(e + err)/1000)+1])
+     for e, err in zip(epsilon, epsilon_error)] +
+    #kappa_32
+    df_kinetics[['kappa_low', 'kappa_high']].values.tolist() +
+    #V_max = 34^V_max = 32^V_max
+    df_kinetics[['vmax_enz_low', 'vmax_enz_high']].values.tolist() +
+    #Transcripts in mRNA/L
+    [[1E5, 3E7]] * 3)
+#The kinetic parameters, the flux and the transcripts span orders of
+# magnitude, so they are sampled uniformly in log space
+log_scale = np.array([True] + [False]*3 + [True]*9)
+
+pd.DataFrame(bounds, index=names, columns=['low', 'high'])
+
+# %%
+#Number of base samples. The model is evaluated (13 + 2) * n_samples times,
+# in batches of chunk_size in parallel processes
+n_samples = 2**15
+chunk_size = 20000
+n_workers = None
+
+df_sobol = sobol_analysis(partial(d34s_steady_state_3_comp, tie_vmax=True),
+                          bounds, n_samples, names=names,
+                          log_scale=log_scale, seed=42,
+                          chunk_size=chunk_size, n_workers=n_workers)
+
+#Indices with all the samples
+df_sobol[df_sobol['n_samples'] == n_samples]
+# %%
+#Convergence of the total indices with the number of samples
+df_sobol.pivot(index='n_samples', columns='parameter', values='ST')
+# %%
+#Export dataframe
+df_sobol.to_csv(f'{homedir}/data/modelling/sobol_expected_d34s_DMSP.csv')
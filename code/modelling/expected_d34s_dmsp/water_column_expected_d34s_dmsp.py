@@ -0,0 +1,82 @@
+# %%
+#For numerical calculations
+import numpy as np
+import pandas as pd
+import git
+
+# Find home directory for repo
+repo = git.Repo("./", search_parent_directories=True)
+homedir = repo.working_dir
+
+# Import the shared DMSP modelling functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.ocean import enzyme_table, OceanModel, ocean_vol
+from dmsp.column import WaterColumnModel
+from dmsp.isotopes import isotopologues_to_delta
+# %%
+# Depth profile of the expected d34S of DMSP in a water column, instead of
+# the well-mixed surface ocean 200 m deep of the other scripts. Production
+# of DMSP decreases with depth below the surface, the transcripts of the
+# DMSP lyases follow the depth zones of the Tara Oceans metatranscriptomes
+# (Curson et al. 2018), and the layers are mixed by eddy diffusion.
+
+#Average transcripts per million sequences of the DMSP lyases and sampling
+# depth of each depth zone (surface, deep chlorophyll maximum, mesopelagic)
+df_lyases = pd.read_csv(
+    f'{homedir}/data/processed/genetics/stab8_cursonetal_2018_tidy.csv')
+df_samples = df_lyases.groupby(['Depth_zone', 'Sample_ID']).agg(
+    depth=('Sampling_depth_m', 'first'),
+    lyases_tpm=('Total_transcripts_per_million_sequences', 'sum'))
+df_zones = df_samples.groupby('Depth_zone').mean().loc[['SRF', 'DCM', 'MES']]
+df_zones
+# %%
+#Layers of 1 m down to 600 m
+edges = np.linspace(0, 600, 601)
+depth = 0.5*(edges[1:] + edges[:-1])
+
+#Production of DMSP in nmol/l/min: the flux of the other scripts, annual
+# average for the Mediterranean (Simó et al. 2019), at the surface,
+# decreasing with an e-folding depth of 50 m
+f_total_in = (0.000015/60)*7.24E19
+production = f_total_in/ocean_vol*np.exp(-depth/50)
+
+#Eddy diffusivity in m^2/min: 1E-2 m^2/s in a mixed layer 50 m deep and
+# 1E-5 m^2/s below it
+mld = 50
+kz = 60*(1E-5 + (1E-2 - 1E-5)*0.5*(1 - np.tanh((edges - mld)/5)))
+
+#Transcripts in mRNA/l, decreasing with the biomass (e-folding depth of
+# 100 m). The share of the lyases Alma1 and DddP follows the transcripts per
+# million sequences of each depth zone, interpolated in depth.
+df_enzymes = enzyme_table().iloc[:3]
+total_transcripts = 3E7*np.exp(-depth/100)
+lyases_rel = np.interp(depth, df_zones['depth'], df_zones['lyases_tpm'])/\
+    df_zones.loc['SRF', 'lyases_tpm']
+transcripts = np.stack([total_transcripts/3, lyases_rel*total_transcripts/3,
+                        lyases_rel*total_transcripts/3])
+# %%
+#Steady state of the column, with a banded Newton solver
+model = WaterColumnModel(df_enzymes, edges, production, kz,
+                         transcripts=transcripts)
+dmsp_column, method = model.steady_state()
+df_column = pd.DataFrame({'depth': depth, 'DMSP': dmsp_column.sum(axis=0),
+                          'd34S': isotopologues_to_delta(*dmsp_column)})
+print(method)
+df_column.iloc[::50]
+# %%
+#The same layers without mixing, each one at its own local steady state
+isolated = OceanModel(df_enzymes, production*ocean_vol, transcripts=transcripts)
+dmsp_isolated, _ = isolated.steady_state()
+df_column['d34S_no_mixing'] = isotopologues_to_delta(*dmsp_isolated)
+df_column.iloc[::50]
+# %%
+#Approach to steady state from the average DMSP concentration, integrated
+# with odeint and the banded Jacobian
+t = np.r_[0, np.logspace(0, 9, 40)]
+sol, info = model.integrate(None, t, method='odeint', rtol=1E-10,
+                            atol=1E-24)
+print(info)
+d34s_t = pd.DataFrame(isotopologues_to_delta(sol[:, 0], sol[:, 1]),
+                      index=t, columns=depth)
+d34s_t.iloc[::5, ::100]
@@ -19,6 +19,11 @@ import git
 repo = git.Repo("./", search_parent_directories=True)
 homedir = repo.working_dir
 
+# Import the shared isotope functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import lin_approx
+
 # %% 
 #Load the HPLC processed data
 df_hplc= pd.read_csv(f'{homedir}/data/processed/HPLC/hplc_master_table_raw_100.csv')
@@ -55,8 +60,7 @@ df_master['minus_ln_f_R'] = abs(-np.log(df_master['f_R']))
 
 #Append 1000 × ln (1+δ34S/1000) -> approximation to get slope
 # column to the master table
-df_master['d34S_approx'] = 1000 * \
-np.log(1+(df_master['d34S']/1000))
+df_master['d34S_approx'] = lin_approx(df_master['d34S'])
 
 df_master.head()
 # %% 
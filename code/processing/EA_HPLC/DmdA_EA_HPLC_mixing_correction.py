@@ -19,6 +19,11 @@ import git
 repo = git.Repo("./", search_parent_directories=True)
 homedir = repo.working_dir
 
+# Import the shared isotope functions
+import sys
+sys.path.insert(0, f'{homedir}/code')
+from dmsp.isotopes import lin_approx, delta_to_ratio, ratio_to_fraction, fraction_to_ratio, ratio_to_delta
+
 # %% 
 #Load the HPLC processed data
 df_hplc= pd.read_csv(f'{homedir}/data/processed/HPLC/hplc_master_table_raw_100.csv')
@@ -55,8 +60,7 @@ df_master['minus_ln_f_R'] = abs(-np.log(df_master['f_R']))
 
 #Append 1000 × ln (1+δ34S/1000) -> approximation to get slope
 # column to the master table
-df_master['d34S_approx'] = 1000 * \
-np.log(1+(df_master['d34S']/1000))
+df_master['d34S_approx'] = lin_approx(df_master['d34S'])
 
 df_master.head()
 # %% 
@@ -67,11 +71,11 @@ df_dmda= df_master[(df_master.Name == 'DmdA')]
 df_dmda.head()
 # %%
 #Conversion of delta values to isotopic ratios
-df_dmda['r34_approx'] = ((df_dmda['d34S_approx']/1000)+1)*0.0450045
+df_dmda['r34_approx'] = delta_to_ratio(df_dmda['d34S_approx'])
 df_dmda.head()
 # %%
 #Conversion of isotopic ratios to fractional abundances
-df_dmda['f34_approx'] = df_dmda['r34_approx']/(1+df_dmda['r34_approx'])
+df_dmda['f34_approx'] = ratio_to_fraction(df_dmda['r34_approx'])
 df_dmda.head()
 # %%
 #Create dataframe with true values for cell lysate and DMSP
@@ -87,12 +91,12 @@ dict_tv = {'d34S_dmsp': dmsp_tv, 'd34S_cell_lysate': cell_lysate_tv}
 df_tv = pd.DataFrame(dict_tv) 
     
 #Conversion of delta values to isotopic ratios
-df_tv['r34_dmsp'] = ((df_tv['d34S_dmsp']/1000)+1)*0.0450045
-df_tv['r34_cell_lysate'] = ((df_tv['d34S_cell_lysate']/1000)+1)*0.0450045
+df_tv['r34_dmsp'] = delta_to_ratio(df_tv['d34S_dmsp'])
+df_tv['r34_cell_lysate'] = delta_to_ratio(df_tv['d34S_cell_lysate'])
 
 #Conversion of isotopic ratios to fractional abundances
-df_tv['f34_dmsp'] = df_tv['r34_dmsp']/(1+df_tv['r34_dmsp'])
-df_tv['f34_cell_lysate'] = df_tv['r34_cell_lysate']/(1+df_tv['r34_cell_lysate'])
+df_tv['f34_dmsp'] = ratio_to_fraction(df_tv['r34_dmsp'])
+df_tv['f34_cell_lysate'] = ratio_to_fraction(df_tv['r34_cell_lysate'])
 # %%
 #Find the concentration of S in the cell lysate
 # Filter by dmda at t=0
@@ -134,9 +138,9 @@ df_dmda['F34_approx_DMSP']= ((df_dmda['conc_s_cell_lysate'] * (df_dmda['f34_appr
 df_dmda.head()
 # %%
 #Convert fractional abundances to isotopic ratios
-df_dmda['R34_approx_DMSP'] = df_dmda['F34_approx_DMSP']/(1-df_dmda['F34_approx_DMSP'])
+df_dmda['R34_approx_DMSP'] = fraction_to_ratio(df_dmda['F34_approx_DMSP'])
 #Convert isotopic ratios to delta values
-df_dmda['d34S_approx_DMSP'] = ((df_dmda['R34_approx_DMSP']/0.0450045)-1)*1000
+df_dmda['d34S_approx_DMSP'] = ratio_to_delta(df_dmda['R34_approx_DMSP'])
 df_dmda.head()
 
 # %%
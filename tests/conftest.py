@@ -0,0 +1,9 @@
+"""
+The tests import the dmsp package from the code directory, as the scripts in
+code/modelling do.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'code'))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from dmsp.boxes import MultiBoxModel
+from dmsp.ocean import OceanModel, enzyme_table, ocean_vol
+
+F_TOTAL_IN = (0.000015/60)*7.24E19
+
+
+def _model(exchange, volumes=(1E20, 4E20, 2E21)):
+    df_enzymes = enzyme_table().iloc[:3]
+    transcripts = np.array([[1E7, 2E7, 5E6]]*3)
+    return MultiBoxModel(df_enzymes, F_TOTAL_IN*np.array([1., 3., 0.5]),
+                         volumes, exchange, transcripts=transcripts)
+
+
+def test_exchange_conserves_dmsp_in_boxes_of_unequal_volume():
+    exchange = 1E11*np.array([[0, 1, 0], [1, 0, 2], [0, 2, 0]])
+    model = _model(exchange)
+    x = np.array([[0.1, 0.5, 0.2], [2., 11., 4.]])
+    mixing = (model.mixing @ x.T).T
+    np.testing.assert_allclose((mixing*model.volumes).sum(axis=1), 0,
+                               atol=1E-12*np.abs(mixing*model.volumes).max())
+
+
+def test_isolated_boxes_match_ocean_model():
+    volumes = np.full(3, ocean_vol)
+    model = _model(np.zeros((3, 3)), volumes)
+    dmsp_boxes, method = model.steady_state()
+    assert method == 'root'
+    ocean = OceanModel(enzyme_table().iloc[:3],
+                       F_TOTAL_IN*np.array([1., 3., 0.5]),
+                       transcripts=np.array([[1E7, 2E7, 5E6]]*3))
+    np.testing.assert_allclose(dmsp_boxes, ocean.steady_state()[0], rtol=1E-8)
+
+
+def test_steady_state_matches_jacobian_and_integration():
+    model = _model(sparse.csr_matrix(1E12*np.array([[0, 1, 1], [1, 0, 0],
+                                                    [1, 0, 0]])))
+    x, method = model.steady_state()
+    assert method == 'root'
+    np.testing.assert_allclose(model.rhs(x)/model.f_in, 0, atol=1E-8)
+    #Sparse Jacobian against finite differences
+    y = x.ravel()
+    h = 1E-6*y
+    fd = np.stack([(model.rhs(y + h[k]*np.eye(6)[k]) -
+                    model.rhs(y - h[k]*np.eye(6)[k]))/(2*h[k])
+                   for k in range(6)], axis=1)
+    np.testing.assert_allclose(model.jac(y).toarray(), fd, rtol=1E-5,
+                               atol=1E-12*np.abs(fd).max())
+
+
+def test_exchange_must_conserve_water():
+    with pytest.raises(ValueError):
+        _model(1E11*np.array([[0, 1, 0], [0, 0, 0], [0, 0, 0]]))
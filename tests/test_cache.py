@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dmsp.cache import SolutionCache, cache_key
+from dmsp.enz_deg import dmsp_enz_deg
+from dmsp.ocean import enzyme_table
+
+C = np.array([3.5, 4.4, 95.6])
+T = np.linspace(0, 50, 20)
+ARGS = ((-3.97/1000)+1, 2., 1.6, 0.01, 0.1)
+
+
+def test_integrate_is_served_from_the_cache(tmp_path):
+    cache = SolutionCache(str(tmp_path))
+    sol, info = cache.integrate(dmsp_enz_deg, C, T, ARGS)
+    assert info['success'] and len(list(tmp_path.iterdir())) == 1
+    cached, cached_info = cache.integrate(dmsp_enz_deg, C, T, ARGS)
+    np.testing.assert_array_equal(cached, sol)
+    assert cached_info == info
+    #A changed parameter is a miss
+    other, _ = cache.integrate(dmsp_enz_deg, C, T, ARGS[:-1] + (0.2,))
+    assert len(list(tmp_path.iterdir())) == 2
+    assert not np.allclose(other, sol)
+    assert cache.invalidate() == 2
+
+
+def test_failed_integrations_are_not_saved(tmp_path):
+    cache = SolutionCache(str(tmp_path))
+    #Finite-time blow-up of dc/dt = c^2 at t = 1
+    _, info = cache.integrate(lambda c, t: c**2, [1.], np.linspace(0, 2, 5),
+                              method='RK45')
+    assert not info['success']
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_dataframes_are_hashed_by_value():
+    with pd.option_context('display.precision', 4):
+        df = enzyme_table()
+        changed = df.copy()
+        changed.loc[0, 'alpha'] += 1E-7
+        assert cache_key(len, df) != cache_key(len, changed)
+    long = pd.DataFrame({'x': np.arange(1000.)})
+    changed = long.copy()
+    changed.loc[500, 'x'] = -1
+    assert cache_key(len, long) != cache_key(len, changed)
+    assert cache_key(len, long) != cache_key(len, long.rename(
+        columns={'x': 'y'}))
+    assert cache_key(len, long['x']) == cache_key(len, long['x'].copy())
+
+
+def test_unknown_types_are_refused():
+    with pytest.raises(TypeError):
+        cache_key(len, object())
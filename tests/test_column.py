@@ -0,0 +1,57 @@
+import numpy as np
+
+from dmsp.column import WaterColumnModel
+from dmsp.ocean import OceanModel, enzyme_table, ocean_vol
+
+F_TOTAL_IN = (0.000015/60)*7.24E19
+EDGES = np.linspace(0, 200, 41)
+DEPTH = 0.5*(EDGES[1:] + EDGES[:-1])
+
+
+def _model(kz, production=None, transcripts=None):
+    if production is None:
+        production = F_TOTAL_IN/ocean_vol*np.exp(-DEPTH/50)
+    if transcripts is None:
+        transcripts = np.stack([1E7*np.exp(-DEPTH/100)]*3)
+    return WaterColumnModel(enzyme_table().iloc[:3], EDGES, production, kz,
+                            transcripts=transcripts)
+
+
+def test_mixing_conserves_dmsp():
+    kz = 60*(1E-5 + 1E-2*(EDGES < 50))
+    model = _model(kz, production=0, transcripts=np.zeros((3, 40)))
+    x = np.stack([np.linspace(0.1, 1, 40), np.linspace(2, 20, 40)])
+    #Without production or degradation rhs is only mixing
+    mixing = model.rhs(x)
+    np.testing.assert_allclose((mixing*model.thickness).sum(axis=1), 0,
+                               atol=1E-12*np.abs(mixing).max())
+
+
+def test_unmixed_layers_match_ocean_model():
+    model = _model(0)
+    dmsp_column, method = model.steady_state()
+    assert method == 'root'
+    ocean = OceanModel(enzyme_table().iloc[:3],
+                       F_TOTAL_IN*np.exp(-DEPTH/50),
+                       transcripts=np.stack([1E7*np.exp(-DEPTH/100)]*3))
+    np.testing.assert_allclose(dmsp_column, ocean.steady_state()[0],
+                               rtol=1E-8)
+
+
+def test_steady_state_matches_integration_and_jacobian():
+    kz = 60*(1E-5 + (1E-2 - 1E-5)*0.5*(1 - np.tanh((EDGES - 50)/5)))
+    model = _model(kz)
+    x, method = model.steady_state()
+    assert method == 'root'
+    sol, info = model.integrate(x*1.5, [0, 1E10], method='BDF', rtol=1E-10,
+                                atol=1E-14)
+    assert info['success']
+    np.testing.assert_allclose(sol[-1], x, rtol=1E-6)
+    #Banded Jacobian against finite differences
+    y = x.ravel()
+    h = 1E-6*y
+    fd = np.stack([(model.rhs(y + h[k]*np.eye(80)[k]) -
+                    model.rhs(y - h[k]*np.eye(80)[k]))/(2*h[k])
+                   for k in range(80)], axis=1)
+    np.testing.assert_allclose(model.jac(y).toarray(), fd, rtol=1E-5,
+                               atol=1E-9*np.abs(fd).max())
@@ -0,0 +1,50 @@
+import numpy as np
+
+from dmsp.continuation import continuation, continuation_path
+from dmsp.ocean import OceanModel, enzyme_table
+
+#Flux of DMSP into the ocean of the expected_d34s scripts in nmol/min
+F_TOTAL_IN = (0.000015/60)*7.24E19
+
+
+def test_continuation_matches_steady_state():
+    rng = np.random.default_rng(1)
+    df_enzymes = enzyme_table().iloc[:3]
+    transcripts = np.sort(rng.uniform(1E5, 3E7, (3, 4, 15)), axis=-1)
+    model = OceanModel(df_enzymes, F_TOTAL_IN, transcripts=transcripts)
+    dmsp_ss, status, iterations = continuation(model)
+    dmsp_cold, _ = model.steady_state()
+    assert np.all(status == 'root')
+    np.testing.assert_allclose(dmsp_ss, dmsp_cold, rtol=1E-8)
+    assert iterations[:, 2:].mean() < iterations[:, 0].mean()
+
+
+def test_continuation_reports_saturation():
+    #Only DddP, with transcripts decreasing until it cannot degrade the flux
+    df_enzymes = enzyme_table().iloc[:3]
+    transcripts = np.stack([np.zeros(50), np.zeros(50),
+                            np.logspace(4, -6, 50)])
+    model = OceanModel(df_enzymes, F_TOTAL_IN, transcripts=transcripts)
+    dmsp_ss, status, _ = continuation(model)
+    assert set(status) <= {'root', 'saturated'}
+    saturated = status == 'saturated'
+    assert saturated.any() and not saturated[0]
+    #Once saturated, the steady state is not recovered along the path
+    assert np.all(saturated[np.argmax(saturated):])
+    assert np.all(np.isnan(dmsp_ss[:, saturated]))
+    assert np.all(np.isfinite(dmsp_ss[:, ~saturated]))
+
+
+def test_continuation_path_reports_jumps_beyond_the_seed():
+    #Solutions that jump by more than the e^2 limit of the seed of the solver
+    targets = [np.full(2, 1.), np.full(2, 2.), np.full(2, 4.),
+               np.full(2, 4.*np.exp(5))]
+
+    def solve(p, c):
+        return targets[p], 'root'
+
+    solutions, info = continuation_path(solve, range(4))
+    assert info['method'] == ['root']*4
+    assert info['jump'] == [False, False, False, True]
+    np.testing.assert_allclose(info['prediction_error'][1:],
+                               [np.log(2), 0, 5 - np.log(2)])
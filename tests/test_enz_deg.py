@@ -0,0 +1,172 @@
+import os
+
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+from dmsp.enz_deg import (dmsp_enz_deg, dose, epsilon_batch,
+                          epsilon_sensitivity, epsilon_surface,
+                          integrate_closed_form, integrate_ensemble,
+                          integrate_events, integrate_fast, integrate_multi,
+                          integrate_sensitivity)
+from dmsp.isotopes import isotopes, isotopologues, isotopologues_to_delta
+
+#DddP, as in DMSP_enz_deg.py
+ALPHA = (-3.97/1000)+1
+DMSP_INIT = 207*1000
+C = np.array([3.479, *isotopes(DMSP_INIT)])
+KAPPA = (17000*(DMSP_INIT + 2E9))/(DMSP_INIT*C[0])/2E9
+T = np.linspace(0, 53, 50)
+
+
+def _odeint(vmax, k):
+    return odeint(dmsp_enz_deg, C, T, args=(ALPHA, vmax, 0.8*vmax, KAPPA, k),
+                  rtol=1E-12, atol=1E-12)
+
+
+@pytest.mark.parametrize('km', [2E9, 2E5, 2E4])
+@pytest.mark.parametrize('k', [0, 0.1])
+def test_closed_form_matches_odeint(km, k):
+    #From far below saturation (2E9) to nearly saturated (2E4)
+    vmax = KAPPA*km
+    ref = _odeint(vmax, k)
+    sol = integrate_closed_form(C, T, ALPHA, vmax, 0.8*vmax, KAPPA, k)[0]
+    np.testing.assert_allclose(sol, ref, rtol=1E-8)
+    np.testing.assert_allclose(isotopologues_to_delta(sol[:, 1], sol[:, 2]),
+                               isotopologues_to_delta(ref[:, 1], ref[:, 2]),
+                               atol=1E-6)
+
+
+def test_first_order_far_below_saturation():
+    vmax = KAPPA*2E12
+    ref = _odeint(vmax, 0.1)
+    sol = integrate_closed_form(C, T, ALPHA, vmax, 0.8*vmax, KAPPA, 0.1,
+                                first_order=True)[0]
+    np.testing.assert_allclose(sol, ref, rtol=1E-6)
+
+
+def test_integrate_fast_respects_its_error_bound():
+    km = np.array([2E12, 2E9, 2E5, 2E4])
+    vmax = KAPPA*km
+    sol, method, bound = integrate_fast(C, T, ALPHA, vmax, 0.8*vmax, KAPPA,
+                                        0.1, d34s_tol=1E-3)
+    assert method[0] == 'first_order' and method[-1] == 'closed_form'
+    ref = integrate_ensemble(C, T, ALPHA, vmax, 0.8*vmax, KAPPA, 0.1,
+                             rtol=1E-12, atol=1E-12)
+    error = np.abs(isotopologues_to_delta(sol[..., 1], sol[..., 2]) -
+                   isotopologues_to_delta(ref[..., 1], ref[..., 2])).max(axis=1)
+    first_order = method == 'first_order'
+    assert np.all(error[first_order] <= bound[first_order] + 1E-6)
+    assert np.all(error <= 1E-3)
+
+
+def test_integrate_fast_falls_back_to_odeint():
+    #Without 34^Vmax there is no closed form
+    vmax = KAPPA*2E9
+    sol, method, bound = integrate_fast(C, T, ALPHA, vmax, vmax, KAPPA, 0.1)
+    assert method[0] == 'odeint' and np.isnan(bound[0])
+    np.testing.assert_allclose(sol[0, :, 0], C[0]*np.exp(-0.1*T), rtol=1E-6)
+
+
+def test_epsilon_surface_matches_epsilon_batch(tmp_path):
+    k = np.array([0., 0.1, 0.5])
+    kappa_32 = KAPPA*np.array([0.5, 1., 2.])
+    vmax = KAPPA*2E5
+    checkpoint_dir = str(tmp_path/'checkpoint')
+    grid = epsilon_surface({'k': k, 'kappa_32': kappa_32}, C, T, chunk_size=4,
+                           n_workers=1, checkpoint_dir=checkpoint_dir,
+                           alpha=ALPHA, vmax=vmax, vmax_32=0.8*vmax)
+    assert grid['dims'] == {'k': 3, 'kappa_32': 3}
+    assert not os.path.exists(checkpoint_dir)
+    params = [(ALPHA, vmax, 0.8*vmax, kappa_32[1], k[2])]
+    ref = epsilon_batch(params, C, T)[0]
+    assert grid['data_vars']['epsilon34']['data'][2, 1] == \
+        pytest.approx(ref[0], rel=1E-9)
+    assert grid['data_vars']['f_r_end']['data'][2, 1] == \
+        pytest.approx(ref[3], rel=1E-9)
+
+
+def test_sensitivities_match_finite_differences():
+    vmax = KAPPA*2E5
+    params = np.array([ALPHA, vmax, 0.8*vmax, KAPPA, 0.1])
+    tol = {'rtol': 1E-11, 'atol': 1E-11}
+    _, sens = integrate_sensitivity(C, T, *params, **tol)
+    d34s, d_d34s, epsilon, d_epsilon = epsilon_sensitivity(C, T, *params,
+                                                           **tol)
+    for i in range(5):
+        h = np.zeros(5)
+        h[i] = 1E-5*params[i]
+        up = odeint(dmsp_enz_deg, C, T, args=tuple(params + h), **tol)
+        down = odeint(dmsp_enz_deg, C, T, args=tuple(params - h), **tol)
+        np.testing.assert_allclose(sens[..., i], (up - down)/(2*h[i]),
+                                   rtol=1E-4, atol=1E-8*np.abs(up).max())
+        up = epsilon_sensitivity(C, T, *(params + h), **tol)
+        down = epsilon_sensitivity(C, T, *(params - h), **tol)
+        np.testing.assert_allclose(d_d34s[:, i], (up[0] - down[0])/(2*h[i]),
+                                   rtol=1E-4, atol=1E-6/params[i])
+        assert d_epsilon[i] == pytest.approx((up[2] - down[2])/(2*h[i]),
+                                             rel=1E-4, abs=1E-6/params[i])
+
+
+def test_events_match_manual_restarts():
+    vmax = KAPPA*2E5
+    args = (ALPHA, vmax, 0.8*vmax, KAPPA, 0.1)
+    tol = {'rtol': 1E-11, 'atol': 1E-11}
+    t = np.linspace(0, 60, 61)
+    #Enzyme added at t = 10, and enzyme and DMSP at t = 25.5, between two
+    # output times
+    events = [(25.5, dose(enzyme=2., dmsp=1E5)), (10, dose(enzyme=C[0]))]
+    sol = integrate_events(C, t, events, *args, **tol)[0]
+
+    first = odeint(dmsp_enz_deg, C, t[:11], args=args, **tol)
+    state = first[-1] + dose(enzyme=C[0])
+    second = odeint(dmsp_enz_deg, state, np.append(t[10:26], 25.5),
+                    args=args, **tol)
+    state = second[-1] + dose(enzyme=2., dmsp=1E5)
+    third = odeint(dmsp_enz_deg, state, np.insert(t[26:], 0, 25.5),
+                   args=args, **tol)
+    #At the time of an event the state after the dose is returned
+    ref = np.concatenate([first[:-1], second[:-1], third[1:]])
+    np.testing.assert_allclose(sol, ref, rtol=1E-8)
+    np.testing.assert_allclose(sol[10], first[-1] + dose(enzyme=C[0]))
+
+
+def test_events_without_doses_match_integrate_ensemble():
+    vmax = KAPPA*np.array([2E5, 2E9])
+    args = (ALPHA, vmax, 0.8*vmax, KAPPA, 0.1)
+    sol = integrate_events(C, T, [(20, np.zeros(3)), (100, np.ones(3))],
+                           *args, rtol=1E-11, atol=1E-11)
+    np.testing.assert_allclose(sol, integrate_ensemble(C, T, *args,
+                                                       rtol=1E-11,
+                                                       atol=1E-11),
+                               rtol=1E-8)
+
+
+def test_integrate_multi_keeps_34s_and_32s():
+    vmax = KAPPA*2E5
+    args = (ALPHA, vmax, 0.8*vmax, KAPPA, 0.1)
+    tol = {'rtol': 1E-12, 'atol': 1E-12}
+    ref = _odeint(vmax, 0.1)
+    #Same 34DMSP and 32DMSP, with 33DMSP and 36DMSP added
+    minor = isotopologues(DMSP_INIT, (34, 33, 36, 32))[1:3]
+    sol = integrate_multi([C[0], C[1], *minor, C[2]], T, *args,
+                          mass_numbers=(34, 33, 36, 32), **tol)
+    np.testing.assert_allclose(sol[:, [0, 1, 4]], ref, rtol=1E-9)
+    sol = integrate_multi(C, T, *args, mass_numbers=(34, 32), **tol)
+    np.testing.assert_allclose(sol, ref, rtol=1E-9)
+
+
+def test_integrate_multi_with_the_same_total_dmsp():
+    #DddP assay of DMSP_enz_deg.py: K_M = 2E9 nM and k = 0
+    vmax = KAPPA*2E9
+    args = (ALPHA, vmax, 0.8*vmax, KAPPA, 0)
+    ref = odeint(dmsp_enz_deg, C, T, args=args, rtol=1E-12, atol=1E-12)
+    sol = integrate_multi([C[0], *isotopologues(DMSP_INIT, (34, 33, 36, 32))],
+                          T, *args, mass_numbers=(34, 33, 36, 32), rtol=1E-12,
+                          atol=1E-12)
+    #33DMSP and 36DMSP take ~0.8 % of the DMSP
+    np.testing.assert_allclose(sol[:, [1, 4]]/ref[:, 1:], 1 - 0.0077,
+                               atol=2E-4)
+    d34s_error = np.abs(isotopologues_to_delta(sol[:, 1], sol[:, 4]) -
+                        isotopologues_to_delta(ref[:, 1], ref[:, 2]))
+    assert d34s_error.max() < 1E-3
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dmsp.isotopes import (R34_VCDT, cap_delta, delta_to_fraction,
+                           delta_to_ratio, fraction_to_delta,
+                           fraction_to_ratio, isotopes, isotopologues,
+                           isotopologues_to_delta, isotopologues_to_deltas,
+                           lin_approx, ratio_to_delta, ratio_to_fraction)
+
+DELTAS = np.array([-40., -2.72, 0., 14.3, 17., 120.])
+
+
+def test_delta_ratio_fraction_round_trips():
+    np.testing.assert_allclose(ratio_to_delta(delta_to_ratio(DELTAS)), DELTAS,
+                               atol=1E-12)
+    r = delta_to_ratio(DELTAS)
+    np.testing.assert_allclose(fraction_to_ratio(ratio_to_fraction(r)), r,
+                               rtol=1E-14)
+    np.testing.assert_allclose(fraction_to_delta(delta_to_fraction(DELTAS)),
+                               DELTAS, atol=1E-10)
+
+
+def test_delta_of_the_standard_is_zero():
+    assert ratio_to_delta(R34_VCDT) == 0
+    assert delta_to_ratio(0) == R34_VCDT
+
+
+def test_lin_approx():
+    np.testing.assert_allclose(lin_approx(DELTAS),
+                               1000*np.log(1 + DELTAS/1000), rtol=1E-12)
+    #Close to delta for small values
+    assert abs(lin_approx(1E-3) - 1E-3) < 1E-9
+
+
+def test_isotopes_conserves_mass_and_delta():
+    c = np.array([1., 10., 500.])
+    dmsp_34, dmsp_32 = isotopes(c, delta_in=17)
+    np.testing.assert_allclose(dmsp_34 + dmsp_32, c, rtol=1E-14)
+    np.testing.assert_allclose(isotopologues_to_delta(dmsp_34, dmsp_32), 17,
+                               rtol=1E-12)
+
+
+def test_isotopes_keeps_series():
+    c = pd.Series([1., 2., 3.], index=['a', 'b', 'c'])
+    dmsp_34, dmsp_32 = isotopes(c)
+    assert isinstance(dmsp_34, pd.Series)
+    assert list(dmsp_32.index) == ['a', 'b', 'c']
+
+
+def test_isotopologues_reproduce_isotopes():
+    c = np.array([1., 10.])
+    np.testing.assert_allclose(isotopologues(c, (34, 32), delta_in=17),
+                               np.stack(isotopes(c, delta_in=17)), rtol=1E-14)
+
+
+@pytest.mark.parametrize('cap_delta_in', [None, {33: 0.1, 36: -0.4}])
+def test_isotopologues_round_trip(cap_delta_in):
+    c = isotopologues(10., delta_in=17, cap_delta_in=cap_delta_in)
+    np.testing.assert_allclose(c.sum(axis=0), 10., rtol=1E-14)
+    deltas = isotopologues_to_deltas(c)
+    np.testing.assert_allclose(deltas[34], 17, rtol=1E-12)
+    expected = {} if cap_delta_in is None else cap_delta_in
+    for x in (33, 36):
+        np.testing.assert_allclose(cap_delta(deltas[x], deltas[34], x),
+                                   expected.get(x, 0), atol=1E-10)
+
+
+def test_isotopologues_require_32_last():
+    with pytest.raises(ValueError):
+        isotopologues(10., (32, 34))
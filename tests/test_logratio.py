@@ -0,0 +1,52 @@
+import numpy as np
+from scipy.integrate import odeint
+
+from dmsp.enz_deg import dmsp_enz_deg
+from dmsp.isotopes import isotopes, isotopologues_to_delta
+from dmsp.logratio import (from_log_ratio, log_ratio_rhs, log_ratio_to_delta,
+                           to_log_ratio)
+from dmsp.ocean import args_3_comp_mm, dmsp_system_3_comp_mm, enzyme_table
+
+#DddP, as in DMSP_enz_deg.py, with K_M = 2E5 nM
+DMSP_INIT = 207*1000
+C = np.array([3.479, *isotopes(DMSP_INIT)])
+KAPPA = (17000*(DMSP_INIT + 2E9))/(DMSP_INIT*C[0])/2E9
+ARGS = ((-3.97/1000)+1, KAPPA*2E5, 0.8*KAPPA*2E5, KAPPA, 0.1)
+
+
+def test_round_trip():
+    c = np.array([[3.5, 4.4, 95.6], [0.1, 0.02, 1E-3]])
+    y = to_log_ratio(c, iso=(1, 2))
+    np.testing.assert_allclose(y[:, 0], c[:, 0])
+    np.testing.assert_allclose(from_log_ratio(y, iso=(1, 2)), c, rtol=1E-14)
+    np.testing.assert_allclose(log_ratio_to_delta(y, iso=(1, 2)),
+                               isotopologues_to_delta(c[:, 1], c[:, 2]),
+                               rtol=1E-10)
+
+
+def test_delta_matches_isotopologue_form():
+    t = np.linspace(0, 53, 50)
+    sol = odeint(dmsp_enz_deg, C, t, args=ARGS, rtol=1E-12, atol=1E-12)
+    y = odeint(log_ratio_rhs(dmsp_enz_deg, iso=(1, 2)),
+               to_log_ratio(C, iso=(1, 2)), t, args=ARGS, rtol=1E-10,
+               atol=1E-12)
+    np.testing.assert_allclose(log_ratio_to_delta(y, iso=(1, 2)),
+                               isotopologues_to_delta(sol[:, 1], sol[:, 2]),
+                               atol=1E-6)
+    np.testing.assert_allclose(from_log_ratio(y, iso=(1, 2)), sol, rtol=1E-8)
+
+
+def test_rhs_is_the_derivative_of_the_log_ratio_state():
+    df = enzyme_table().set_index('Enzyme').loc[['DmdA', 'Alma1', 'DddP']]
+    args = ((0.000015/60)*7.24E19, *df['alpha'], *df['kappa_32'],
+            *df['vmax_34'], *df['vmax_32'], *df['transcripts'])
+    assert len(args) == len(args_3_comp_mm)
+    c = np.array([0.5, 11.])
+    dc_dt = np.asarray(dmsp_system_3_comp_mm(c, 0, *args))
+    #Chain rule through to_log_ratio by finite differences along dc/dt
+    h = 1E-7/np.abs(dc_dt/c).max()
+    fd = (to_log_ratio(c + h*dc_dt, iso=(0, 1)) -
+          to_log_ratio(c - h*dc_dt, iso=(0, 1)))/(2*h)
+    fun = log_ratio_rhs(dmsp_system_3_comp_mm, iso=(0, 1))
+    np.testing.assert_allclose(fun(to_log_ratio(c, iso=(0, 1)), 0, *args), fd,
+                               rtol=1E-6)
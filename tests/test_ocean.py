@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+from scipy.optimize import fsolve
+
+from dmsp.isotopes import DELTA_IN_OCEAN, isotopes, isotopologues_to_delta
+from dmsp.ocean import (OceanModel, d34s_steady_state_3_comp,
+                        dmsp_system_3_comp_mm, dmsp_system_3_comp_mm_jac,
+                        enzyme_table, kinetic_bounds, steady_state,
+                        t_steady_state)
+
+#Flux of DMSP into the ocean of the expected_d34s scripts in nmol/min
+F_TOTAL_IN = (0.000015/60)*7.24E19
+#Arguments of dmsp_system_3_comp_mm with the parameters of enzyme_table
+ARGS = (F_TOTAL_IN, (-2.72/1000)+1, (-1.18/1000)+1, (-3.97/1000)+1,
+        10000, 2000, 600, 1E7/2, 4E7/2, 9E7/2, 1E7/2, 4E7/2, 9E7/2,
+        1E7, 1E7, 1E7)
+
+
+def test_jacobian_matches_finite_differences():
+    c = np.array([0.5, 11.])
+    jac = dmsp_system_3_comp_mm_jac(c, 0, *ARGS)
+    h = 1E-6*c
+    fd = np.stack([(np.asarray(dmsp_system_3_comp_mm(c + h[i]*np.eye(2)[i],
+                                                     0, *ARGS)) -
+                    np.asarray(dmsp_system_3_comp_mm(c - h[i]*np.eye(2)[i],
+                                                     0, *ARGS)))/(2*h[i])
+                   for i in range(2)], axis=1)
+    np.testing.assert_allclose(jac, fd, rtol=1E-6)
+
+
+def test_steady_state_matches_integration():
+    dmsp_ss, method = steady_state(ARGS)
+    assert method == 'root'
+    c = isotopes(10, delta_in=DELTA_IN_OCEAN)
+    dmsp_int = odeint(dmsp_system_3_comp_mm, c, t_steady_state, args=ARGS)[-1]
+    np.testing.assert_allclose(dmsp_ss, dmsp_int, rtol=1E-7)
+    np.testing.assert_allclose(isotopologues_to_delta(*dmsp_ss),
+                               isotopologues_to_delta(*dmsp_int), atol=1E-6)
+
+
+def test_ocean_model_reproduces_dmsp_system_3_comp_mm():
+    model = OceanModel(enzyme_table(), F_TOTAL_IN)
+    c = np.array([0.5, 11.])
+    np.testing.assert_allclose(model.rhs(c), dmsp_system_3_comp_mm(c, 0, *ARGS),
+                               rtol=1E-12)
+    np.testing.assert_allclose(np.diag(model.jac(c)),
+                               np.diag(dmsp_system_3_comp_mm_jac(c, 0, *ARGS)),
+                               rtol=1E-12)
+
+
+def test_batched_steady_state_matches_fsolve():
+    rng = np.random.default_rng(0)
+    df_enzymes = enzyme_table().iloc[:3]
+    transcripts = rng.uniform(1E5, 3E7, (3, 20))
+    model = OceanModel(df_enzymes, F_TOTAL_IN, transcripts=transcripts)
+    dmsp_ss, method = model.steady_state()
+    assert dmsp_ss.shape == (2, 20)
+    assert np.all(method == 'root')
+    for k in range(20):
+        single = OceanModel(df_enzymes, F_TOTAL_IN,
+                            transcripts=transcripts[:, k])
+        x = fsolve(lambda c: single.rhs(c)/single.f_in,
+                   isotopes(10, delta_in=DELTA_IN_OCEAN), fprime=lambda c:
+                   single.jac(c)/single.f_in[:, None], xtol=1E-13)
+        np.testing.assert_allclose(dmsp_ss[:, k], x, rtol=1E-9)
+
+
+def test_d34s_steady_state_3_comp_matches_steady_state():
+    args = np.array([ARGS, ARGS])
+    args[1, -3:] = [2E7, 5E6, 3E6]
+    d34s = d34s_steady_state_3_comp(args)
+    for row, value in zip(args, d34s):
+        dmsp_ss, _ = steady_state(tuple(row))
+        assert value == pytest.approx(isotopologues_to_delta(*dmsp_ss),
+                                      abs=1E-8)
+
+
+def test_kinetic_bounds():
+    df = kinetic_bounds()
+    assert list(df.index) == ['DmdA', 'Alma1', 'DddP']
+    #Lower estimate of DmdA in l/min/mg enz and upper estimate of Alma1 in
+    # nmol/min/mg enz, as calculated in the expected_d34s_dmsp scripts
+    assert df.loc['DmdA', 'kappa_low'] == pytest.approx(0.089*1000*1E6/15500)
+    assert df.loc['Alma1', 'vmax_enz_high'] == pytest.approx(0.0835*1000*1E6)
+    assert np.all(df['kappa_low'] < df['kappa_high'])
+
+
+def test_steady_state_sensitivity_matches_finite_differences():
+    df_enzymes = enzyme_table().iloc[:3]
+    columns = {name: df_enzymes[name].to_numpy(dtype=float)
+               for name in ('alpha', 'kappa_32', 'transcripts')}
+    model = OceanModel(df_enzymes, F_TOTAL_IN)
+    d34s, derivatives = model.steady_state_sensitivity(
+        model.steady_state()[0])
+    for name, values in columns.items():
+        for j in range(3):
+            h = np.zeros(3)
+            h[j] = 1E-6*values[j]
+            d34s_h = [isotopologues_to_delta(*OceanModel(
+                df_enzymes, F_TOTAL_IN, **{name: values + sign*h}
+                ).steady_state(rtol=1E-13)[0]) for sign in (1, -1)]
+            assert derivatives[name][j] == pytest.approx(
+                (d34s_h[0] - d34s_h[1])/(2*h[j]), rel=1E-5, abs=1E-9/h[j])
+
+
+def test_ocean_model_with_four_isotopologues():
+    model = OceanModel(enzyme_table(), F_TOTAL_IN,
+                       mass_numbers=(34, 33, 36, 32))
+    x, method = model.steady_state()
+    assert method == 'root' and x.shape == (4,)
+    np.testing.assert_allclose(model.rhs(x)/model.f_in, 0, atol=1E-8)
+    #Only the split of the flux in changes 34DMSP and 32DMSP, by the same
+    # fraction, so d34S is that of the default model
+    default, _ = OceanModel(enzyme_table(), F_TOTAL_IN).steady_state()
+    np.testing.assert_allclose(x[[0, -1]]/default, x[0]/default[0],
+                               rtol=1E-6)
+    assert isotopologues_to_delta(x[0], x[-1]) == pytest.approx(
+        isotopologues_to_delta(*default), abs=1E-6)
@@ -0,0 +1,75 @@
+import numpy as np
+
+from dmsp.ocean import OceanModel, enzyme_table
+from dmsp.pools import EnzymePoolModel
+from dmsp.seasonal import periodic_forcing
+
+F_TOTAL_IN = (0.000015/60)*7.24E19
+DF_ENZYMES = enzyme_table().iloc[:3]
+TRANSCRIPTS = np.array([[1E7, 3E6], [2E7, 1E7], [5E6, 2E7]])
+K_DEG = np.array([0.01, 0.001, 0.005])
+
+
+def test_steady_state_matches_ocean_model_and_integration():
+    model = EnzymePoolModel(DF_ENZYMES, F_TOTAL_IN, K_DEG,
+                            transcripts=TRANSCRIPTS)
+    x, method = model.steady_state()
+    assert np.all(method == 'root') and x.shape == (5, 2)
+    ocean = OceanModel(DF_ENZYMES, F_TOTAL_IN, transcripts=TRANSCRIPTS)
+    np.testing.assert_allclose(x[:2], ocean.steady_state()[0], rtol=1E-12)
+    np.testing.assert_allclose(x[2:], ocean.enzyme, rtol=1E-12)
+    np.testing.assert_allclose(model.rhs(x)[:2]/model.ocean.f_in, 0,
+                               atol=1E-8)
+    #From half the enzymes and twice the DMSP, the pools relax to the steady
+    # state
+    c = np.concatenate([2*x[:2], 0.5*x[2:]])
+    sol, out = model.integrate(c, [0, 1E5])
+    assert out.success
+    np.testing.assert_allclose(sol[-1], x, rtol=1E-5)
+
+
+def test_enzymes_decay_with_their_rate_constant():
+    #Transcripts switched off after t = 0: E(t) = E(0) exp(-k t)
+    model = EnzymePoolModel(DF_ENZYMES, F_TOTAL_IN, K_DEG,
+                            transcripts=lambda t: TRANSCRIPTS*(t <= 0))
+    c = model.initial_state([0.5, 10.])
+    t = np.linspace(0, 500, 6)
+    sol, _ = model.integrate(c, t, rtol=1E-10)
+    np.testing.assert_allclose(
+        sol[:, 2:], c[2:]*np.exp(-K_DEG[:, None]*t[:, None, None]),
+        rtol=1E-6)
+
+
+def test_jacobian_matches_finite_differences():
+    model = EnzymePoolModel(
+        DF_ENZYMES, periodic_forcing(F_TOTAL_IN, 0.5), K_DEG,
+        transcripts=TRANSCRIPTS)
+    y = model.initial_state([[0.5, 0.2], [11., 4.]]).ravel()*1.1
+    h = 1E-6*y
+    fd = np.stack([(model.rhs(y + h[k]*np.eye(10)[k], 1E5) -
+                    model.rhs(y - h[k]*np.eye(10)[k], 1E5))/(2*h[k])
+                   for k in range(10)], axis=1)
+    np.testing.assert_allclose(model.jac(y, 1E5).toarray(), fd, rtol=1E-5,
+                               atol=1E-12*np.abs(fd).max())
+
+
+def test_any_set_of_isotopologues():
+    model = EnzymePoolModel(DF_ENZYMES, F_TOTAL_IN, K_DEG,
+                            transcripts=TRANSCRIPTS[:, 0],
+                            mass_numbers=(34, 33, 36, 32))
+    x, method = model.steady_state()
+    assert method == 'root' and x.shape == (7,)
+    ocean = OceanModel(DF_ENZYMES, F_TOTAL_IN, transcripts=TRANSCRIPTS[:, 0],
+                       mass_numbers=(34, 33, 36, 32))
+    np.testing.assert_allclose(x[:4], ocean.steady_state()[0], rtol=1E-12)
+    np.testing.assert_allclose(model.rhs(x)[:4]/model.ocean.f_in, 0,
+                               atol=1E-8)
+    sol, out = model.integrate(model.initial_state(2*x[:4]), [0, 1E4])
+    assert out.success
+    np.testing.assert_allclose(sol[-1], x, rtol=1E-5)
+    h = 1E-6*x
+    fd = np.stack([(model.rhs(x + h[k]*np.eye(7)[k]) -
+                    model.rhs(x - h[k]*np.eye(7)[k]))/(2*h[k])
+                   for k in range(7)], axis=1)
+    np.testing.assert_allclose(model.jac(x).toarray(), fd, rtol=1E-5,
+                               atol=1E-12*np.abs(fd).max())
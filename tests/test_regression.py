@@ -0,0 +1,34 @@
+import numpy as np
+from scipy import stats
+
+from dmsp.regression import linregress_batch
+
+
+def test_linregress_batch_matches_linregress():
+    rng = np.random.default_rng(1)
+    x = np.sort(rng.uniform(0, 3, (5, 12)), axis=1)
+    y = -4*x + rng.normal(0, 0.3, x.shape)
+    slope, intercept, r2 = linregress_batch(x, y)
+    for i in range(5):
+        fit = stats.linregress(x[i], y[i])
+        np.testing.assert_allclose(slope[i], fit.slope, rtol=1E-12)
+        np.testing.assert_allclose(intercept[i], fit.intercept, rtol=1E-12)
+        np.testing.assert_allclose(r2[i], fit.rvalue**2, rtol=1E-12)
+
+
+def test_linregress_batch_shared_x_and_exclude_first():
+    x = np.linspace(0, 2, 8)
+    y = np.stack([3*x + 1, -x])
+    y[:, 0] = 100
+    slope, intercept, r2 = linregress_batch(x, y, exclude_first=True)
+    np.testing.assert_allclose(slope, [3, -1])
+    np.testing.assert_allclose(intercept, [1, 0], atol=1E-14)
+    np.testing.assert_allclose(r2, 1)
+
+
+def test_linregress_batch_degenerate_series():
+    slope, _, r2 = linregress_batch([[1., 1., 1.], [0., 1., 2.]],
+                                    [[1., 2., 3.], [5., 5., 5.]])
+    assert np.isnan(slope[0]) and np.isnan(r2[0])
+    assert slope[1] == 0 and r2[1] == 1
+
@@ -0,0 +1,67 @@
+import numpy as np
+
+from dmsp.ocean import OceanModel, enzyme_table
+from dmsp.seasonal import (ForcedOceanModel, interpolated_forcing,
+                           periodic_forcing)
+
+F_TOTAL_IN = (0.000015/60)*7.24E19
+DF_ENZYMES = enzyme_table().iloc[:3]
+TRANSCRIPTS = DF_ENZYMES['transcripts'].to_numpy()
+#Period in min, shorter than the relaxation time of the model (~80 min), so
+# that sampling once per period converges slowly without Newton steps
+PERIOD = 20.
+
+
+def _model():
+    return ForcedOceanModel(
+        DF_ENZYMES, periodic_forcing(F_TOTAL_IN, 0.8, period=PERIOD),
+        transcripts=periodic_forcing(TRANSCRIPTS, [0.2, 0.5, 0.5],
+                                     [0, 5, 5], period=PERIOD))
+
+
+def test_constant_forcing_matches_ocean_model():
+    model = ForcedOceanModel(DF_ENZYMES, periodic_forcing(F_TOTAL_IN),
+                             transcripts=TRANSCRIPTS)
+    x, _, converged = model.periodic_steady_state(c=[0.5, 10.])
+    assert converged
+    np.testing.assert_allclose(x, OceanModel(DF_ENZYMES, F_TOTAL_IN)
+                               .steady_state()[0], rtol=1E-8)
+
+
+def test_period_map_derivative_matches_finite_differences():
+    model = _model()
+    c = np.array([1E-7, 2E-6])
+    _, v = model.period_map(c, 0, PERIOD)
+    for i in range(2):
+        h = np.zeros_like(c)
+        h[i] = 1E-5*c[i]
+        up, _ = model.period_map(c + h, 0, PERIOD)
+        down, _ = model.period_map(c - h, 0, PERIOD)
+        np.testing.assert_allclose(v[i], (up[i] - down[i])/(2*h[i]),
+                                   rtol=1E-5)
+
+
+def test_periodic_steady_state_matches_long_integration():
+    model = _model()
+    x, n_fast, converged = model.periodic_steady_state(period=PERIOD)
+    assert converged
+    #Sampling once per period without Newton steps
+    x_slow, n_slow, converged = model.periodic_steady_state(
+        period=PERIOD, accelerate=False, max_periods=1000)
+    assert converged and n_fast < n_slow
+    np.testing.assert_allclose(x, x_slow, rtol=1E-7)
+    #The cycle closes on itself
+    t = np.linspace(0, PERIOD, 11)
+    sol, _, _ = model.seasonal_cycle(t, period=PERIOD)
+    np.testing.assert_allclose(sol[-1], sol[0], rtol=1E-8)
+
+
+def test_interpolated_forcing_wraps_around():
+    fun = interpolated_forcing([0, 10, 20, 30], [1., 2., 3., 4.], period=40)
+    assert fun(5) == 1.5
+    #Between the last point and the first one of the next period
+    assert fun(35) == 2.5
+    assert fun(45) == fun(5)
+    np.testing.assert_allclose(
+        interpolated_forcing([0, 10], [[1., 3.], [2., 4.]], period=20)(5),
+        [2., 3.])
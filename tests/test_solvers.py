@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+from dmsp.enz_deg import dmsp_enz_deg, dmsp_enz_deg_jac
+from dmsp.isotopes import isotopes
+from dmsp.solvers import integrate, methods
+
+#DddP, as in DMSP_enz_deg.py, with K_M = 2E5 nM
+DMSP_INIT = 207*1000
+C = np.array([3.479, *isotopes(DMSP_INIT)])
+KAPPA = (17000*(DMSP_INIT + 2E9))/(DMSP_INIT*C[0])/2E9
+ARGS = ((-3.97/1000)+1, KAPPA*2E5, 0.8*KAPPA*2E5, KAPPA, 0.1)
+T = np.linspace(0, 53, 50)
+
+
+@pytest.mark.parametrize('method', methods)
+def test_integrate_matches_odeint(method):
+    ref = odeint(dmsp_enz_deg, C, T, args=ARGS, rtol=1E-10, atol=1E-12)
+    sol, info = integrate(dmsp_enz_deg, C, T, args=ARGS, jac=dmsp_enz_deg_jac,
+                          method=method, rtol=1E-10, atol=1E-12)
+    assert sol.shape == (len(T), 3)
+    assert info['success'] and info['nfev'] > 0
+    np.testing.assert_allclose(sol, ref, rtol=1E-6, atol=1E-6)
+
+
+def test_failed_integration_keeps_one_row_per_time_point():
+    #Finite-time blow-up of dc/dt = c^2 at t = 1
+    def rhs(c, t):
+        return c**2
+
+    sol, info = integrate(rhs, [1.], np.linspace(0, 2, 21), method='RK45')
+    assert not info['success']
+    assert sol.shape == (21, 1)
+    assert np.all(np.isfinite(sol[:10])) and np.all(np.isnan(sol[-10:]))
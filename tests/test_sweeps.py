@@ -0,0 +1,99 @@
+import os
+from functools import partial
+
+import numpy as np
+import pytest
+
+from dmsp.sweeps import load_grid, run_sweep, save_grid
+
+#First parameter of each chunk evaluated by _square in this process
+calls = []
+
+
+def _square(params, fail_above=None):
+    calls.append(params[0, 0])
+    if fail_above is not None and os.path.exists(fail_above) and \
+            params[0, 0] > 3:
+        raise RuntimeError('preempted')
+    return params[:, 0]**2
+
+
+def test_run_sweep_matches_serial_evaluation():
+    params = np.arange(10.)[:, None]
+    np.testing.assert_array_equal(run_sweep(_square, params, chunk_size=3,
+                                            n_workers=2), params[:, 0]**2)
+
+
+def test_run_sweep_resumes_from_checkpoint(tmp_path):
+    params = np.arange(10.)[:, None]
+    checkpoint_dir = str(tmp_path/'checkpoint')
+    flag = tmp_path/'preempt'
+    flag.touch()
+    fun = partial(_square, fail_above=str(flag))
+    with pytest.raises(RuntimeError):
+        run_sweep(fun, params, chunk_size=2, checkpoint_dir=checkpoint_dir,
+                  n_workers=1)
+    assert len(os.listdir(checkpoint_dir)) == 3
+
+    #Only the chunks that were not finished are evaluated again
+    flag.unlink()
+    calls.clear()
+    result = run_sweep(fun, params, chunk_size=2,
+                       checkpoint_dir=checkpoint_dir, n_workers=1)
+    np.testing.assert_array_equal(result, params[:, 0]**2)
+    assert calls == [4., 6., 8.]
+    #The checkpoint is deleted once the sweep is complete
+    assert not os.path.exists(checkpoint_dir)
+
+
+def test_run_sweep_rejects_checkpoint_of_other_sweep(tmp_path):
+    params = np.arange(10.)[:, None]
+    checkpoint_dir = str(tmp_path/'checkpoint')
+    flag = tmp_path/'preempt'
+    flag.touch()
+    with pytest.raises(RuntimeError):
+        run_sweep(partial(_square, fail_above=str(flag)), params, chunk_size=2,
+                  checkpoint_dir=checkpoint_dir, n_workers=1)
+    #Other arguments of the function
+    with pytest.raises(ValueError):
+        run_sweep(partial(_square, fail_above=None), params, chunk_size=2,
+                  checkpoint_dir=checkpoint_dir, n_workers=1)
+    #Other key
+    with pytest.raises(ValueError):
+        run_sweep(partial(_square, fail_above=str(flag)), params, chunk_size=2,
+                  checkpoint_dir=checkpoint_dir, key='other', n_workers=1)
+
+
+def test_run_sweep_keeps_other_files(tmp_path):
+    params = np.arange(10.)[:, None]
+    #A directory with other files is not a checkpoint
+    (tmp_path/'results.csv').touch()
+    with pytest.raises(ValueError):
+        run_sweep(_square, params, chunk_size=3, checkpoint_dir=str(tmp_path),
+                  n_workers=1)
+    assert os.listdir(tmp_path) == ['results.csv']
+    #Files written next to the chunks during the sweep are kept, together
+    # with the directory
+    checkpoint_dir = tmp_path/'checkpoint'
+
+    def fun(chunk):
+        (checkpoint_dir/'log.txt').touch()
+        return _square(chunk)
+
+    run_sweep(fun, params, chunk_size=3, checkpoint_dir=str(checkpoint_dir),
+              n_workers=1)
+    assert os.listdir(checkpoint_dir) == ['log.txt']
+
+
+def test_save_grid_round_trip(tmp_path):
+    grid = {'coords': {'k': {'dims': ('k',), 'data': np.arange(3.)}},
+            'data_vars': {'epsilon': {'dims': ('k',),
+                                      'data': np.array([1., 2., 3.])}},
+            'attrs': {'units': 'permil'}}
+    path = str(tmp_path/'grid.npz')
+    save_grid(path, grid)
+    loaded = load_grid(path)
+    np.testing.assert_array_equal(loaded['data_vars']['epsilon']['data'],
+                                  [1., 2., 3.])
+    assert loaded['dims'] == {'k': 3}
+    assert loaded['attrs'] == {'units': 'permil'}